@@ -0,0 +1,27 @@
+"""
+Fixtures shared by the tests of lca_modeller.
+"""
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def bw_project(monkeypatch):
+    """
+    Runs a test in a temporary Brightway directory, with a current project named 'lca_modeller_test', and without the
+    caches that lca_modeller keeps outside of the Brightway directory.
+    """
+    bw = pytest.importorskip("brightway2")
+    monkeypatch.setenv("LCA_MODELLER_CONFIG_CACHE", "off")
+    tempdir = bw.projects._use_temp_directory()
+    bw.projects.set_current('lca_modeller_test')
+    yield bw.projects.current
+
+    # Options of generate() are applied process-wide: restore the behaviour of lca_algebraic
+    from lca_modeller.evaluation.cache import disable_compiled_cache
+    from lca_modeller.evaluation.scores import disable_score_store
+    disable_compiled_cache()
+    disable_score_store()
+    bw.projects._restore_orig_directory()
+    shutil.rmtree(tempdir, ignore_errors=True)
@@ -0,0 +1,10 @@
+"""
+Evaluation of the models generated by LCAProblemConfigurator.
+"""
+from lca_modeller.evaluation.sweep import run_sweep, load_sweep
+from lca_modeller.evaluation.cache import enable_compiled_cache, disable_compiled_cache
+from lca_modeller.evaluation.compilation import configure_compilation, expression_size
+from lca_modeller.evaluation.contributions import process_contributions, clear_contributions_cache
+from lca_modeller.evaluation.sensitivity import sobol_analysis, SobolResults
+from lca_modeller.evaluation.linear import LinearModel
+from lca_modeller.evaluation.scores import background_scores, enable_score_store, disable_score_store, score_store
@@ -0,0 +1,244 @@
+"""
+Persistent cache of the compiled impact functions of the models generated by LCAProblemConfigurator.
+
+lca_algebraic compiles the impact functions of a model at the first evaluation, which requires the symbolic expression
+of the model, the LCA of all background activities, and the lambdification of the expressions. This cache stores the
+result on disk, keyed by a fingerprint of everything it depends on (including the content of the foreground database,
+which may be edited by hand after the generation), so that a new Python process evaluating the same model does not
+compile it again.
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import os.path as pth
+import pickle
+
+import brightway2 as bw
+import lca_algebraic.lca as agb_lca
+from bw2data.backends.peewee import ExchangeDataset
+from lca_algebraic.base_utils import _user_functions
+from lca_algebraic.lca import LambdaWithParamNames
+from lca_algebraic.params import _param_registry
+
+from lca_modeller.evaluation.compilation import load_shared, set_compiled_cache
+
+_LOGGER = logging.getLogger(__name__)
+
+CACHE_FILENAME = "lca_modeller_compiled-{}.pickle"
+FOREGROUND_DB = 'Foreground DB'
+AS_TECH_SUFFIX = '#asTech'  # suffix of the codes of lca_algebraic's proxies of biosphere flows
+
+_FINGERPRINT = None  # fingerprint of the current model, None if the cache is disabled
+_GENERATED = (FOREGROUND_DB,)  # databases generated with the current model, fingerprinted by their content
+_CONTENT = (None, None)  # (modification times of the generated databases, fingerprint including their content)
+
+
+def model_fingerprint(configuration: dict, methods, generated_databases=(FOREGROUND_DB,)) -> str:
+    """
+    Computes the fingerprint of a generated model: the configuration, the parameters registry, the methods and the
+    versions of the background databases. The content of the generated databases is added at evaluation, see
+    _current_fingerprint().
+    :param configuration: content of the configuration file
+    :param methods: LCIA methods of the model
+    :param generated_databases: databases written at each generation of the model
+    """
+    params = [
+        (param.name, str(param.type), param.default, param.min, param.max, str(param.formula),
+         getattr(param, 'values', None))
+        for param in sorted(_param_registry().all(), key=lambda p: (p.name, p.dbname or ''))
+    ]
+    databases = {name: meta.get('modified') for name, meta in bw.databases.items() if name not in generated_databases}
+    content = {
+        'project': bw.projects.current,
+        'configuration': configuration,
+        'parameters': params,
+        'methods': [list(method) for method in methods],
+        'databases': databases,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def databases_hash(db_names) -> str:
+    """
+    Computes the hash of the exchanges of databases, independent of the order in which they were written. The proxies
+    of biosphere flows that lca_algebraic adds to the foreground database at evaluation are ignored.
+    :param db_names: names of the databases
+    """
+    query = ExchangeDataset.select(ExchangeDataset.output_database, ExchangeDataset.output_code,
+                                   ExchangeDataset.input_database, ExchangeDataset.input_code, ExchangeDataset.type,
+                                   ExchangeDataset.data).where(ExchangeDataset.output_database.in_(list(db_names)) &
+                                                               ~ExchangeDataset.output_code.endswith(AS_TECH_SUFFIX))
+    exchanges = sorted(json.dumps([exc.output_database, exc.output_code, exc.input_database, exc.input_code, exc.type,
+                                   exc.data], sort_keys=True, default=str) for exc in query)
+    digest = hashlib.sha256()
+    for exchange in exchanges:
+        digest.update(exchange.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _current_fingerprint() -> str:
+    """
+    Returns the fingerprint of the current model, including the content of the generated databases. Their content is
+    hashed again only if they were modified since the last call, e.g. by a hand edit of the foreground.
+    """
+    global _CONTENT
+    modified = tuple(bw.databases[name].get('modified') if name in bw.databases else None for name in _GENERATED)
+    if _CONTENT[0] != modified:
+        content = (_FINGERPRINT + databases_hash(_GENERATED)).encode('utf-8')
+        _CONTENT = (modified, hashlib.sha256(content).hexdigest())
+    return _CONTENT[1]
+
+
+def _source_of(lambd: LambdaWithParamNames):
+    """
+    Returns the source code of the function generated by sympy for a compiled expression, or None if not available
+    (e.g. constant expression).
+    """
+    for cell in lambd.lambd.__closure__ or []:
+        func = cell.cell_contents
+        if callable(func) and func.__name__ == '_lambdifygenerated':
+            try:
+                return inspect.getsource(func)
+            except (OSError, TypeError):
+                return None
+    return None
+
+
+def _load_function(source: str):
+    """
+    Executes the source code of a function generated by sympy, in the same namespace as lca_algebraic's lambdify.
+    """
+    namespace = {'I': 1j}
+    exec("from numpy import *; from numpy.linalg import *", namespace)
+    namespace.update({symbol.name: func for symbol, func in _user_functions.values()})
+    exec(compile(source, "<lca_modeller compiled cache>", "exec"), namespace)
+    lambd = namespace['_lambdifygenerated']
+
+    def func(*args, **kwargs):  # same as lca_algebraic's lambdify
+        res = lambd(*args, **kwargs)
+        if isinstance(res, dict):
+            return {str(k): v for k, v in res.items()}
+        return res
+
+    return func
+
+
+def _dump(lambd: LambdaWithParamNames) -> dict:
+    if getattr(lambd, 'shared_source', None) is not None:  # compiled with the other methods, see compilation.py
+        return dict(expr=lambd.expr, params=lambd.params, expanded_params=lambd.expanded_params, sobols=lambd.sobols,
+                    source=None, shared_source=lambd.shared_source, outputs=lambd.outputs)
+    return dict(expr=lambd.expr, params=lambd.params, expanded_params=lambd.expanded_params, sobols=lambd.sobols,
+                source=_source_of(lambd))
+
+
+def _load(entry: dict) -> LambdaWithParamNames:
+    if entry['source'] is None:  # constant or trivial expression: cheap to compile
+        return LambdaWithParamNames(entry['expr'], expanded_params=entry['expanded_params'], params=entry['params'],
+                                    sobols=entry['sobols'])
+    lambd = LambdaWithParamNames.__new__(LambdaWithParamNames)
+    lambd.expr = agb_lca._replace_symbols_with_params_in_exp(entry['expr'])
+    lambd.params = entry['params']
+    lambd.expanded_params = entry['expanded_params']
+    lambd.sobols = entry['sobols']
+    lambd.lambd = _load_function(entry['source'])
+    return lambd
+
+
+class CompiledCache:
+    """
+    On-disk cache of compiled impact functions for a given model fingerprint.
+    One file per fingerprint is stored next to the Brightway project.
+
+    :param fingerprint: fingerprint of the model, see model_fingerprint()
+    """
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.filename = pth.join(bw.projects.dir, CACHE_FILENAME.format(fingerprint[:16]))
+        self._data = None
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            self._data = {}
+            if pth.exists(self.filename):
+                try:
+                    with open(self.filename, "rb") as file:
+                        fingerprint, data = pickle.load(file)
+                    if fingerprint == self.fingerprint:
+                        self._data = data
+                except Exception as e:
+                    _LOGGER.warning(f"Could not read compiled functions cache {self.filename} ({e}).")
+        return self._data
+
+    def save(self):
+        tmp_filename = f"{self.filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "wb") as file:
+            pickle.dump((self.fingerprint, self._data), file)
+        os.replace(tmp_filename, self.filename)
+
+
+_CACHES = dict()  # fingerprint => CompiledCache
+_LOADED = dict()  # (fingerprint, key) => compiled functions already loaded in this process
+
+
+def _cached_compiled_functions(model, methods, alpha=1, axis=None, compile=None):
+    """
+    Lookup of the compiled cache, see compilation.set_compiled_cache(): reads the compiled functions of a model from the
+    cache, or compiles them with the given function and stores them.
+    """
+    if _FINGERPRINT is None or model.key[0] != FOREGROUND_DB:
+        return compile(model, methods, alpha=alpha, axis=axis)
+
+    fingerprint = _current_fingerprint()
+    key = (model.key, tuple(tuple(method) for method in methods), str(alpha), axis)
+    if (fingerprint, key) in _LOADED:
+        return _LOADED[(fingerprint, key)]
+
+    cache = _CACHES.setdefault(fingerprint, CompiledCache(fingerprint))
+    entries = cache.data.get(key)
+    if entries is not None:
+        try:
+            if entries and entries[0].get('shared_source') is not None:
+                lambdas = load_shared(entries, _load_function(entries[0]['shared_source']))
+            else:
+                lambdas = [_load(entry) for entry in entries]
+            _LOADED[(fingerprint, key)] = lambdas
+            return lambdas
+        except Exception as e:
+            _LOGGER.warning(f"Could not load compiled functions from cache ({e}). Compiling again.")
+
+    lambdas = _LOADED[(fingerprint, key)] = compile(model, methods, alpha=alpha, axis=axis)
+    try:
+        cache.data[key] = [_dump(lambd) for lambd in lambdas]
+        cache.save()
+    except Exception as e:
+        _LOGGER.warning(f"Could not store compiled functions in cache ({e}).")
+    return lambdas
+
+
+def enable_compiled_cache(fingerprint: str, generated_databases=(FOREGROUND_DB,)):
+    """
+    Enables the cache of compiled functions for the model with the given fingerprint.
+    The cache is used transparently by lca_algebraic's compute_impacts() and by the functions of lca_modeller that
+    evaluate the model.
+    :param fingerprint: fingerprint of the model, see model_fingerprint()
+    :param generated_databases: databases generated with the model, whose content is part of the fingerprint
+    """
+    global _FINGERPRINT, _GENERATED, _CONTENT
+    _FINGERPRINT = fingerprint
+    _GENERATED = tuple(generated_databases)
+    _CONTENT = (None, None)
+    set_compiled_cache(_cached_compiled_functions)
+
+
+def disable_compiled_cache():
+    """
+    Disables the cache of compiled functions.
+    """
+    global _FINGERPRINT, _CONTENT
+    _FINGERPRINT = None
+    _CONTENT = (None, None)
+    set_compiled_cache(None)
@@ -0,0 +1,217 @@
+"""
+Compilation of the impact functions of the models generated by LCAProblemConfigurator.
+
+lca_algebraic compiles one function per LCIA method, although the expressions of all the methods share the same
+parametric coefficients of the background activities (products of switch, premise pathway and year interpolation
+parameters...), which are then computed once per method. Here, the expressions of all the methods are compiled into a
+single function with common-subexpression elimination: each shared subexpression is computed once per evaluation,
+whatever the number of methods and activities referring to it.
+
+Very large expressions are slow to compile: above a configurable size, they are reported, or split into partial sums
+computed separately.
+"""
+import inspect
+import logging
+import threading
+from typing import List
+
+import lca_algebraic.lca as agb_lca
+import numpy as np
+from lca_algebraic.base_utils import _user_functions
+from lca_algebraic.database import DbContext
+from lca_algebraic.lca import LambdaWithParamNames
+from lca_algebraic.params import _expand_param_names, _expanded_names_to_names
+from sympy import Add, Basic, lambdify
+from sympy.printing.numpy import NumPyPrinter
+
+from lca_modeller.helpers import expression_size
+
+_LOGGER = logging.getLogger(__name__)
+
+WARN = 'warn'
+SPLIT = 'split'
+
+_SETTINGS = dict(cse=False, max_size=None, action=WARN)  # see configure_compilation()
+_CACHE = None  # lookup of the compiled cache, see set_compiled_cache()
+_original_preMultiLCAAlgebric = agb_lca._preMultiLCAAlgebric
+
+
+def _split(expr, max_size: int) -> list:
+    """
+    Splits a sum into partial sums of at most max_size nodes (unless a single term is larger).
+    """
+    if not isinstance(expr, Add):
+        return [expr]
+    parts, terms, size = [], [], 0
+    for term in expr.args:
+        term_size = expression_size(term)
+        if terms and size + term_size > max_size:
+            parts.append(Add(*terms))
+            terms, size = [], 0
+        terms.append(term)
+        size += term_size
+    parts.append(Add(*terms))
+    return parts
+
+
+def _value_key(value):
+    value = np.asarray(value)
+    return value.dtype.str, value.shape, value.tobytes()
+
+
+class _SharedOutputs:
+    """
+    Function computing all the outputs at once. The results of the last call are kept, so that the functions of the
+    different methods, called with the same parameter values, compute them only once. lca_algebraic calls them from a
+    thread pool: the results are computed under a lock, and stored with their parameter values as a single tuple.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self._last = None  # (key of the parameter values, results)
+        self._lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        key = tuple((name, _value_key(value)) for name, value in sorted(kwargs.items()))
+        last = self._last
+        if last is None or last[0] != key:
+            with self._lock:
+                last = self._last  # possibly computed by another thread in the meantime
+                if last is None or last[0] != key:
+                    last = (key, self.func(**kwargs))
+                    self._last = last
+        return last[1]
+
+    def output(self, indices: List[int]):
+        def func(**kwargs):
+            results = self(**kwargs)
+            return sum(results[i] for i in indices) if len(indices) > 1 else results[indices[0]]
+
+        return func
+
+
+def _lambdas(exprs, params, expanded_params, outputs, shared: _SharedOutputs, source=None, sobols=None):
+    lambdas = []
+    for imethod, (expr, indices) in enumerate(zip(exprs, outputs)):
+        lambd = LambdaWithParamNames.__new__(LambdaWithParamNames)
+        lambd.expr = expr
+        lambd.params = params
+        lambd.expanded_params = expanded_params
+        lambd.sobols = sobols[imethod] if sobols else None
+        lambd.lambd = shared.output(indices)
+        lambd.outputs = indices  # see cache.py
+        lambd.shared_source = source
+        lambdas.append(lambd)
+    return lambdas
+
+
+def compile_shared(exprs, max_size: int = None, action: str = WARN) -> List[LambdaWithParamNames]:
+    """
+    Compiles the expressions of several methods into a single function, with common-subexpression elimination.
+    :param exprs: expressions of the impacts, one per method
+    :param max_size: maximum size of an expression (see expression_size()), above which the action is applied
+    :param action: 'warn' to log a warning, 'split' to split the expression into partial sums of at most max_size nodes
+    :return: the compiled functions, one per method, as lca_algebraic's _preMultiLCAAlgebric()
+    """
+    parts, outputs = [], []
+    for imethod, expr in enumerate(exprs):
+        expr_parts = [expr]
+        if max_size:
+            size = expression_size(expr)
+            if size > max_size:
+                if action == SPLIT:
+                    expr_parts = _split(expr, max_size)
+                    _LOGGER.info(f"Expression of method #{imethod} ({size} nodes) split into {len(expr_parts)} parts.")
+                else:
+                    _LOGGER.warning(f"Expression of method #{imethod} has {size} nodes, more than the limit of "
+                                    f"{max_size}: its compilation and evaluation may be slow.")
+        outputs.append(list(range(len(parts), len(parts) + len(expr_parts))))
+        parts.extend(expr_parts)
+
+    symbols = {str(symbol) for part in parts if isinstance(part, Basic) for symbol in part.free_symbols}
+    params = list(_expanded_names_to_names(symbols))
+    expanded_params = _expand_param_names(params)
+
+    # Same printer and functions as lca_algebraic's lambdify
+    printer = NumPyPrinter(
+        {"fully_qualified_modules": False, "inline": True, "allow_unknown_functions": True, "user_functions": dict()}
+    )
+    modules = [{x[0].name: x[1] for x in _user_functions.values()}, "numpy"]
+    func = lambdify(expanded_params, parts, modules, printer=printer, cse=True)
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = None
+    return _lambdas(exprs, params, expanded_params, outputs, _SharedOutputs(func), source=source)
+
+
+def load_shared(entries: List[dict], func) -> List[LambdaWithParamNames]:
+    """
+    Rebuilds the functions compiled by compile_shared() from the entries of the compiled cache (see cache.py).
+    :param entries: entries of the cache, one per method
+    :param func: the shared function, loaded from its source
+    """
+    exprs = [agb_lca._replace_symbols_with_params_in_exp(entry['expr']) for entry in entries]
+    return _lambdas(exprs, entries[0]['params'], entries[0]['expanded_params'], [entry['outputs'] for entry in entries],
+                    _SharedOutputs(func), source=entries[0]['shared_source'],
+                    sobols=[entry['sobols'] for entry in entries])
+
+
+def compile_model(model, methods, alpha=1, axis=None):
+    """
+    Compiles the impact functions of a model as lca_algebraic's _preMultiLCAAlgebric(), or all the methods at once if
+    enabled by configure_compilation().
+    """
+    if not _SETTINGS['cse'] or axis is not None:  # impacts by axis are dictionaries of expressions
+        return _original_preMultiLCAAlgebric(model, methods, alpha=alpha, axis=axis)
+    with DbContext(model):
+        exprs = agb_lca._modelToExpr(model, methods, alpha=alpha, axis=axis)
+        return compile_shared(exprs, max_size=_SETTINGS['max_size'], action=_SETTINGS['action'])
+
+
+def pre_multi_lca(model, methods, alpha=1, axis=None):
+    """
+    Replacement of lca_algebraic's _preMultiLCAAlgebric(): the compiled functions are read from the compiled cache if
+    it is enabled, and compiled by compile_model() otherwise (or if they are not in the cache).
+    """
+    if _CACHE is not None:
+        return _CACHE(model, methods, alpha=alpha, axis=axis, compile=compile_model)
+    return compile_model(model, methods, alpha=alpha, axis=axis)
+
+
+def _install():
+    """
+    Replaces lca_algebraic's _preMultiLCAAlgebric() by pre_multi_lca(), once: the compilation settings and the compiled
+    cache are applied by pre_multi_lca(), not by further replacements.
+    """
+    if agb_lca._preMultiLCAAlgebric is _original_preMultiLCAAlgebric:
+        agb_lca._preMultiLCAAlgebric = pre_multi_lca
+    elif agb_lca._preMultiLCAAlgebric is not pre_multi_lca:
+        _LOGGER.warning("lca_algebraic's _preMultiLCAAlgebric() was replaced by another function: the compilation "
+                        "settings and the compiled cache of lca_modeller are not applied.")
+
+
+def set_compiled_cache(lookup=None):
+    """
+    Sets the lookup of the compiled cache, called by pre_multi_lca() with the arguments of _preMultiLCAAlgebric() and
+    the compile function to call for the functions not in the cache. None to disable the cache.
+    """
+    global _CACHE
+    _CACHE = lookup
+    if lookup is not None:
+        _install()
+
+
+def configure_compilation(cse: bool = True, max_size: int = None, action: str = WARN):
+    """
+    Configures the compilation of the impact functions by lca_algebraic's compute_impacts() and by the functions of
+    lca_modeller that evaluate the model.
+    :param cse: if True, the expressions of all the methods are compiled into a single function, with
+    common-subexpression elimination
+    :param max_size: maximum size of an expression, in number of nodes
+    :param action: 'warn' or 'split', applied to the expressions larger than max_size
+    """
+    if action not in (WARN, SPLIT):
+        raise ValueError(f"Unknown action '{action}' for expressions larger than the limit: use '{WARN}' or '{SPLIT}'.")
+    _SETTINGS.update(cse=cse, max_size=max_size, action=action)
+    _install()
@@ -0,0 +1,110 @@
+"""
+Contributions of the activities of a model to an LCIA method, for given parameter values.
+
+The contributions of all the activities of the tree are obtained at once: the amounts of all the exchanges of the
+foreground (see foreground.py) are compiled into a single function evaluated once, and the impacts of all the background
+activities referenced by the foreground are read from the store of LCIA scores (see scores.py), computed in bulk if
+missing.
+The impact of each activity is then propagated bottom-up (impact per unit of activity) and its amount top-down (amount
+per functional unit).
+"""
+import json
+import logging
+from typing import Dict
+
+import brightway2 as bw
+import numpy as np
+import pandas as pd
+from lca_algebraic.params import _complete_and_expand_params, _expanded_names_to_names
+
+from lca_modeller.evaluation.foreground import _foreground_graph, _foreground_terms
+from lca_modeller.evaluation.scores import background_scores
+
+_LOGGER = logging.getLogger(__name__)
+
+_CACHE = dict()  # cache key => DataFrame of contributions, see process_contributions()
+
+
+def _evaluate_amounts(graph: dict, params: Dict) -> Dict:
+    """
+    Evaluates all the amounts and formulas of the exchanges at once.
+    :return: dict of amount or formula => value
+    """
+    constants, formulas, free_symbols, func = _foreground_terms(graph)
+    values = {amount: float(amount) for amount in constants}
+    if not formulas:
+        return values
+
+    param_values = _complete_and_expand_params(params, required_params=_expanded_names_to_names(free_symbols),
+                                               asSymbols=False)
+    results = func(**{name: param_values[name] for name in free_symbols})
+    values.update({formula: float(np.squeeze(result)) for formula, result in zip(formulas, results)})
+    return values
+
+
+def _cache_key(model, method, params: Dict) -> tuple:
+    """
+    Key of the contributions in the cache: the model, the method, the parameter values and the last modification of
+    the foreground database.
+    """
+    modified = bw.databases[model.key[0]].get('modified')
+    return model.key, tuple(method), json.dumps(params, sort_keys=True, default=str), modified
+
+
+def process_contributions(model, method, **params) -> pd.DataFrame:
+    """
+    Computes the contribution of each activity of the model to an LCIA method: the impact of the activity and of all
+    its sub-activities, per functional unit of the model. The result is cached for the same model, method and parameter
+    values, as long as the foreground database is not modified.
+
+    :param model: top-level activity
+    :param method: LCIA method
+    :param params: values of the parameters (single values). Parameters not provided take their default value.
+    :return: DataFrame with one row per activity reached (foreground activities and first level of background
+    activities), with columns 'key' (Brightway key), 'amount' (amount per functional unit of the model),
+    'impact_per_unit', 'impact' (contribution per functional unit of the model) and 'share' (fraction of the total
+    impact of the model).
+    """
+    cache_key = _cache_key(model, method, params)
+    if cache_key in _CACHE:
+        return _CACHE[cache_key]
+
+    order, graph, background = _foreground_graph(model)
+
+    # Impacts of the background activities, computed in bulk if not already stored
+    scores = background_scores(list(background), [method])
+    impacts = {key: scores[(tuple(key), tuple(method))] for key in background}
+
+    # Amounts of all the exchanges, in a single evaluation
+    values = _evaluate_amounts(graph, params)
+
+    # Impact per unit of each foreground activity, bottom-up
+    for key in reversed(order):
+        output, exchanges = graph[key]
+        impacts[key] = sum(sign * values[amount] * impacts[input_key] for input_key, amount, sign in exchanges) / output
+
+    # Amount of each activity per functional unit of the model, top-down
+    amounts = {model.key: 1.}
+    for key in order:
+        output, exchanges = graph[key]
+        for input_key, amount, sign in exchanges:
+            amounts[input_key] = amounts.get(input_key, 0.) + amounts[key] * sign * values[amount] / output
+
+    total = impacts[model.key]
+    keys = list(amounts)
+    res = pd.DataFrame({
+        'key': keys,
+        'amount': [amounts[key] for key in keys],
+        'impact_per_unit': [impacts[key] for key in keys],
+    })
+    res['impact'] = res['amount'] * res['impact_per_unit']
+    res['share'] = res['impact'] / total if total else 0.
+    _CACHE[cache_key] = res
+    return res
+
+
+def clear_contributions_cache():
+    """
+    Clears the cache of contributions.
+    """
+    _CACHE.clear()
@@ -0,0 +1,84 @@
+"""
+Foreground graph of the models generated by LCAProblemConfigurator, read as lca_algebraic's actToExpression() reads it.
+
+The exchanges of the foreground activities reachable from a model are read once, with the same rules as the symbolic
+expression of lca_algebraic (exchange amounts given as functions are ignored, fixed parameters are replaced by their
+default value, production exchanges other than the reference one are avoided burdens), so that the evaluations based on
+this graph (contributions, linear model) give the same impacts as lca_algebraic's compute_impacts().
+"""
+from types import FunctionType
+from typing import List, Tuple
+
+import brightway2 as bw
+from lca_algebraic.base_utils import _user_functions
+from lca_algebraic.database import _isForeground
+from lca_algebraic.lca import _replace_fixed_params
+from lca_algebraic.params import _fixed_params, _getAmountOrFormula
+from sympy import Basic, lambdify
+
+
+def _foreground_graph(model) -> Tuple[list, dict, set]:
+    """
+    Reads the exchanges of the foreground activities reachable from the model.
+    :return: the foreground activities in topological order (parents before children), their exchanges as a dict
+    key => (output amount, list of (input key, amount or formula, sign)), and the keys of the background activities
+    """
+    fixed_params = list(_fixed_params().values())
+    graph = dict()
+    done = set()
+    background = set()
+    postorder = []
+    stack = [(model.key, model, False)]
+    while stack:
+        key, act, finished = stack.pop()
+        if finished:
+            done.add(key)
+            postorder.append(key)
+            continue
+        if key in graph:
+            continue
+        if act is None:
+            act = bw.get_activity(key)
+        exchanges = []
+        output = None
+        for exc in act.exchanges():
+            if exc['input'] == exc['output']:  # reference production
+                if output is None and exc.get('type') == 'production':
+                    output = exc['amount']
+                continue
+            amount = _getAmountOrFormula(exc)
+            if isinstance(amount, FunctionType):  # ignored by lca_algebraic
+                continue
+            if isinstance(amount, Basic) and amount.free_symbols:
+                amount = _replace_fixed_params(amount, fixed_params)
+            sign = -1 if exc.get('type') == 'production' else 1  # avoided production
+            exchanges.append((exc['input'], amount, sign))
+        graph[key] = (1. if output is None else output, exchanges)
+        stack.append((key, act, True))
+        for input_key, _, _ in reversed(exchanges):
+            if _isForeground(input_key[0]):
+                if input_key in graph and input_key not in done:  # activity being read: ancestor of this one
+                    raise Exception(f"Found recursive activities : {input_key} is an input of {key}")
+                if input_key not in graph:
+                    stack.append((input_key, None, False))
+            else:
+                background.add(input_key)
+    return postorder[::-1], graph, background
+
+
+def _foreground_terms(graph: dict) -> Tuple[list, list, List[str], callable]:
+    """
+    Splits the amounts of the exchanges of a foreground graph into constants and formulas of the parameters, and
+    compiles the formulas into a single function, with the user functions of lca_algebraic.
+    :return: the constants, the formulas, the names of the (expanded) parameters of the formulas, and the function of
+    these parameters returning the values of the formulas (None if there is no formula)
+    """
+    amounts = {amount for _, exchanges in graph.values() for _, amount, _ in exchanges}
+    formulas = [amount for amount in amounts if isinstance(amount, Basic) and amount.free_symbols]
+    constants = list(amounts.difference(formulas))
+    symbols = sorted({str(symbol) for formula in formulas for symbol in formula.free_symbols})
+    func = None
+    if formulas:
+        modules = [{x[0].name: x[1] for x in _user_functions.values()}, "numpy"]
+        func = lambdify(symbols, formulas, modules)
+    return constants, formulas, symbols, func
@@ -0,0 +1,133 @@
+"""
+Linear evaluation of the models generated by LCAProblemConfigurator, without symbolic layer.
+
+A model is a graph of foreground activities whose exchanges are parametric, ending in background activities (ecoinvent
+copies, premise proxies, biosphere flows) whose impacts per unit do not depend on the parameters. The foreground is
+compiled once into sparse coefficient matrices (one entry per exchange, referring to a term: constant or formula of the
+parameters), and the impacts per unit of the background activities are read once for all methods from the store of
+LCIA scores (see scores.py). An evaluation
+then consists in computing the terms with a single compiled function, and propagating the impacts bottom-up, level by
+level, with vectorized NumPy operations. Many points (arrays of parameter values) are evaluated at once.
+"""
+import logging
+from typing import Dict, List
+
+import lca_algebraic as agb
+import numpy as np
+import pandas as pd
+from lca_algebraic.lca import _filter_param_values
+from lca_algebraic.methods import method_unit
+from lca_algebraic.params import _complete_params, _expanded_names_to_names
+from pint import Quantity
+
+from lca_modeller.evaluation.foreground import _foreground_graph, _foreground_terms
+from lca_modeller.evaluation.scores import background_scores
+from lca_modeller.evaluation.sweep import _expand_param_arrays
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LinearModel:
+    """
+    Model compiled into sparse coefficient matrices of its foreground and a matrix of impacts per unit of its background
+    activities.
+
+    :param model: the model, e.g. returned by LCAProblemConfigurator.generate()
+    :param methods: the LCIA methods
+    :param functional_unit: quantity by which impacts are divided, as in lca_algebraic's compute_impacts()
+    """
+
+    def __init__(self, model, methods: List, functional_unit=1):
+        if isinstance(methods, tuple):
+            methods = [methods]
+        self.model = model
+        self.methods = list(methods)
+        self.functional_unit = functional_unit
+
+        order, graph, background = _foreground_graph(model)
+        self.foreground = order  # topological order: the model first
+        self.background = sorted(background)
+        fg_index = {key: i for i, key in enumerate(self.foreground)}
+        bg_index = {key: i for i, key in enumerate(self.background)}
+
+        # Impacts per unit of the background activities: matrix (background activities x methods)
+        scores = background_scores(self.background, self.methods)
+        self.scores = np.array([[scores[(tuple(key), tuple(method))] for method in self.methods]
+                                for key in self.background], dtype=float)
+        self.scores = self.scores.reshape(len(self.background), len(self.methods))
+
+        # Terms of the coefficients: constants first, then formulas of the parameters
+        constants, formulas, self._symbols, self._func = _foreground_terms(graph)
+        term_index = {amount: i for i, amount in enumerate(constants + formulas)}
+        self._constants = np.array([float(amount) for amount in constants])
+        self._params = list(_expanded_names_to_names(self._symbols))
+        self._n_terms = len(constants) + len(formulas)
+
+        # Coefficient matrices, as COO entries (parent, term, scale, child): foreground => background and
+        # foreground => foreground, the latter grouped by level of the parent (height above the background)
+        heights = dict()
+        for key in reversed(order):
+            _, exchanges = graph[key]
+            heights[key] = 1 + max((heights[input_key] for input_key, _, _ in exchanges if input_key in fg_index),
+                                   default=-1)
+        bg_entries = []
+        fg_entries = [[] for _ in range(max(heights.values(), default=0) + 1)]
+        for key in order:
+            output, exchanges = graph[key]
+            for input_key, amount, sign in exchanges:
+                entry = (fg_index[key], term_index[amount], sign / output)
+                if input_key in fg_index:
+                    fg_entries[heights[key]].append(entry + (fg_index[input_key],))
+                else:
+                    bg_entries.append(entry + (bg_index[input_key],))
+        self._bg_entries = self._to_arrays(bg_entries)
+        self._fg_entries = [self._to_arrays(entries) for entries in fg_entries if entries]
+
+    @staticmethod
+    def _to_arrays(entries):
+        parents, terms, scales, children = zip(*entries) if entries else ([], [], [], [])
+        return np.array(parents, dtype=int), np.array(terms, dtype=int), np.array(scales, dtype=float), \
+            np.array(children, dtype=int)
+
+    def _term_values(self, params: Dict) -> np.ndarray:
+        """
+        Computes the values of all the terms for the given parameter values.
+        :return: array (terms x points)
+        """
+        n = max((np.size(values) for values in params.values()), default=1)
+        values = np.empty((self._n_terms, n))
+        values[:len(self._constants)] = self._constants[:, None]
+        if self._func is not None:
+            completed = _complete_params(params, self._params)  # default values and computed parameters
+            expanded = _filter_param_values(_expand_param_arrays(completed), self._symbols)
+            for i, result in enumerate(self._func(**expanded)):
+                values[len(self._constants) + i] = np.broadcast_to(np.ravel(result), (n,))  # constants are broadcast
+        return values
+
+    def evaluate(self, **params) -> np.ndarray:
+        """
+        Evaluates the impacts of the model.
+        :param params: values of the parameters: single values, or arrays of values (one per point). Parameters not
+        provided take their default value.
+        :return: array (points x methods) of impacts per functional unit
+        """
+        values = self._term_values(params)
+        n = values.shape[1]
+        impacts = np.zeros((len(self.foreground), n, len(self.methods)))
+
+        parents, terms, scales, children = self._bg_entries
+        coefficients = values[terms] * scales[:, None]
+        np.add.at(impacts, parents, coefficients[:, :, None] * self.scores[children][:, None, :])
+        for parents, terms, scales, children in self._fg_entries:  # children are computed before their parents
+            coefficients = values[terms] * scales[:, None]
+            np.add.at(impacts, parents, coefficients[:, :, None] * impacts[children])
+        return impacts[0] / self.functional_unit
+
+    def compute_impacts(self, **params) -> pd.DataFrame:
+        """
+        Evaluates the impacts of the model, as a DataFrame with one column per method (as lca_algebraic's
+        compute_impacts()) and one row per point.
+        """
+        unit = self.functional_unit.units if isinstance(self.functional_unit, Quantity) else None
+        columns = [agb.method_name(method) + "[%s]" % method_unit(method, fu_unit=unit) for method in self.methods]
+        return pd.DataFrame(self.evaluate(**params), columns=columns)
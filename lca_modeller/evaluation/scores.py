@@ -0,0 +1,255 @@
+"""
+Persistent store of the LCIA scores of background activities.
+
+lca_algebraic computes the impacts per unit of the background activities referenced by a model with a full LCA, and
+caches them in a file that is cleared as soon as any database of the project is modified, i.e. at each generation of
+the model. This store keeps the scores of each (database, activity, method) next to the Brightway project, as long as
+the database (and the databases it depends on) and the method are not modified: regenerating the prospective databases
+with premise or importing ecoinvent again invalidates their scores only.
+
+The missing scores are computed in bulk: a single LCA per database (one factorization) for all its activities and
+methods. The scores of biosphere flows are read directly from the characterization factors of the methods.
+"""
+import hashlib
+import json
+import logging
+import os
+import os.path as pth
+import pickle
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import brightway2 as bw
+import lca_algebraic.lca as agb_lca
+from lca_algebraic.database import BIOSPHERE_PREFIX, _isForeground
+
+_LOGGER = logging.getLogger(__name__)
+
+SCORES_FILENAME = "lca_modeller_scores.pickle"
+CALCULATION_SETUP = "lca_modeller_scores"
+
+_original_multiLCAWithCache = agb_lca._multiLCAWithCache
+
+
+def database_fingerprint(db_name: str) -> str:
+    """
+    Fingerprint of a database: its last modification and those of the databases it depends on.
+    """
+    modified = dict()
+    stack = [db_name]
+    while stack:
+        name = stack.pop()
+        if name in modified:
+            continue
+        meta = bw.databases.get(name, {})
+        modified[name] = meta.get('modified')
+        stack.extend(meta.get('depends', []))
+    return hashlib.sha256(json.dumps(modified, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def method_fingerprint(method: Tuple) -> str:
+    """
+    Fingerprint of an LCIA method: its metadata and the last modification of its characterization factors.
+    """
+    content = {'metadata': bw.methods.get(method, {})}
+    filepath = bw.Method(method).filepath_processed()
+    if pth.exists(filepath):
+        content['modified'] = pth.getmtime(filepath)
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ScoreStore:
+    """
+    On-disk store of the LCIA scores of background activities, in the directory of the current Brightway project.
+    """
+
+    def __init__(self):
+        self.filename = pth.join(bw.projects.dir, SCORES_FILENAME)
+        self._data = None
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            self._data = {'databases': {}, 'methods': {}, 'scores': {}}
+            if pth.exists(self.filename):
+                try:
+                    with open(self.filename, "rb") as file:
+                        self._data = pickle.load(file)
+                except Exception as e:
+                    _LOGGER.warning(f"Could not read LCIA scores store {self.filename} ({e}).")
+        return self._data
+
+    def save(self):
+        tmp_filename = f"{self.filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "wb") as file:
+            pickle.dump(self._data, file)
+        os.replace(tmp_filename, self.filename)
+
+    def _invalidate(self, db_names, methods) -> bool:
+        """
+        Removes the scores of the databases and methods that were modified since they were stored, including the
+        stored databases and methods that are not requested, and those that no longer exist.
+        :return: True if scores were removed
+        """
+        stale_dbs, stale_methods = set(), set()
+        for db_name in set(db_names).union(self.data['databases']):
+            if db_name not in bw.databases:
+                stale_dbs.add(db_name)
+                del self.data['databases'][db_name]
+                continue
+            fingerprint = database_fingerprint(db_name)
+            if self.data['databases'].get(db_name) != fingerprint:
+                stale_dbs.add(db_name)
+                self.data['databases'][db_name] = fingerprint
+        for method in set(methods).union(self.data['methods']):
+            if method not in bw.methods:
+                stale_methods.add(method)
+                del self.data['methods'][method]
+                continue
+            fingerprint = method_fingerprint(method)
+            if self.data['methods'].get(method) != fingerprint:
+                stale_methods.add(method)
+                self.data['methods'][method] = fingerprint
+        n_scores = len(self.data['scores'])
+        if stale_dbs or stale_methods:
+            self.data['scores'] = {key: value for key, value in self.data['scores'].items()
+                                   if key[0] not in stale_dbs and key[2] not in stale_methods}
+        return len(self.data['scores']) < n_scores
+
+    def get(self, keys: List[Tuple[str, str]], methods: List[Tuple]) -> Dict[Tuple, float]:
+        """
+        Returns the scores of background activities, computing the missing ones.
+        :param keys: keys (database, code) of the activities or biosphere flows
+        :param methods: LCIA methods
+        :return: dict (key, method) => score
+        """
+        methods = [tuple(method) for method in methods]
+        keys = [tuple(key) for key in keys]
+        pruned = self._invalidate({key[0] for key in keys}, methods)
+        scores = self.data['scores']
+
+        missing = defaultdict(set)  # database => codes with at least one missing score
+        for db_name, code in keys:
+            if any((db_name, code, method) not in scores for method in methods):
+                missing[db_name].add(code)
+        for db_name, codes in missing.items():
+            scores.update(_compute_scores(db_name, sorted(codes), methods))
+        if missing or pruned:
+            try:
+                self.save()
+            except Exception as e:
+                _LOGGER.warning(f"Could not store LCIA scores in {self.filename} ({e}).")
+        return {(key, method): scores[(key[0], key[1], method)] for key in keys for method in methods}
+
+
+def _is_biosphere_database(db_name: str) -> bool:
+    """
+    Whether a database is a biosphere database, whose elements are flows (whatever their type: emission, natural
+    resource, economic...) and not activities: as lca_algebraic, a database whose name contains 'biosphere', or the
+    biosphere database of the Brightway configuration.
+    """
+    return BIOSPHERE_PREFIX in db_name or db_name == bw.config.biosphere
+
+
+def _compute_scores(db_name: str, codes: List[str], methods: List[Tuple]) -> Dict[Tuple, float]:
+    """
+    Computes the scores of activities of a database: characterization factors for the flows of a biosphere database,
+    a single LCA for all the activities and methods otherwise.
+    :return: dict (database, code, method) => score
+    """
+    flows, activities = (codes, []) if _is_biosphere_database(db_name) else ([], codes)
+
+    res = dict()
+    if flows:
+        for method in methods:
+            factors = defaultdict(float)
+            for cf in bw.Method(method).load():
+                amount = cf[1]['amount'] if isinstance(cf[1], dict) else cf[1]
+                factors[tuple(cf[0])] += amount
+            res.update({(db_name, code, method): factors.get((db_name, code), 0.) for code in flows})
+    if activities:
+        print(f"Computing LCIA scores of {len(activities)} activities of database {db_name}")
+        bw.calculation_setups[CALCULATION_SETUP] = {
+            'inv': [{(db_name, code): 1} for code in activities],
+            'ia': methods,
+        }
+        results = bw.MultiLCA(CALCULATION_SETUP).results  # activities x methods
+        del bw.calculation_setups[CALCULATION_SETUP]
+        for iact, code in enumerate(activities):
+            res.update({(db_name, code, method): float(results[iact, imethod])
+                        for imethod, method in enumerate(methods)})
+    return res
+
+
+_STORES = dict()  # project => ScoreStore
+
+
+def background_scores(keys: List[Tuple[str, str]], methods: List[Tuple]) -> Dict[Tuple, float]:
+    """
+    Returns the LCIA scores of background activities and biosphere flows, from the store of the current project.
+    :param keys: keys (database, code) of the activities
+    :param methods: LCIA methods
+    :return: dict (key, method) => score per unit of activity
+    """
+    store = _STORES.get(bw.projects.current)
+    if store is None:
+        store = _STORES[bw.projects.current] = ScoreStore()
+    return store.get(keys, methods)
+
+
+def _background_key(act):
+    """
+    Returns the key of the background activity or biosphere flow behind an activity: the activity itself, or the flow
+    referenced by a proxy of lca_algebraic. None for other foreground activities.
+    """
+    if not _isForeground(act.key[0]):
+        return act.key
+    if "isProxy" in act:
+        inputs = [exc.input.key for exc in act.exchanges() if exc['input'] != exc['output']]
+        if len(inputs) == 1 and not _isForeground(inputs[0][0]):
+            return inputs[0]
+    return None
+
+
+def _stored_multiLCAWithCache(acts, methods):
+    """
+    Replacement of lca_algebraic's _multiLCAWithCache() that reads the scores of background activities from the
+    store.
+    """
+    keys = {act: _background_key(act) for act in acts}
+    others = [act for act, key in keys.items() if key is None]
+    res = _original_multiLCAWithCache(others, methods) if others else {}
+    scores = background_scores([key for key in keys.values() if key is not None], methods)
+    res.update({(act, method): scores[(key, tuple(method))]
+                for act, key in keys.items() if key is not None for method in methods})
+    return res
+
+
+def enable_score_store():
+    """
+    Enables the store of LCIA scores of background activities, until disable_score_store() is called. It is used
+    transparently by lca_algebraic's compute_impacts() and by the functions of lca_modeller that evaluate the model.
+    """
+    agb_lca._multiLCAWithCache = _stored_multiLCAWithCache
+
+
+@contextmanager
+def score_store():
+    """
+    Context manager enabling the store of LCIA scores of background activities in its scope only: the previous
+    function of lca_algebraic is restored on exit.
+    """
+    previous = agb_lca._multiLCAWithCache
+    agb_lca._multiLCAWithCache = _stored_multiLCAWithCache
+    try:
+        yield
+    finally:
+        agb_lca._multiLCAWithCache = previous
+
+
+def disable_score_store():
+    """
+    Disables the store of LCIA scores of background activities.
+    """
+    agb_lca._multiLCAWithCache = _original_multiLCAWithCache
@@ -0,0 +1,197 @@
+"""
+Global sensitivity analysis (Sobol indices) of the models generated by LCAProblemConfigurator.
+
+The parameters vary according to the distributions declared in the section 'parameters_metadata' of the configuration
+file. The samples are drawn from a scrambled Sobol sequence, by batches evaluated in a pool of worker processes.
+The first order and total indices are estimated with the Saltelli and Jansen estimators from running sums, updated as
+the batches are evaluated: the analysis stops as soon as the confidence intervals of all the indices are narrower than
+the requested tolerance.
+"""
+import logging
+import multiprocessing
+import os
+from typing import Dict, List
+
+import lca_algebraic as agb
+import lca_algebraic.lca as agb_lca
+import numpy as np
+import pandas as pd
+from lca_algebraic.params import _param_registry, _variable_params
+from scipy.stats import norm, qmc
+
+from lca_modeller.evaluation.sweep import _evaluate
+
+_LOGGER = logging.getLogger(__name__)
+
+_ANALYSIS = None  # state of the analysis being run, inherited by the worker processes
+_SUMS = ['n', 'sum_a', 'sum_b', 'sum_a2', 'sum_b2', 's1', 's1_sq', 'st', 'st_sq']  # running sums of the estimators
+
+
+class SobolResults:
+    """
+    Sobol indices of the parameters of a model.
+
+    :param s1: first order indices, DataFrame of parameters x methods
+    :param st: total indices, DataFrame of parameters x methods
+    :param s1_conf: half-width of the confidence intervals of the first order indices
+    :param st_conf: half-width of the confidence intervals of the total indices
+    :param n_samples: number of base samples (the model is evaluated n_samples * (number of parameters + 2) times)
+    :param converged: True if the analysis stopped because all the confidence intervals are within the tolerance
+    """
+
+    def __init__(self, s1: pd.DataFrame, st: pd.DataFrame, s1_conf: pd.DataFrame, st_conf: pd.DataFrame,
+                 n_samples: int, converged: bool):
+        self.s1 = s1
+        self.st = st
+        self.s1_conf = s1_conf
+        self.st_conf = st_conf
+        self.n_samples = n_samples
+        self.converged = converged
+
+
+def _sampler(n_params: int, seed: int) -> qmc.Sobol:
+    # Two independent matrices A and B of the Saltelli scheme: 2 dimensions per parameter
+    return qmc.Sobol(d=2 * n_params, scramble=True, seed=seed)
+
+
+def _run_batch(ibatch: int) -> Dict[str, np.ndarray]:
+    """
+    Evaluates a batch of samples and returns its contribution to the running sums. Runs in the worker processes.
+    """
+    analysis = _ANALYSIS
+    names, n = analysis['names'], analysis['batch_size']
+    k = len(names)
+
+    sampler = _sampler(k, analysis['seed'])
+    if ibatch:  # nb: scipy fails to fast-forward a new engine by 0 points
+        sampler.fast_forward(ibatch * n)
+    samples = sampler.random(n)
+    a, b = samples[:, :k], samples[:, k:]
+
+    # Rows of A, B, then A with column i taken from B (AB_i) for each parameter i
+    u = np.vstack([a, b] + [np.where(np.arange(k) == i, b, a) for i in range(k)])
+    registry = _param_registry()
+    params = {name: registry[name].rand(u[:, i]) for i, name in enumerate(names)}
+    params.update(analysis['fixed_params'])
+    y = _evaluate(analysis['lambdas'], params, len(u))  # shape ((k + 2) * n, methods)
+
+    f_a, f_b = y[:n], y[n:2 * n]
+    f_ab = y[2 * n:].reshape(k, n, -1)
+    s1_terms = f_b * (f_ab - f_a)  # Saltelli (2010)
+    st_terms = 0.5 * (f_a - f_ab) ** 2  # Jansen (1999)
+    return {
+        'n': n,
+        'sum_a': f_a.sum(axis=0),
+        'sum_b': f_b.sum(axis=0),
+        'sum_a2': (f_a ** 2).sum(axis=0),
+        'sum_b2': (f_b ** 2).sum(axis=0),
+        's1': s1_terms.sum(axis=1),
+        's1_sq': (s1_terms ** 2).sum(axis=1),
+        'st': st_terms.sum(axis=1),
+        'st_sq': (st_terms ** 2).sum(axis=1),
+    }
+
+
+def _indices(sums: Dict, confidence: float):
+    """
+    Computes the indices and the half-width of their confidence intervals from the running sums.
+    :return: s1, st, s1_conf, st_conf, arrays of shape (parameters, methods)
+    """
+    n = sums['n']
+    mean = (sums['sum_a'] + sums['sum_b']) / (2 * n)
+    variance = (sums['sum_a2'] + sums['sum_b2']) / (2 * n) - mean ** 2
+    z = norm.ppf(0.5 + confidence / 2)
+
+    def estimate(total, total_sq):
+        term_mean = total / n
+        term_std = np.sqrt(np.maximum(total_sq / n - term_mean ** 2, 0.) / n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            index = np.where(variance > 0, term_mean / variance, 0.)  # constant impact: no sensitivity
+            conf = np.where(variance > 0, z * term_std / variance, 0.)
+        return index, conf
+
+    s1, s1_conf = estimate(sums['s1'], sums['s1_sq'])
+    st, st_conf = estimate(sums['st'], sums['st_sq'])
+    return s1, st, s1_conf, st_conf
+
+
+def sobol_analysis(model, methods: List, params: List[str] = None, batch_size: int = 1024,
+                   max_samples: int = 2 ** 17, min_samples: int = 2048, tol: float = 0.02, confidence: float = 0.95,
+                   max_workers: int = None, seed: int = None, functional_unit=1, **fixed_params) -> SobolResults:
+    """
+    Computes the first order and total Sobol indices of the parameters of a model, for each LCIA method.
+    The parameters vary according to their distribution ('distrib', 'min', 'max'... in the section 'parameters_metadata'
+    of the configuration file).
+
+    The base samples are evaluated by batches, in parallel. The indices are updated after each batch, and the analysis
+    stops when the half-width of the confidence intervals of all the indices is below tol (or when max_samples base
+    samples have been evaluated).
+
+    :param model: the model, e.g. returned by LCAProblemConfigurator.generate()
+    :param methods: the LCIA methods
+    :param params: names of the parameters to vary. Defaults to all the parameters of the model that are not fixed.
+    :param batch_size: number of base samples per batch, a power of 2 (balance of the Sobol sequence)
+    :param max_samples: maximum number of base samples
+    :param min_samples: minimum number of base samples before checking the convergence
+    :param tol: maximum half-width of the confidence intervals of the indices
+    :param confidence: confidence level of the intervals
+    :param max_workers: maximum number of worker processes. Defaults to the number of CPUs.
+    :param seed: seed of the scrambling of the Sobol sequence, for reproducible results
+    :param functional_unit: quantity by which impacts are divided, as in lca_algebraic's compute_impacts()
+    :param fixed_params: values of other parameters, fixed during the analysis. Parameters not specified take their
+    default value.
+    :return: the Sobol indices and their confidence intervals
+    """
+    global _ANALYSIS
+    if batch_size & (batch_size - 1):
+        raise ValueError("The batch size must be a power of 2.")
+    if isinstance(methods, tuple):
+        methods = [methods]
+
+    # Compile the impact functions once: the workers inherit them
+    lambdas = agb_lca._preMultiLCAAlgebric(model, methods, alpha=1 / functional_unit)  # possibly from compiled cache
+    if params is None:
+        model_params = {name for lambd in lambdas for name in lambd.params}
+        params = [name for name in _variable_params(sorted(model_params)) if name not in fixed_params]
+    if not params:
+        raise ValueError("No parameter to vary: declare the distribution of the parameters in 'parameters_metadata'.")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 32)
+
+    n_batches = max(max_samples // batch_size, 1)
+    min_batches = max(min_samples // batch_size, 1)
+    sums = None
+    converged = False
+    pool = None
+    _ANALYSIS = dict(lambdas=lambdas, names=params, batch_size=batch_size, seed=seed, fixed_params=fixed_params)
+    print(f"Sobol analysis of {len(params)} parameters: {len(params) + 2} evaluations per sample, "
+          f"up to {n_batches * batch_size} samples")
+    try:
+        max_workers = min(max_workers or os.cpu_count() or 1, n_batches)
+        if max_workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            # Compiled functions cannot be sent to spawned processes: evaluate in the current process
+            results = map(_run_batch, range(n_batches))
+        else:
+            pool = multiprocessing.get_context('fork').Pool(max_workers)
+            results = pool.imap_unordered(_run_batch, range(n_batches))
+
+        for done, batch in enumerate(results, 1):
+            sums = batch if sums is None else {key: sums[key] + batch[key] for key in _SUMS}
+            _, _, s1_conf, st_conf = _indices(sums, confidence)
+            width = max(s1_conf.max(), st_conf.max())
+            print(f"Sobol analysis: {sums['n']} samples, max confidence interval +/- {width:.3f}", end="\r")
+            if done >= min_batches and width <= tol:
+                converged = True
+                break
+        print()
+    finally:
+        if pool is not None:
+            pool.terminate()  # remaining batches are not needed
+            pool.join()
+        _ANALYSIS = None
+
+    if not converged:
+        _LOGGER.warning(f"Sobol indices did not converge within +/- {tol} after {sums['n']} samples.")
+    labels = [agb.method_name(method) for method in methods]
+    frames = [pd.DataFrame(values, index=params, columns=labels) for values in _indices(sums, confidence)]
+    return SobolResults(*frames, n_samples=sums['n'], converged=converged)
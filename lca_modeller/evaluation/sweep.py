@@ -0,0 +1,289 @@
+"""
+Parameter sweeps over the models generated by LCAProblemConfigurator.
+
+The combinations of parameters are split into chunks, evaluated in a pool of worker processes and written to disk
+chunk by chunk, so that the results of the whole sweep are never held in memory. The sampled parameter values are shared
+with the workers in shared memory, but the results come back through the chunk files, not through a shared buffer:
+the chunks are written to disk anyway so that a sweep can be resumed, and a shared buffer of all the results would hold
+the whole sweep in memory.
+A sweep that was interrupted can be resumed: the chunks already on disk are not evaluated again.
+"""
+import glob
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import os.path as pth
+from multiprocessing import shared_memory
+from typing import Dict, List, Union
+
+import brightway2 as bw
+import lca_algebraic as agb
+import numpy as np
+import pandas as pd
+import lca_algebraic.lca as agb_lca
+from lca_algebraic.lca import _filter_param_values
+from lca_algebraic.params import _param_registry, _complete_params
+
+from lca_modeller.evaluation import cache
+from lca_modeller.helpers import _expandParamsVector
+
+_LOGGER = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "sweep.json"
+CHUNK_FILENAME = "chunk_{:06d}.npz"
+CHUNK_PATTERN = "chunk_*.npz"
+INDEX_COLUMN = "index"
+PARAM_PREFIX = "param:"  # prefix of the columns of parameters in chunk files
+
+_SWEEP = None  # state of the sweep being run, inherited by the worker processes
+
+
+class _SharedColumn:
+    """
+    Column of parameter values in shared memory, readable by the worker processes without copy.
+    Enum (string) values are stored as integer codes, -1 for None (default value).
+
+    :param values: values of the parameter, one per sample
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values)
+        self.categories = None
+        if values.dtype.kind in 'USO':
+            missing = pd.isna(values)
+            self.categories, codes = np.unique(values[~missing].astype(str), return_inverse=True)
+            self.categories = list(self.categories)
+            values = np.full(values.shape, -1, dtype=np.int32)
+            values[~missing] = codes
+        else:
+            values = values.astype(float)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self.array = np.ndarray(values.shape, dtype=values.dtype, buffer=self._shm.buf)
+        self.array[:] = values
+
+    def take(self, start: int, stop: int):
+        values = self.array[start:stop]
+        if self.categories is not None:
+            return [self.categories[code] if code >= 0 else None for code in values]
+        return values
+
+    def release(self):
+        self.array = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+class _Grid:
+    """
+    Full factorial grid of parameter values. The combinations are never materialized: the values of a chunk are
+    computed from the indices of its rows.
+
+    :param grid: dict of parameter name => list of values
+    """
+
+    def __init__(self, grid: Dict[str, list]):
+        self.names = list(grid)
+        self.values = [np.asarray(values) for values in grid.values()]
+        self.shape = tuple(len(values) for values in self.values)
+        self.size = math.prod(self.shape)
+
+    def take(self, start: int, stop: int) -> Dict:
+        coords = np.unravel_index(np.arange(start, stop), self.shape)
+        return {name: values[coord] for name, values, coord in zip(self.names, self.values, coords)}
+
+    def fingerprint(self) -> str:
+        return json.dumps({name: values.tolist() for name, values in zip(self.names, self.values)}, default=str)
+
+    def release(self):
+        pass
+
+
+class _Samples:
+    """
+    Explicit list of samples, stored in shared memory.
+
+    :param samples: dict of parameter name => values (all of the same length), or DataFrame with one column per parameter
+    """
+
+    def __init__(self, samples: Union[Dict[str, list], pd.DataFrame]):
+        if isinstance(samples, pd.DataFrame):
+            samples = {name: samples[name].to_numpy() for name in samples.columns}
+        lengths = {len(values) for values in samples.values()}
+        if len(lengths) != 1:
+            raise ValueError("All parameters of the samples must have the same number of values.")
+        self.size = lengths.pop()
+        self.names = list(samples)
+        self._hash = hashlib.sha256()
+        for name, values in samples.items():
+            self._hash.update(name.encode('utf-8'))
+            self._hash.update(np.asarray(values).astype(str).tobytes())
+        self.columns = {name: _SharedColumn(values) for name, values in samples.items()}
+
+    def take(self, start: int, stop: int) -> Dict:
+        return {name: column.take(start, stop) for name, column in self.columns.items()}
+
+    def fingerprint(self) -> str:
+        return self._hash.hexdigest()
+
+    def release(self):
+        for column in self.columns.values():
+            column.release()
+
+
+def _expand_param_arrays(params: Dict) -> Dict[str, np.ndarray]:
+    """
+    Expands the values of the parameters to the variables of the compiled functions, with vectorized operations
+    (one-hot encoding of enum parameters, see helpers.expandParams()). Raises an exception for invalid enum values.
+    """
+    registry = _param_registry()
+    res = dict()
+    for name, values in params.items():
+        param = registry[name]
+        param = {'name': name, 'type': param.type, 'default': param.default, 'values': getattr(param, 'values', None)}
+        res.update(_expandParamsVector(param, np.atleast_1d(values)))
+    return res
+
+
+def _model_fingerprint(model) -> str:
+    """
+    Fingerprint of the model evaluated by a sweep: the fingerprint of the compiled cache if it is enabled (the same for
+    all the generations of the same configuration), the last modification of the database of the model otherwise.
+    """
+    if cache._FINGERPRINT is not None:
+        return cache._FINGERPRINT
+    return str(bw.databases.get(model.key[0], {}).get('modified'))
+
+
+def _evaluate(lambdas, params: Dict, n: int) -> np.ndarray:
+    """
+    Evaluates the compiled impact functions.
+    :return: array of shape (n, number of methods)
+    """
+    res = np.empty((n, len(lambdas)))
+    for imethod, lambd in enumerate(lambdas):
+        completed = _complete_params(params, lambd.params)  # default values and computed parameters
+        expanded = _filter_param_values(_expand_param_arrays(completed), lambd.expanded_params)
+        res[:, imethod] = lambd.lambd(**expanded)  # constant expressions are broadcast
+    return res
+
+
+def _run_chunk(ichunk: int) -> int:
+    """
+    Evaluates a chunk of the sweep and writes it to disk. Runs in the worker processes. The results are returned to
+    the parent process through the chunk file, not through shared memory.
+    """
+    sweep = _SWEEP
+    start = ichunk * sweep['chunk_size']
+    stop = min(start + sweep['chunk_size'], sweep['spec'].size)
+    params = sweep['spec'].take(start, stop)
+    results = _evaluate(sweep['lambdas'], params, stop - start)
+
+    columns = {INDEX_COLUMN: np.arange(start, stop)}
+    # nb: enum values are written as strings ('None' for the default value), object arrays cannot be read without pickle
+    columns.update({PARAM_PREFIX + name: np.asarray(values).astype(str) if np.asarray(values).dtype.kind == 'O'
+                    else np.asarray(values) for name, values in params.items()})
+    columns.update({label: results[:, i] for i, label in enumerate(sweep['labels'])})
+
+    # Write to a temporary file first: a chunk file on disk is always complete
+    filepath = pth.join(sweep['outdir'], CHUNK_FILENAME.format(ichunk))
+    tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_filepath, "wb") as file:
+        np.savez(file, **columns)
+    os.replace(tmp_filepath, filepath)
+    return ichunk
+
+
+def run_sweep(model, methods: List, outdir: str, grid: Dict[str, list] = None,
+              samples: Union[Dict[str, list], pd.DataFrame] = None, chunk_size: int = 10000,
+              max_workers: int = None, functional_unit=1):
+    """
+    Evaluates the impacts of a model over a grid or a list of samples of parameter values, and writes the results to
+    disk, one file of columns (.npz) per chunk. Parameters not specified take their default value.
+
+    If the output directory already contains chunks of the same sweep (e.g. after an interruption), only the missing
+    chunks are evaluated. The sweep is the same if the parameter values, the methods and the model are the same: the
+    chunks of a model generated again from another configuration are not reused.
+
+    :param model: the model, e.g. returned by LCAProblemConfigurator.generate()
+    :param methods: the LCIA methods
+    :param outdir: directory where the results are written
+    :param grid: dict of parameter name => list of values. All combinations of values are evaluated.
+    :param samples: dict of parameter name => values, or DataFrame with one column per parameter. Each row is evaluated.
+    :param chunk_size: number of combinations evaluated at once by a worker
+    :param max_workers: maximum number of worker processes. Defaults to the number of CPUs.
+    :param functional_unit: quantity by which impacts are divided, as in lca_algebraic's compute_impacts()
+    :return: the output directory, to be read with load_sweep()
+    """
+    global _SWEEP
+    if (grid is None) == (samples is None):
+        raise ValueError("Provide either a grid or samples of parameter values.")
+    if isinstance(methods, tuple):
+        methods = [methods]
+
+    # Compile the impact functions once: the workers inherit them
+    lambdas = agb_lca._preMultiLCAAlgebric(model, methods, alpha=1 / functional_unit)  # possibly from compiled cache
+    labels = [agb.method_name(method) for method in methods]
+
+    spec = _Grid(grid) if grid is not None else _Samples(samples)
+    try:
+        n_chunks = math.ceil(spec.size / chunk_size)
+        manifest = {
+            'model': str(model.key),
+            'fingerprint': _model_fingerprint(model),
+            'methods': [str(method) for method in methods],
+            'functional_unit': str(functional_unit),
+            'parameters': hashlib.sha256(spec.fingerprint().encode('utf-8')).hexdigest(),
+            'size': spec.size,
+            'chunk_size': chunk_size,
+        }
+
+        # Resume an interrupted sweep
+        os.makedirs(outdir, exist_ok=True)
+        manifest_path = pth.join(outdir, MANIFEST_FILENAME)
+        if pth.exists(manifest_path):
+            with open(manifest_path) as file:
+                if json.load(file) != manifest:
+                    raise ValueError(f"Directory {outdir} contains the results of another sweep.")
+        else:
+            with open(manifest_path, "w") as file:
+                json.dump(manifest, file, indent=2)
+        remaining = [i for i in range(n_chunks) if not pth.exists(pth.join(outdir, CHUNK_FILENAME.format(i)))]
+        if len(remaining) < n_chunks:
+            print(f"Resuming sweep: {n_chunks - len(remaining)} out of {n_chunks} chunks already evaluated")
+
+        _SWEEP = dict(lambdas=lambdas, labels=labels, spec=spec, outdir=outdir, chunk_size=chunk_size)
+        max_workers = min(max_workers or os.cpu_count() or 1, len(remaining))
+        if max_workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            # Compiled functions cannot be sent to spawned processes: evaluate in the current process
+            for done, ichunk in enumerate(remaining, 1):
+                _run_chunk(ichunk)
+                print(f"Sweep: {done}/{len(remaining)} chunks evaluated", end="\r")
+        else:
+            with multiprocessing.get_context('fork').Pool(max_workers) as pool:
+                for done, ichunk in enumerate(pool.imap_unordered(_run_chunk, remaining), 1):
+                    print(f"Sweep: {done}/{len(remaining)} chunks evaluated", end="\r")
+        print()
+    finally:
+        _SWEEP = None
+        spec.release()
+    return outdir
+
+
+def load_sweep(outdir: str, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Reads the results of a sweep written by run_sweep().
+    :param outdir: output directory of the sweep
+    :param columns: optional list of columns to read (methods, or parameters prefixed with 'param:')
+    :return: DataFrame with one row per combination of parameters, indexed by the position of the combination
+    """
+    frames = []
+    for filepath in sorted(glob.glob(pth.join(outdir, CHUNK_PATTERN))):
+        with np.load(filepath) as chunk:
+            names = columns if columns is not None else [name for name in chunk.files if name != INDEX_COLUMN]
+            frames.append(pd.DataFrame({name: chunk[name] for name in names}, index=chunk[INDEX_COLUMN]))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames).sort_index()
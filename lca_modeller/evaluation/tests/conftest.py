@@ -0,0 +1,28 @@
+"""
+Fixtures of the tests of the evaluation of models.
+"""
+import pytest
+
+
+@pytest.fixture
+def generate(bw_project, tmp_path):
+    """
+    Generates models from synthetic configurations (see lca_modeller.io.tests.synthetic) on fake background databases.
+    Returns a function of the options of the configuration, returning the model and the methods.
+    """
+    pytest.importorskip("lca_algebraic")
+    from lca_modeller.io.configuration import LCAProblemConfigurator
+    from lca_modeller.io.tests.synthetic import install_fake_databases, synthetic_config, write_config
+
+    install_fake_databases(n_activities=20)
+
+    def _generate(n_activities: int = 12, depth: int = 2, switch_groups: int = 1, **options):
+        config = synthetic_config(n_activities=n_activities, depth=depth, switch_groups=switch_groups,
+                                  n_background=20, project=bw_project)
+        config.update(dict(compiled_cache=False, score_store=False), **options)
+        conf_file = str(tmp_path / "config.yaml")
+        write_config(conf_file, config)
+        _, model, methods = LCAProblemConfigurator(conf_file).generate()
+        return model, methods
+
+    return _generate
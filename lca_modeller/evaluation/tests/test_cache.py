@@ -0,0 +1,121 @@
+"""
+Cache of compiled impact functions: the functions loaded from disk give the same impacts as the compiled ones, and are
+not used once the model or its foreground database changed.
+"""
+import os.path as pth
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import brightway2 as bw
+import lca_algebraic as agb
+import lca_algebraic.lca as agb_lca
+
+from lca_modeller.evaluation import cache, compilation
+from lca_modeller.io.configuration import LCAProblemConfigurator
+from lca_modeller.io.tests.synthetic import (BIOSPHERE3_DB_NAME, FAKE_EI_MODEL, FAKE_EI_VERSION, FAKE_METHOD,
+                                             synthetic_config, write_config)
+
+OTHER_METHOD = ('fake method', 'other', 'other indicator')
+EI_DB_NAME = f'ecoinvent-{FAKE_EI_VERSION}-{FAKE_EI_MODEL}'
+PARAMS = dict(p0=[0.7, 1.3], p1=[1.1, 0.9])
+
+
+def _other_method():
+    method = bw.Method(OTHER_METHOD)
+    method.register(unit='kg')
+    method.write([((BIOSPHERE3_DB_NAME, f'flow{j}'), 0.1 * (j % 3)) for j in range(10)])
+    return OTHER_METHOD
+
+
+def _forget_loaded_functions():
+    cache._LOADED.clear()
+    cache._CACHES.clear()
+
+
+@pytest.mark.parametrize("cse", [True, False])
+def test_compiled_cache_round_trip(generate, monkeypatch, cse):
+    _other_method()
+    model, _ = generate(compiled_cache=True, compilation={'cse': cse},
+                        methods=[str(FAKE_METHOD), str(OTHER_METHOD)])
+    methods = [FAKE_METHOD, OTHER_METHOD]
+    compiled = agb.compute_impacts(model, methods, **PARAMS)
+    assert pth.exists(cache.CompiledCache(cache._current_fingerprint()).filename)
+
+    # New process: the functions are read from disk, not compiled again
+    _forget_loaded_functions()
+
+    def _compile(*args, **kwargs):
+        raise AssertionError("compiled again")
+
+    monkeypatch.setattr(compilation, 'compile_model', _compile)
+    loaded = agb.compute_impacts(model, methods, **PARAMS)
+    assert loaded.to_numpy() == pytest.approx(compiled.to_numpy())
+
+
+def test_compiled_cache_invalidated(generate):
+    model, methods = generate(compiled_cache=True)
+    agb.compute_impacts(model, methods)
+    fingerprint = cache._current_fingerprint()
+
+    # Same configuration: same fingerprint. Other configuration: the cached functions are not used.
+    model, methods = generate(compiled_cache=True)
+    assert cache._current_fingerprint() == fingerprint
+    model, methods = generate(compiled_cache=True, n_activities=8)
+    assert cache._current_fingerprint() != fingerprint
+    _forget_loaded_functions()
+    assert cache.CompiledCache(cache._current_fingerprint()).data == {}
+
+
+def test_compiled_cache_foreground_edited(generate):
+    model, methods = generate(compiled_cache=True)
+    before = agb.compute_impacts(model, methods, **PARAMS).to_numpy()
+
+    # Foreground edited by hand, configuration unchanged: compiled again, in this process as in a new one
+    model.new_exchange(input=(EI_DB_NAME, 'act3'), amount=2., type='technosphere').save()
+    after = agb.compute_impacts(model, methods, **PARAMS).to_numpy()
+    assert after != pytest.approx(before)
+    _forget_loaded_functions()
+    assert agb.compute_impacts(model, methods, **PARAMS).to_numpy() == pytest.approx(after)
+
+
+def test_compiled_cache_off_by_default(generate, bw_project, tmp_path):
+    generate()  # fake databases
+    config = synthetic_config(n_activities=12, depth=2, n_background=20, project=bw_project)
+    conf_file = str(tmp_path / "default.yaml")
+    write_config(conf_file, config)
+    _forget_loaded_functions()
+    _, model, methods = LCAProblemConfigurator(conf_file).generate()
+    agb.compute_impacts(model, methods)
+    assert cache._FINGERPRINT is None
+    assert cache._LOADED == {}
+
+
+def test_patch_chain(generate, monkeypatch):
+    compiled = []
+
+    def _compile(*args, **kwargs):
+        compiled.append(args[0].key)
+        return compile_model(*args, **kwargs)
+
+    compile_model = compilation.compile_model
+    monkeypatch.setattr(compilation, 'compile_model', _compile)
+    _forget_loaded_functions()
+
+    # Cache on, twice: lca_algebraic's function is replaced once, and the cache is looked up before compiling
+    for _ in range(2):
+        model, methods = generate(compiled_cache=True)
+        assert agb_lca._preMultiLCAAlgebric is compilation.pre_multi_lca
+        assert compilation._CACHE is cache._cached_compiled_functions
+    agb.compute_impacts(model, methods, **PARAMS)
+    agb.compute_impacts(model, methods, **PARAMS)
+    assert compiled == [model.key]
+
+    # Cache off: same replacement, compiled at each evaluation as by lca_algebraic
+    model, methods = generate(compiled_cache=False)
+    assert agb_lca._preMultiLCAAlgebric is compilation.pre_multi_lca
+    assert compilation._CACHE is None
+    agb.compute_impacts(model, methods, **PARAMS)
+    agb.compute_impacts(model, methods, **PARAMS)
+    assert compiled == [model.key] * 3
@@ -0,0 +1,56 @@
+"""
+Shared compiled function: the outputs are computed once per parameter values, including when the functions of the
+methods are called from several threads, as lca_algebraic does.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+from lca_modeller.evaluation.compilation import _SharedOutputs
+
+
+def _shared_outputs():
+    calls = []
+
+    def func(a, b):
+        calls.append((a.copy(), b))
+        time.sleep(0.01)  # leaves time to the other threads to call the function with the same values
+        return [a * b, a + b, a - b]
+
+    return _SharedOutputs(func), calls
+
+
+def test_shared_outputs_computed_once():
+    shared, calls = _shared_outputs()
+    a = np.array([1., 2.])
+    np.testing.assert_allclose(shared.output([0])(a=a, b=3.), [3., 6.])
+    np.testing.assert_allclose(shared.output([1, 2])(a=a, b=3.), [2., 4.])
+    assert len(calls) == 1
+
+    np.testing.assert_allclose(shared.output([0])(a=a, b=4.), [4., 8.])
+    assert len(calls) == 2
+
+
+def test_shared_outputs_threads():
+    shared, calls = _shared_outputs()
+    funcs = [shared.output([i]) for i in range(3)]
+
+    def evaluate(b):
+        # All the methods with the same values, concurrently, as lca_algebraic's _postMultiLCAAlgebric()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            return list(executor.map(lambda func: func(a=np.array([1., 2.]), b=b), funcs))
+
+    for b in (3., 4., 3.):
+        results = evaluate(b)
+        np.testing.assert_allclose(results, [[b, 2 * b], [1 + b, 2 + b], [1 - b, 2 - b]])
+    assert [b for _, b in calls] == [3., 4., 3.]
+
+    # Different values from different threads: each call gets the results of its own values
+    values = [1., 2., 3., 4.] * 5
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda b: funcs[0](a=np.array([1., 2.]), b=b), values))
+    np.testing.assert_allclose(results, [[b, 2 * b] for b in values])
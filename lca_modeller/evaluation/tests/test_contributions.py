@@ -0,0 +1,49 @@
+"""
+Contributions of the activities of a model: the contribution of the model itself is its impact, as computed by
+lca_algebraic's compute_impacts().
+"""
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import lca_algebraic as agb
+
+from lca_modeller.evaluation.contributions import clear_contributions_cache, process_contributions
+from lca_modeller.io.tests.synthetic import N_PARAMETERS
+
+
+def _switch_param():
+    return next(param for name, param in agb.params._param_registry().items() if name.endswith('_switch_param'))
+
+
+def _fixed_p0_metadata():
+    metadata = [{'parameter': f'p{k}', 'default': 1., 'min': 0.5, 'max': 1.5} for k in range(N_PARAMETERS)]
+    metadata[0].update(default=0.8, distrib=agb.DistributionType.FIXED)
+    return metadata
+
+
+def _total(model, contributions):
+    return contributions.loc[contributions['key'] == model.key, 'impact'].item()
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    yield
+    clear_contributions_cache()
+
+
+def test_contributions_match_compute_impacts(generate):
+    model, methods = generate()
+    for params in [dict(), dict(p0=1.3, p1=0.6), dict(p2=1.2, **{_switch_param().name: _switch_param().values[1]})]:
+        contributions = process_contributions(model, methods[0], **params)
+        expected = agb.compute_impacts(model, methods, **params).iloc[0, 0]
+        assert _total(model, contributions) == pytest.approx(expected)
+        assert contributions['share'].max() <= 1. + 1e-9
+
+
+def test_contributions_fixed_params(generate):
+    model, methods = generate(parameters_metadata=_fixed_p0_metadata())
+
+    # As lca_algebraic, fixed parameters take their default value
+    expected = agb.compute_impacts(model, methods).iloc[0, 0]
+    assert _total(model, process_contributions(model, methods[0], p0=1.4)) == pytest.approx(expected)
@@ -0,0 +1,40 @@
+"""
+Linear model: same impacts as lca_algebraic's compute_impacts(), for many points at once.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import lca_algebraic as agb
+
+from lca_modeller.evaluation.linear import LinearModel
+from lca_modeller.evaluation.tests.test_cache import _other_method
+from lca_modeller.evaluation.tests.test_contributions import _fixed_p0_metadata, _switch_param
+from lca_modeller.io.tests.synthetic import FAKE_METHOD
+
+
+def test_linear_model_matches_compute_impacts(generate):
+    other_method = _other_method()
+    model, _ = generate(methods=[str(FAKE_METHOD), str(other_method)])
+    methods = [FAKE_METHOD, other_method]
+    switch = _switch_param()
+    params = {'p0': [0.6, 1., 1.4, 0.9], 'p1': 1.2, switch.name: [switch.values[0], switch.values[1], None,
+                                                                   switch.values[0]]}
+
+    linear = LinearModel(model, methods, functional_unit=2.)
+    expected = agb.compute_impacts(model, methods, functional_unit=2., **params)
+    results = linear.compute_impacts(**params)
+    assert list(results.columns) == list(expected.columns)
+    np.testing.assert_allclose(results.to_numpy(), expected.to_numpy())
+
+    # Default values
+    np.testing.assert_allclose(linear.evaluate(), agb.compute_impacts(model, methods, functional_unit=2.).to_numpy())
+
+
+def test_linear_model_fixed_params(generate):
+    model, methods = generate(parameters_metadata=_fixed_p0_metadata())
+
+    # As lca_algebraic, fixed parameters take their default value
+    expected = agb.compute_impacts(model, methods, p1=[0.7, 1.3])
+    np.testing.assert_allclose(LinearModel(model, methods).evaluate(p0=1.4, p1=[0.7, 1.3]), expected.to_numpy())
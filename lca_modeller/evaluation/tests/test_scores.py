@@ -0,0 +1,125 @@
+"""
+Store of LCIA scores of background activities: same scores as an LCA, invalidated when a database or a method is
+modified, and used by lca_algebraic only when enabled.
+"""
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import brightway2 as bw
+import lca_algebraic.lca as agb_lca
+
+from lca_modeller.evaluation import scores
+from lca_modeller.io.configuration import LCAProblemConfigurator
+from lca_modeller.io.tests.synthetic import (BIOSPHERE3_DB_NAME, FAKE_EI_MODEL, FAKE_EI_VERSION, FAKE_METHOD,
+                                             install_fake_databases, synthetic_config, write_config)
+
+EI_DB_NAME = f'ecoinvent-{FAKE_EI_VERSION}-{FAKE_EI_MODEL}'
+KEYS = [(EI_DB_NAME, 'act3'), (EI_DB_NAME, 'act8'), (BIOSPHERE3_DB_NAME, 'flow2')]
+
+
+@pytest.fixture
+def computed(bw_project, monkeypatch):
+    """
+    Fake databases and an empty store. Returns the list of (database, codes) whose scores are computed.
+    """
+    install_fake_databases(n_activities=20)
+    monkeypatch.setattr(scores, '_STORES', dict())
+    calls = []
+
+    def _compute_scores(db_name, codes, methods):
+        calls.append((db_name, tuple(codes)))
+        return original(db_name, codes, methods)
+
+    original = scores._compute_scores
+    monkeypatch.setattr(scores, '_compute_scores', _compute_scores)
+    return calls
+
+
+def _lca_score(key):
+    lca = bw.LCA({key: 1}, FAKE_METHOD)
+    lca.lci()
+    lca.lcia()
+    return lca.score
+
+
+def test_scores_match_lca(computed):
+    results = scores.background_scores(KEYS, [FAKE_METHOD])
+    for key in KEYS[:2]:
+        assert results[(key, FAKE_METHOD)] == pytest.approx(_lca_score(key))
+    assert results[(KEYS[2], FAKE_METHOD)] == 3.  # characterization factor of flow2
+    assert sorted(computed) == [(BIOSPHERE3_DB_NAME, ('flow2',)), (EI_DB_NAME, ('act3', 'act8'))]
+
+    # Stored: not computed again, including by a new process
+    scores.background_scores(KEYS, [FAKE_METHOD])
+    scores._STORES.clear()
+    assert scores.background_scores(KEYS, [FAKE_METHOD]) == results
+    assert len(computed) == 2
+
+
+def test_flows_classified_by_database(computed):
+    # A flow of the biosphere database is scored by its characterization factor, whatever its type
+    flow = bw.get_activity((BIOSPHERE3_DB_NAME, 'flow2'))
+    flow['type'] = 'economic'
+    flow.save()
+    assert scores.background_scores([flow.key], [FAKE_METHOD])[(flow.key, FAKE_METHOD)] == 3.
+
+
+def test_scores_invalidated_by_database(computed):
+    before = scores.background_scores(KEYS, [FAKE_METHOD])
+    act = bw.get_activity((EI_DB_NAME, 'act3'))
+    exc = next(iter(act.biosphere()))
+    exc['amount'] *= 2
+    exc.save()
+
+    after = scores.background_scores(KEYS, [FAKE_METHOD])
+    assert after[(KEYS[0], FAKE_METHOD)] == pytest.approx(_lca_score(KEYS[0]))
+    assert after[(KEYS[0], FAKE_METHOD)] > before[(KEYS[0], FAKE_METHOD)]
+    assert computed[2:] == [(EI_DB_NAME, ('act3', 'act8'))]  # the scores of the biosphere flows are kept
+
+
+def test_scores_invalidated_by_method(computed):
+    scores.background_scores(KEYS, [FAKE_METHOD])
+    method = bw.Method(FAKE_METHOD)
+    method.write([((BIOSPHERE3_DB_NAME, f'flow{j}'), 2. * (1. + j)) for j in range(10)])
+
+    after = scores.background_scores(KEYS, [FAKE_METHOD])
+    assert after[(KEYS[2], FAKE_METHOD)] == 6.
+    assert after[(KEYS[0], FAKE_METHOD)] == pytest.approx(_lca_score(KEYS[0]))
+    assert len(computed) == 4
+
+
+def test_scores_pruned(computed):
+    other_method = ('fake method', 'other', 'other indicator')
+    method = bw.Method(other_method)
+    method.register(unit='kg')
+    method.write([((BIOSPHERE3_DB_NAME, 'flow2'), 1.)])
+    scores.background_scores(KEYS, [FAKE_METHOD, other_method])
+
+    # Deleted method: its scores are removed from the store on disk, even if it is not requested
+    method.deregister()
+    scores.background_scores(KEYS, [FAKE_METHOD])
+    scores._STORES.clear()
+    stored = scores.ScoreStore().data
+    assert {key[2] for key in stored['scores']} == {FAKE_METHOD}
+    assert other_method not in stored['methods']
+
+
+def test_score_store_scoped(bw_project, tmp_path):
+    install_fake_databases(n_activities=20)
+    config = synthetic_config(n_activities=12, depth=2, n_background=20, project=bw_project)
+    conf_file = str(tmp_path / "config.yaml")
+    write_config(conf_file, config)
+    LCAProblemConfigurator(conf_file).generate()
+    assert agb_lca._multiLCAWithCache is scores._original_multiLCAWithCache  # off by default
+
+    with scores.score_store():
+        assert agb_lca._multiLCAWithCache is scores._stored_multiLCAWithCache
+    assert agb_lca._multiLCAWithCache is scores._original_multiLCAWithCache
+
+    # Restores the previous function, even on error
+    scores.enable_score_store()
+    with pytest.raises(KeyError):
+        with scores.score_store():
+            raise KeyError()
+    assert agb_lca._multiLCAWithCache is scores._stored_multiLCAWithCache
@@ -0,0 +1,63 @@
+"""
+Sobol analysis: indices of a model whose impact is an analytic function of its parameters.
+"""
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import lca_algebraic as agb
+
+from lca_modeller.evaluation.sensitivity import sobol_analysis
+from lca_modeller.io.tests.synthetic import LOCATION, fake_activity_name
+
+# x1, x2 uniform on [0, 2]: mean 1, variance 1/3
+MEAN, VARIANCE = 1., 1 / 3
+MODEL = {
+    'act_x1': {'name': fake_activity_name(3), 'loc': LOCATION, 'amount': 'x1'},
+    'act_x2': {'name': fake_activity_name(8), 'loc': LOCATION, 'amount': 'x2'},
+    'act_x1_x2': {'name': fake_activity_name(5), 'loc': LOCATION, 'amount': '6 * x1 * x2'},
+}
+METADATA = [{'parameter': name, 'default': 1., 'min': 0., 'max': 2., 'distrib': agb.DistributionType.LINEAR}
+            for name in ('x1', 'x2')]
+
+
+def _analytic_indices(model, methods):
+    """
+    Indices of f = c1 x1 + c2 x2 + c3 x1 x2, with independent x1, x2.
+    """
+    f = agb.compute_impacts(model, methods, x1=[1., 0., 1.], x2=[0., 1., 1.]).to_numpy()[:, 0]
+    c1, c2 = f[0], f[1]
+    c3 = f[2] - c1 - c2
+    v1 = (c1 + c3 * MEAN) ** 2 * VARIANCE
+    v2 = (c2 + c3 * MEAN) ** 2 * VARIANCE
+    v12 = c3 ** 2 * VARIANCE ** 2
+    total = v1 + v2 + v12
+    return dict(x1=v1 / total, x2=v2 / total), dict(x1=(v1 + v12) / total, x2=(v2 + v12) / total)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_sobol_analytic_function(generate, max_workers):
+    model, methods = generate(model=MODEL, parameters_metadata=METADATA)
+    s1, st = _analytic_indices(model, methods)
+    assert st['x1'] - s1['x1'] > 0.05  # interaction between x1 and x2
+
+    results = sobol_analysis(model, methods, batch_size=1024, min_samples=4096, tol=0.02, max_workers=max_workers,
+                             seed=42)
+    assert results.converged
+    assert sorted(results.s1.index) == ['x1', 'x2']
+    label = agb.method_name(methods[0])
+    for name in ('x1', 'x2'):
+        assert results.s1.loc[name, label] == pytest.approx(s1[name], abs=0.02)
+        assert results.st.loc[name, label] == pytest.approx(st[name], abs=0.02)
+
+
+def test_sobol_fixed_params(generate):
+    model, methods = generate(model=MODEL, parameters_metadata=METADATA)
+
+    # x2 fixed: x1 explains all the variance
+    results = sobol_analysis(model, methods, batch_size=512, min_samples=1024, max_samples=2 ** 13, max_workers=1,
+                             seed=0, x2=1.2)
+    label = agb.method_name(methods[0])
+    assert list(results.s1.index) == ['x1']
+    assert results.s1.loc['x1', label] == pytest.approx(1., abs=0.02)
+    assert results.st.loc['x1', label] == pytest.approx(1., abs=0.02)
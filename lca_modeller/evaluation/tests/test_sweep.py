@@ -0,0 +1,89 @@
+"""
+Parameter sweeps: same results as lca_algebraic's compute_impacts(), resumed after an interruption.
+"""
+import os
+import os.path as pth
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import lca_algebraic as agb
+
+from lca_modeller.evaluation.sweep import CHUNK_FILENAME, load_sweep, run_sweep
+
+
+def _switch_param():
+    return next(param for name, param in agb.params._param_registry().items() if name.endswith('_switch_param'))
+
+
+def _grid():
+    switch = _switch_param()
+    return {'p0': [0.5, 1., 1.5], 'p1': [0.8, 1.2], switch.name: switch.values}
+
+
+def _expected(model, methods, results):
+    params = {name[len('param:'):]: results[name].tolist() for name in results.columns if name.startswith('param:')}
+    return agb.compute_impacts(model, methods, **params).to_numpy()
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_sweep_matches_compute_impacts(generate, tmp_path, max_workers):
+    model, methods = generate()
+    outdir = run_sweep(model, methods, str(tmp_path / "sweep"), grid=_grid(), chunk_size=4, max_workers=max_workers)
+
+    results = load_sweep(outdir)
+    assert len(results) == 3 * 2 * len(_switch_param().values)
+    assert list(results.index) == list(range(len(results)))
+    labels = [agb.method_name(method) for method in methods]
+    np.testing.assert_allclose(results[labels].to_numpy(), _expected(model, methods, results))
+
+
+def test_sweep_samples(generate, tmp_path):
+    model, methods = generate()
+    switch = _switch_param()
+    samples = {'p0': [0.6, 0.9, 1.4], switch.name: [switch.values[1], None, switch.values[0]]}
+    results = load_sweep(run_sweep(model, methods, str(tmp_path / "sweep"), samples=samples, chunk_size=2,
+                                   max_workers=1))
+
+    assert results['param:' + switch.name].tolist() == [switch.values[1], 'None', switch.values[0]]
+    expected = agb.compute_impacts(model, methods, **samples)  # None: no value of the enum parameter selected
+    np.testing.assert_allclose(results[agb.method_name(methods[0])].to_numpy(), expected.to_numpy()[:, 0])
+
+
+def test_sweep_invalid_enum_value(generate, tmp_path):
+    model, methods = generate()
+    with pytest.raises(Exception, match="Invalid value"):
+        run_sweep(model, methods, str(tmp_path / "sweep"), samples={_switch_param().name: ['unknown']}, max_workers=1)
+
+
+def test_sweep_resume(generate, tmp_path):
+    model, methods = generate()
+    outdir = str(tmp_path / "sweep")
+    run_sweep(model, methods, outdir, grid=_grid(), chunk_size=4, max_workers=1)
+    results = load_sweep(outdir)
+
+    # Interrupted sweep: a chunk is missing, the others must not be evaluated again
+    os.remove(pth.join(outdir, CHUNK_FILENAME.format(1)))
+    mtimes = {i: os.stat(pth.join(outdir, CHUNK_FILENAME.format(i))).st_mtime_ns for i in (0, 2)}
+    run_sweep(model, methods, outdir, grid=_grid(), chunk_size=4, max_workers=1)
+
+    assert pth.exists(pth.join(outdir, CHUNK_FILENAME.format(1)))
+    assert {i: os.stat(pth.join(outdir, CHUNK_FILENAME.format(i))).st_mtime_ns for i in (0, 2)} == mtimes
+    pd.testing.assert_frame_equal(load_sweep(outdir), results)
+
+
+def test_sweep_not_resumed_for_another_sweep(generate, tmp_path):
+    model, methods = generate()
+    outdir = str(tmp_path / "sweep")
+    run_sweep(model, methods, outdir, grid={'p0': [0.5, 1.]}, max_workers=1)
+
+    with pytest.raises(ValueError, match="another sweep"):
+        run_sweep(model, methods, outdir, grid={'p0': [0.5, 1.5]}, max_workers=1)
+
+    # Same parameters, but the model is generated again from another configuration
+    model, methods = generate(n_activities=8)
+    with pytest.raises(ValueError, match="another sweep"):
+        run_sweep(model, methods, outdir, grid={'p0': [0.5, 1.]}, max_workers=1)
@@ -1,35 +1,75 @@
 """
 Plots for life cycle assessments interpretation
 """
-from pyvis.network import Network
+import json
 import os
-from IPython.display import display, HTML, IFrame
 from lca_algebraic.activity import Activity
-from lca_modeller.helpers import list_processes
-import matplotlib
-import matplotlib.pyplot as plt
+from lca_modeller.helpers import list_processes, format_number
 
 USER_DB = 'Foreground DB'
 default_process_tree_filename = 'process_tree.html'
+DEFAULT_MAX_NODES = 300  # above this number of activities, process_tree switches to the level-of-detail view
+NODE_SPACING = 250  # horizontal distance between two leaves of the tree, in pixels
+LEVEL_SPACING = 150  # vertical distance between two levels of the tree, in pixels
+FONT_SIZES = (14, 40)  # font size of the nodes with no contribution and with the whole impact, in impact-weighted trees
 
 
 def process_tree(model: Activity,
                  foreground_only: bool = True,
                  outfile: str = default_process_tree_filename,
-                 colormap: str = 'Pastel2'):
+                 colormap: str = 'Pastel2',
+                 formula_rendering: str = 'factored',
+                 max_levels: int = None,
+                 max_nodes: int = DEFAULT_MAX_NODES,
+                 method=None,
+                 parameters: dict = None,
+                 contribution_cutoff: float = None,
+                 impact_colormap: str = 'YlOrRd'):
     """
     Plots an interactive tree to visualize the activities and exchanges declared in the LCA module.
+
+    Large trees (more than max_nodes activities, or if max_levels is provided) are rendered in a level-of-detail view:
+    only the top levels are displayed, and the subtrees below are collapsed into aggregate nodes, labelled with the
+    number of hidden activities, which are expanded (or collapsed again) by a double click. The layout of the whole
+    tree is computed once in Python, and the hidden part of the tree is embedded in the HTML file as a JSON payload.
+
     :param model: The model containing activities and exchanges.
     :param foreground_only: Boolean flag to include only foreground activities.
     :param outfile: Output filename for the generated tree.
     :param colormap: Colormap to use for node coloring.
+    :param formula_rendering: Rendering of the amounts defined by a formula: 'raw', 'simplified' or 'factored'.
+    :param max_levels: Number of levels displayed initially in the level-of-detail view. Defaults to all levels that fit
+    within max_nodes.
+    :param max_nodes: Maximum number of nodes displayed at once. None for no limit.
+    :param method: LCIA method. If provided, the nodes are sized and colored by the contribution of the activity (and
+    its sub-activities) to the impact of the model, computed for all nodes at once (see process_contributions()).
+    :param parameters: values of the parameters for the contributions. Parameters not provided take their default value.
+    :param contribution_cutoff: branches whose contribution is lower than this fraction of the total impact (in absolute
+    value) are hidden. Only with method.
+    :param impact_colormap: Colormap to use for node coloring by contribution.
     """
-    # Init network
-    net = Network(notebook=True, directed=True, layout=True, cdn_resources='remote', filter_menu=False)
+    # The plotting stack is only imported when a plot is requested
+    from pyvis.network import Network
+    from IPython.display import display, IFrame
+    import matplotlib
+    import matplotlib.pyplot as plt
 
     # Get processes hierarchy
-    df = list_processes(model, foreground_only)
+    df, exchanges = list_processes(model, foreground_only, flat=True, formula_rendering=formula_rendering)
     df['description'] = df['activity'] + '\n' + df['unit'].fillna('')
+    if method is not None:
+        from lca_modeller.evaluation.contributions import process_contributions
+        contributions = process_contributions(model, method, **(parameters or {}))
+        df['impact'] = df['key'].map(dict(zip(contributions['key'], contributions['impact'])))
+        df['share'] = df['key'].map(dict(zip(contributions['key'], contributions['share'])))
+        if contribution_cutoff:
+            df, exchanges = _cut_branches(df, exchanges, df['share'].abs() >= contribution_cutoff)
+        shares = (100 * df['share']).round(1).astype(str)
+        df['description'] += '\n' + df['impact'].apply(format_number) + ' (' + shares + ' %)'
+    level_of_detail = max_levels is not None or (max_nodes is not None and len(df) > max_nodes)
+
+    # Init network
+    net = Network(notebook=True, directed=True, layout=not level_of_detail, cdn_resources='remote', filter_menu=False)
 
     # Colors
     unique_values = df['database'].unique()
@@ -37,28 +77,32 @@ def process_tree(model: Activity,
     norm = matplotlib.colors.Normalize(vmin=0, vmax=len(unique_values), clip=True)
     mapper = plt.cm.ScalarMappable(norm=norm, cmap=plt.get_cmap(colormap))
     colors = df['database'].apply(lambda x: matplotlib.colors.to_hex(mapper.to_rgba(value_indices[x])))
+    styles = [{} for _ in range(len(df))]
+    if method is not None:  # color and size by contribution
+        shares = df['share'].abs().fillna(0.).clip(upper=1.)
+        norm = matplotlib.colors.Normalize(vmin=0, vmax=1)
+        mapper = plt.cm.ScalarMappable(norm=norm, cmap=plt.get_cmap(impact_colormap))
+        colors = shares.apply(lambda x: matplotlib.colors.to_hex(mapper.to_rgba(x)))
+        styles = [{'font': {'size': FONT_SIZES[0] + (FONT_SIZES[1] - FONT_SIZES[0]) * share}} for share in shares]
 
     # Populate network
-    edge_data = zip(df['activity'], df['description'], df['parents'], df['amounts'], df['level'], df['database'], colors)
+    node_data = zip(df['activity'], df['description'], df['level'], df['database'], colors, styles)
+    node_names = []
+    for activity, description, level, database, color, style in node_data:
+        src = activity if database == USER_DB else f"{activity}\n[{database}]"
+        node_names.append(src)
+        if not level_of_detail:
+            net.add_node(src, description, title=src, level=level + 1, shape='box', color=color, **style)
+
+    if level_of_detail:
+        _level_of_detail_tree(net, df, exchanges, node_names, list(colors), outfile, max_levels, max_nodes, styles)
+        display(IFrame(src=os.path.relpath(outfile), width="100%", height=700))
+        return
 
     edges = {}
-    for activity, description, parents, amounts, level, database, color in edge_data:
-        src = activity if database == USER_DB else f"{activity}\n[{database}]"
-        #desc_array = description.split(',')
-        #desc_db = description.split('(')
-        #desc = ',\n'.join(desc_array[:2]) if len(desc_array) > 1 else desc_array[0]
-        #desc += f"\n({desc_db[-1]}" if len(desc_db) > 1 else ''
-        desc = description
-
-        net.add_node(src, desc, title=src, level=level + 1, shape='box', color=color)
-
-        for parent, amount in zip(parents, amounts):
-            if parent:
-                edge_key = (src, parent)
-                if edge_key in edges:  # Multiple edges between the same nodes
-                    edges[edge_key].append(str(amount))
-                else:  # first time edge links act and its parent: create new node for parent
-                    edges[edge_key] = [str(amount)]
+    for child, parent, amount in zip(exchanges['child'], exchanges['parent'], exchanges['amount']):
+        # Multiple edges between the same nodes are grouped
+        edges.setdefault((node_names[child], node_names[parent]), []).append(str(amount))
 
     # Add edges to the network with unique labels
     for (src, dst), labels in edges.items():
@@ -86,3 +130,175 @@ def process_tree(model: Activity,
 
 
 
+
+
+def _cut_branches(df, exchanges, keep):
+    """
+    Removes the nodes that are not kept, together with their subtrees (in the spanning tree of the traversal of
+    list_processes(): a node is removed if the parent it was reached by is removed).
+    :return: the nodes and exchanges tables of the remaining tree, with node ids renumbered
+    """
+    keep = list(keep)
+    keep[0] = True  # the top-level activity is always displayed
+    reached = set()
+    for child, parent in zip(exchanges['child'], exchanges['parent']):
+        if child not in reached:
+            reached.add(child)
+            keep[child] = keep[child] and keep[parent]  # parents have lower ids: already decided
+    new_ids = {old: new for new, old in enumerate(i for i, kept in enumerate(keep) if kept)}
+    df = df[keep].reset_index(drop=True)
+    exchanges = exchanges[exchanges['child'].isin(new_ids) & exchanges['parent'].isin(new_ids)]
+    exchanges = exchanges.assign(child=exchanges['child'].map(new_ids), parent=exchanges['parent'].map(new_ids))
+    return df, exchanges.reset_index(drop=True)
+
+
+def _tree_layout(parents: list, levels: list):
+    """
+    Computes the positions of the nodes of a tree, parents centered above their children.
+    :param parents: id of the parent of each node in the tree (-1 for the root). Nodes are in depth-first order.
+    :param levels: level of each node
+    :return: the lists of x and y coordinates of the nodes, and the children of each node
+    """
+    children = [[] for _ in parents]
+    for node, parent in enumerate(parents):
+        if parent >= 0:
+            children[parent].append(node)
+    x = [0.] * len(parents)
+    next_leaf = 0
+    # Leaves are placed from left to right in depth-first order, then parents are centered above them
+    for node in range(len(parents)):
+        if not children[node]:
+            x[node] = next_leaf * NODE_SPACING
+            next_leaf += 1
+    for node in reversed(range(len(parents))):  # children are after their parent in depth-first order
+        if children[node]:
+            x[node] = (x[children[node][0]] + x[children[node][-1]]) / 2
+    y = [level * LEVEL_SPACING for level in levels]
+    return x, y, children
+
+
+def _level_of_detail_tree(net, df, exchanges, node_names: list, colors: list, outfile: str, max_levels: int = None,
+                          max_nodes: int = None, styles: list = None):
+    """
+    Writes the level-of-detail view of the process tree: the top levels of the tree, and a JSON payload with the
+    whole tree, from which the collapsed subtrees are expanded in the browser.
+    The tree is the spanning tree of the traversal of list_processes(): an activity used by several parents is placed
+    under the first one, and the exchanges with the other parents are drawn when both ends are displayed.
+    """
+    n = len(df)
+    parents = [-1] * n
+    for child, parent in zip(exchanges['child'], exchanges['parent']):
+        if parents[child] < 0 and child != 0:
+            parents[child] = parent  # first exchange of an activity: the one it was reached by
+    levels = list(df['level'])
+    x, y, children = _tree_layout(parents, levels)
+
+    # Descendants of each node in the tree, to label aggregate nodes
+    descendants = [0] * n
+    for node in reversed(range(n)):
+        if parents[node] >= 0:
+            descendants[parents[node]] += descendants[node] + 1
+
+    # Exchanges grouped by pair of nodes, from the child to the parent as in the full view
+    labels = {}
+    for child, parent, amount in zip(exchanges['child'], exchanges['parent'], exchanges['amount']):
+        labels.setdefault((child, parent), []).append(str(amount))
+    edges = [dict(id=f"{child}-{parent}", **{'from': child, 'to': parent}, label="\n".join(amounts),
+                  title="\n".join(f"Exch. {i + 1}: {amount}" for i, amount in enumerate(amounts)))
+             for (child, parent), amounts in labels.items()]
+
+    # Initial view: breadth-first from the top, within the limits of levels and nodes
+    visible = [0]
+    for node in visible:  # the list grows while iterated
+        if max_levels is not None and levels[node] + 1 >= max_levels:
+            continue
+        if max_nodes is not None and len(visible) + len(children[node]) > max_nodes:
+            continue
+        visible.extend(children[node])
+    visible = set(visible)
+
+    nodes = [dict(id=node, label=df['description'][node], title=node_names[node], x=x[node], y=y[node],
+                  shape='box', color=colors[node], physics=False, **(styles[node] if styles else {}))
+             for node in range(n)]
+    payload = dict(nodes=nodes, edges=edges, children=children, descendants=descendants,
+                   max_nodes=max_nodes, visible=sorted(visible))
+
+    for node in sorted(visible):
+        net.add_node(**_collapsed(nodes[node], children[node], descendants[node], visible))
+    for edge in edges:
+        if edge['from'] in visible and edge['to'] in visible:
+            net.add_edge(edge['from'], edge['to'], id=edge['id'], label=edge['label'], title=edge['title'])
+    net.toggle_physics(False)
+
+    html = net.generate_html(notebook=True)
+    script = _LEVEL_OF_DETAIL_SCRIPT.replace("__PAYLOAD__", json.dumps(payload))
+    with open(outfile, "w") as file:
+        file.write(html.replace("</body>", script + "\n</body>"))
+
+
+def _collapsed(node: dict, children: list, descendants: int, visible: set) -> dict:
+    """
+    Returns the options of a node of the level-of-detail view: an aggregate node if some of its children are hidden.
+    """
+    node = dict(node, n_id=node['id'])
+    del node['id']
+    if any(child not in visible for child in children):
+        node.update(label=f"{node['label']}\n[+{descendants}]", shapeProperties={'borderDashes': True})
+    return node
+
+
+# Expansion and collapse of the aggregate nodes, in the HTML page generated by pyvis (global 'nodes' and 'edges')
+_LEVEL_OF_DETAIL_SCRIPT = """<script type="text/javascript">
+var lod = __PAYLOAD__;
+var lodVisible = new Set(lod.visible);
+
+function lodNode(id) {
+    var node = Object.assign({}, lod.nodes[id]);
+    var hidden = lod.children[id].some(function (child) { return !lodVisible.has(child); });
+    if (hidden) {
+        node.label = node.label + "\\n[+" + lod.descendants[id] + "]";
+        node.shapeProperties = {borderDashes: true};
+    } else {
+        node.shapeProperties = {borderDashes: false};
+    }
+    return node;
+}
+
+function lodRefreshEdges() {
+    var shown = lod.edges.filter(function (e) { return lodVisible.has(e.from) && lodVisible.has(e.to); });
+    edges.clear();
+    edges.add(shown.map(function (e) { return Object.assign({arrows: "to"}, e); }));
+}
+
+function lodExpand(id) {
+    var hidden = lod.children[id].filter(function (child) { return !lodVisible.has(child); });
+    if (lod.max_nodes !== null) {
+        hidden = hidden.slice(0, Math.max(lod.max_nodes - lodVisible.size, 0));
+    }
+    hidden.forEach(function (child) { lodVisible.add(child); });
+    nodes.update([id].concat(hidden).map(lodNode));
+}
+
+function lodCollapse(id) {
+    var stack = lod.children[id].slice();
+    var removed = [];
+    while (stack.length) {
+        var node = stack.pop();
+        if (lodVisible.has(node)) {
+            lodVisible.delete(node);
+            removed.push(node);
+            stack.push.apply(stack, lod.children[node]);
+        }
+    }
+    nodes.remove(removed);
+    nodes.update(lodNode(id));
+}
+
+network.on("doubleClick", function (params) {
+    if (params.nodes.length !== 1) { return; }
+    var id = params.nodes[0];
+    var expanded = lod.children[id].length && lod.children[id].every(function (child) { return lodVisible.has(child); });
+    if (expanded) { lodCollapse(id); } else { lodExpand(id); }
+    lodRefreshEdges();
+});
+</script>"""
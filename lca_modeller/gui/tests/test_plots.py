@@ -0,0 +1,75 @@
+"""
+Level-of-detail view of large process trees: the top levels are displayed, the subtrees below are collapsed into
+aggregate nodes, and the edges are drawn from the child to the parent, as in the full view.
+"""
+import json
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+pytest.importorskip("pyvis")
+
+import pandas as pd
+from pyvis.network import Network
+
+from lca_modeller.gui.plots import USER_DB, _level_of_detail_tree
+
+BRANCHING, DEPTH = 4, 5  # 1365 activities
+
+
+def _synthetic_tree():
+    """
+    Nodes and exchanges tables of a complete tree in depth-first order, as returned by list_processes(flat=True), with
+    one activity used by two parents.
+    """
+    rows, exchanges = [], []
+
+    def add(level, parent):
+        node = len(rows)
+        rows.append(dict(activity=f"activity {node}", unit='kg', level=level, database=USER_DB, key=(USER_DB, node)))
+        if parent is not None:
+            exchanges.append(dict(child=node, parent=parent, amount=float(node)))
+        if level < DEPTH:
+            for _ in range(BRANCHING):
+                add(level + 1, node)
+
+    add(0, None)
+    df = pd.DataFrame(rows)
+    df['description'] = df['activity']
+    second_parent = list(df.index[df['level'] == 1])[1]
+    exchanges.append(dict(child=2, parent=second_parent, amount=0.5))  # node 2 (level 2) used by another activity
+    return df, pd.DataFrame(exchanges)
+
+
+def test_level_of_detail_tree(tmp_path):
+    df, exchanges = _synthetic_tree()
+    n = len(df)
+    assert n == sum(BRANCHING ** level for level in range(DEPTH + 1))
+    net = Network(notebook=True, directed=True, layout=False, cdn_resources='remote')  # as in process_tree()
+    outfile = str(tmp_path / "tree.html")
+    _level_of_detail_tree(net, df, exchanges, list(df['activity']), ['#ffffff'] * n, outfile, max_levels=3,
+                          max_nodes=300)
+
+    # Displayed: the three top levels, the third one collapsed with the number of activities below
+    levels = dict(zip(range(n), df['level']))
+    displayed = {node['id']: node for node in net.nodes}
+    assert set(displayed) == {node for node, level in levels.items() if level < 3}
+    collapsed = {node for node, options in displayed.items() if options.get('shapeProperties', {}).get('borderDashes')}
+    assert collapsed == {node for node, level in levels.items() if level == 2}
+    below = sum(BRANCHING ** level for level in range(1, DEPTH - 1))
+    assert all(displayed[node]['label'].endswith(f"[+{below}]") for node in collapsed)
+
+    # Edges between displayed nodes only, from the child to the parent (including the second parent of node 2)
+    expected = {(child, parent) for child, parent in zip(exchanges['child'], exchanges['parent'])
+                if levels[child] < 3 and levels[parent] < 3}
+    assert (2, list(df.index[df['level'] == 1])[1]) in expected
+    assert {(edge['from'], edge['to']) for edge in net.edges} == expected
+
+    # Payload of the browser: the whole tree, same directions
+    with open(outfile) as file:
+        html = file.read()
+    payload = json.loads(html.split("var lod = ", 1)[1].split(";\n", 1)[0])
+    assert len(payload['nodes']) == n
+    assert {(edge['from'], edge['to']) for edge in payload['edges']} == set(zip(exchanges['child'],
+                                                                                 exchanges['parent']))
+    assert sorted(payload['visible']) == sorted(displayed)
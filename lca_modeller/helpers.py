@@ -1,95 +1,98 @@
+import functools
+
 import lca_algebraic as agb
+import numpy as np
 import pandas as pd
 from sympy.parsing.sympy_parser import parse_expr
 from sympy.printing.str import StrPrinter
-from sympy import Float, factor
+from sympy import Basic, Float, factor, preorder_traversal
 import bw2data
 
 USER_DB = 'Foreground DB'
 DEFAULT_PROJECT = 'lca_modeller_default_project'
+FORMULA_RENDERINGS = ('raw', 'simplified', 'factored')
+DEFAULT_FORMULA_MAX_SIZE = 100  # size of a formula above which it is not factored (factorization may take minutes)
 
 
-def list_processes(model, foreground_only: bool = True, custom_attribute: str = None) -> pd.DataFrame:
+def list_processes(model, foreground_only: bool = True, custom_attribute: str = None, flat: bool = False,
+                   formula_rendering: str = 'factored', formula_max_size: int = DEFAULT_FORMULA_MAX_SIZE):
     """
     Traverses the tree of sub-activities (sub-processes) until the background database is reached.
-    """
 
-    def _recursive_activities(act, activities, units, locations, parents, amounts, levels, dbs, custom_attributes,
-                              parent: str = "", exc: dict = None, level: int = 0):
+    Activities are identified by their Brightway key: an activity used by several parents is listed once.
+    The tree is traversed depth-first, without recursion, so that deep models do not hit the recursion limit.
+
+    :param model: top-level activity
+    :param foreground_only: if True, stops before reaching the background activities.
+    :param custom_attribute: name of an additional attribute of the activities to include in the table.
+    :param flat: if True, returns the activities and the exchanges between them as two tables (see below).
+    :param formula_rendering: rendering of the amounts defined by a formula: 'raw', 'simplified' or 'factored'.
+    :param formula_max_size: size of the formulas (see expression_size()) above which they are rendered as
+    'simplified' instead of 'factored'.
+    :return: if flat is False, a DataFrame of the activities indexed by their display name, with the lists of parents
+    and amounts of each activity in columns 'parents' and 'amounts'.
+    If flat is True, a tuple (nodes, edges) of DataFrames. The nodes are indexed by an integer id, in order of
+    traversal. The edges table has one row per exchange, with columns 'child', 'parent' (ids of the nodes) and 'amount'.
+    """
+    columns = {'activity': [], 'unit': [], 'location': [], 'level': [], 'database': [], 'key': []}
+    if custom_attribute:
+        columns[custom_attribute] = []
+    edges = {'child': [], 'parent': [], 'amount': []}
+    node_ids = {}  # Brightway key => id of the node
 
-        if exc is None:
-            exc = {}
-        name = act.as_dict()['name']
-        unit = act.as_dict()['unit']
-        loc = act.as_dict().get('location', "")
-        if loc not in ['GLO', ''] and f'[{loc}]' not in name:
-            name += f' [{loc}]'
-        amount = _getAmountOrFormula(exc)
-        db = act.as_dict()['database']
-        custom_attr = act.as_dict().get(custom_attribute, "")  # get any additional attribute asked by the user
+    # Depth-first traversal. Children are pushed in reverse order to be visited in the order of the exchanges.
+    stack = [(model.key, model, -1, {})]  # (key, activity if already loaded, id of parent, exchange)
+    while stack:
+        key, act, parent, exc = stack.pop()
+        db = key[0]
 
         # Stop BEFORE reaching the first level of background activities
         if foreground_only and db != USER_DB:
-            return
-
-        if name in activities:  # Multiple parents for the same activity.
-            # TODO: implement better check than just the name and database, e.g. by adding the act object in the lists (but not in the final df)
-            # Populate lists accordingly and stop recursion since the activity has already been processed
-            idx = activities.index(name)
-            if dbs[idx] == db:
-                parents[idx].append(parent)
-                amounts[idx].append(amount)
-                return
-
-        activities.append(name)
-        units.append(unit)
-        locations.append(loc)
-        parents.append([parent])
-        amounts.append([amount])
-        levels.append(level)
-        dbs.append(db)
-        custom_attributes.append(custom_attr)
-
-        # Stop AFTER reaching the first level of background activities
-        if db != USER_DB:
-            return
-
-        for exc in act.exchanges():
-            if agb.base_utils._isOutputExch(exc):  # skip production exchange to only go down the tree
-                continue
-            _recursive_activities(exc.input, activities, units, locations, parents, amounts, levels, dbs, custom_attributes,
-                                  parent=name,
-                                  exc=exc,
-                                  level=level + 1)
-        return
-
-    # Initialize lists
-    activities = []
-    units = []
-    locations = []
-    parents = []
-    amounts = []
-    levels = []
-    dbs = []
-    custom_attributes = []
-
-    # Recursively populate lists
-    _recursive_activities(model, activities, units, locations, parents, amounts, levels, dbs, custom_attributes)
-    data = {'activity': activities,
-            'unit': units,
-            'location': locations,
-            'level': levels,
-            'database': dbs,
-            'parents': parents,
-            'amounts': amounts,
-            }
-    if custom_attribute:
-        data[custom_attribute] = custom_attributes
-
-    # Create DataFrame
-    df = pd.DataFrame(data, index=activities)
+            continue
 
-    return df
+        node = node_ids.get(key)
+        if node is None:  # first time the activity is reached
+            if act is None:
+                act = bw2data.get_activity(key)
+            data = act.as_dict()
+            name = data['name']
+            loc = data.get('location', "")
+            if loc not in ['GLO', ''] and f'[{loc}]' not in name:
+                name += f' [{loc}]'
+            node = node_ids[key] = len(columns['key'])
+            columns['activity'].append(name)
+            columns['unit'].append(data['unit'])
+            columns['location'].append(loc)
+            columns['level'].append(0 if parent < 0 else columns['level'][parent] + 1)
+            columns['database'].append(db)
+            columns['key'].append(key)
+            if custom_attribute:
+                columns[custom_attribute].append(data.get(custom_attribute, ""))  # any additional attribute asked by the user
+
+            # Stop AFTER reaching the first level of background activities
+            if db == USER_DB:
+                children = [exc for exc in act.exchanges() if not agb.base_utils._isOutputExch(exc)]  # only go down the tree
+                stack.extend((child['input'], None, node, child) for child in reversed(children))
+
+        edges['child'].append(node)
+        edges['parent'].append(parent)
+        edges['amount'].append(_getAmountOrFormula(exc, formula_rendering, formula_max_size))
+
+    nodes = pd.DataFrame(columns)
+    edges = pd.DataFrame(edges)
+    if flat:
+        return nodes, edges[edges['parent'] >= 0].reset_index(drop=True)  # the top-level activity has no parent
+
+    # Legacy layout: parents and amounts of each activity as lists
+    names = columns['activity']
+    parent_names = [names[parent] if parent >= 0 else "" for parent in edges['parent']]
+    grouped = edges.assign(parent=parent_names).groupby('child', sort=False)
+    nodes['parents'] = grouped['parent'].agg(list)
+    nodes['amounts'] = grouped['amount'].agg(list)
+    nodes = nodes.drop(columns='key')
+    ordered = ['activity', 'unit', 'location', 'level', 'database', 'parents', 'amounts']
+    nodes = nodes[ordered + ([custom_attribute] if custom_attribute else [])]
+    return nodes.set_index(nodes['activity'].rename(None))
 
 
 def get_parameter(key: str):
@@ -97,13 +100,21 @@ def get_parameter(key: str):
     return param
 
 
+def _is_vector(value) -> bool:
+    return isinstance(value, (list, tuple, np.ndarray, pd.Series))
+
+
 def expandParams(param, value=None):
     """
     Modified version of expandParams from classes EnumParam and ParamDef from lca_algebraic library.
     For enum (switch) parameters, returns a dictionary of single enum values as sympy symbols,
     with only a single one set to 1.
     For float parameters, returns a dictionary with either the user-provided value or the default parameter value.
+    Values can also be given as a list or a numpy array: the result is then a dictionary of numpy arrays, computed in
+    bulk (one-hot arrays for enum parameters, default value in place of None or NaN for float parameters).
     """
+    if _is_vector(value):
+        return _expandParamsVector(param, value)
 
     # Enum (e.g. switch) parameters
     if param['type'] == 'enum':
@@ -127,23 +138,49 @@ def expandParams(param, value=None):
         return {param['name']: value}
 
 
+def _expandParamsVector(param, values):
+    """
+    Vectorized version of expandParams() for a list or array of values.
+    """
+    # Enum (e.g. switch) parameters: one-hot encoding of all the values at once
+    if param['type'] == 'enum':
+        values = pd.Series(np.asarray(values, dtype=object).ravel())
+        codes = pd.Categorical(values, categories=param['values']).codes  # -1 for None or invalid values
+        invalid = (codes == -1) & values.notna().to_numpy()
+        if invalid.any():
+            raise Exception("Invalid value %s for param %s. Should be in %s" %
+                            (values[invalid].iloc[0], param['name'], str(param['values'])))
+
+        onehot = np.zeros((len(param['values']) + 1, len(codes)))
+        onehot[codes, np.arange(len(codes))] = 1.0  # code -1 => last row, the default value
+        names = ["%s_%s" % (param['name'], enum_val) for enum_val in param['values']] + ["%s_default" % param['name']]
+        return dict(zip(names, onehot))
+
+    # Float parameters
+    else:
+        values = np.asarray(values, dtype=float)
+        return {param['name']: np.where(np.isnan(values), param['default'], values)}
+
+
 def completeParamValues(params, param_registry, setDefaults=True):
     """
     Modified version of completeParamValues from lca_algebraic library.
     Sets default values for missing parameters and expand enum params.
+    Lists or numpy arrays of values are expanded in bulk, see expandParams().
 
     Returns
     -------
-        Dict of param_name => float value
+        Dict of param_name => float value (or numpy array of values)
     """
 
     # Set default variables for missing values
     if setDefaults:
-        for name, param in param_registry.items():
-            if not name in params:
-                params[name] = param['default']
-                agb.warn(
-                    "Required param '%s' was missing, replacing by default value : %s" % (name, str(param['default'])))
+        missing = [name for name in param_registry if name not in params]
+        for name in missing:
+            params[name] = param_registry[name]['default']
+        if missing:
+            agb.warn("Required params were missing, replacing by default values : %s" %
+                     ", ".join("%s=%s" % (name, str(params[name])) for name in missing))
 
     res = dict()
     for key, val in params.items():
@@ -153,11 +190,7 @@ def completeParamValues(params, param_registry, setDefaults=True):
             continue
             # raise Exception("Parameter not found : %s. Valid parameters : %s" % (key, list(param_registry.keys())))
 
-        if isinstance(val, list):
-            newvals = [expandParams(param, val) for val in val]
-            res.update(agb.params._listOfDictToDictOflist(newvals))
-        else:
-            res.update(expandParams(param, val))
+        res.update(expandParams(param, val))
 
     return res
 
@@ -186,11 +219,40 @@ class CustomStrPrinter(StrPrinter):
         return '{:.2e}'.format(expr)
 
 
-def _getAmountOrFormula(ex):
+def expression_size(expr) -> int:
+    """
+    Size of an expression: its number of nodes (symbols, numbers and operations).
+    """
+    if not isinstance(expr, Basic):
+        return 1
+    return sum(1 for _ in preorder_traversal(expr))
+
+
+@functools.lru_cache(maxsize=None)
+def _render_formula(formula: str, rendering: str = 'factored', max_size: int = DEFAULT_FORMULA_MAX_SIZE) -> str:
+    """
+    Renders the formula of an exchange. Results are cached by formula string.
+    :param formula: formula of the exchange, as stored in the database
+    :param rendering: 'raw' for the formula as is, 'simplified' for the evaluated expression, 'factored' for the
+    factored expression.
+    :param max_size: size of the expression above which it is not factored but simplified, since the factorization of
+    large expressions (e.g. switches between prospective databases) may take minutes. None for no limit.
+    """
+    if rendering not in FORMULA_RENDERINGS:
+        raise ValueError(f"Invalid rendering '{rendering}'. Should be in {FORMULA_RENDERINGS}")
+    if rendering == 'raw':
+        return formula
+
+    expr = parse_expr(formula)
+    if rendering == 'factored' and (max_size is None or expression_size(expr) <= max_size):
+        expr = factor(expr)
+    return CustomStrPrinter().doprint(expr)
+
+
+def _getAmountOrFormula(ex, rendering: str = 'factored', max_size: int = DEFAULT_FORMULA_MAX_SIZE):
     """ Return either a fixed float value or an expression for the amount of this exchange"""
     if 'formula' in ex:
-        expr = parse_expr(ex['formula'], evaluate=False)
-        return CustomStrPrinter().doprint(factor(expr))
+        return _render_formula(ex['formula'], rendering, max_size)
     elif 'amount' in ex:
         return format_number(ex['amount'])
     return ""
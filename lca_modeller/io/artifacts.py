@@ -0,0 +1,136 @@
+"""
+Local store of the prospective databases generated by premise, shared by all Brightway projects.
+
+Each database is stored as a Brightway package, addressed by a hash of everything that determines its content:
+the ecoinvent version and system model, the premise version, the scenario and the sectors updated by premise.
+"""
+import hashlib
+import json
+import logging
+import os
+import os.path as pth
+import shutil
+from importlib.metadata import version, PackageNotFoundError
+from typing import Dict, Union
+
+import brightway2 as bw
+from bw2io import BW2Package
+
+_LOGGER = logging.getLogger(__name__)
+
+STORE_ENV_VARIABLE = "LCA_MODELLER_ARTIFACTS"
+STORE_FOLDER = "lca_modeller_artifacts"  # default store, in the Brightway data directory (shared by all projects)
+EXPORT_FOLDER = "lca_modeller_artifacts"  # temporary export folder in the Brightway project directory
+
+
+def _premise_version() -> str:
+    try:
+        return version("premise")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def artifact_key(ei_version: str, ei_model: str, scenario: Dict, sectors_to_update=None) -> str:
+    """
+    Computes the key of a prospective database in the artifact store.
+    :param ei_version: version of ecoinvent
+    :param ei_model: system model of ecoinvent
+    :param scenario: premise scenario (model, pathway, year and any other premise options of the scenario)
+    :param sectors_to_update: 'all', a list of sectors or None, as in the configuration file
+    :return: the hexadecimal digest of the key
+    """
+    if isinstance(sectors_to_update, list):
+        sectors_to_update = sorted(sectors_to_update)
+    content = {
+        'ecoinvent': [ei_version, ei_model],
+        'premise': _premise_version(),
+        'scenario': scenario,
+        'update': sectors_to_update,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ArtifactStore:
+    """
+    Content-addressed store of Brightway databases.
+
+    :param directory: directory of the store. Defaults to the environment variable LCA_MODELLER_ARTIFACTS if set,
+    the folder lca_modeller_artifacts of the Brightway data directory (which contains the projects) otherwise.
+    """
+
+    def __init__(self, directory: str = None):
+        directory = directory or os.getenv(STORE_ENV_VARIABLE) or pth.join(pth.dirname(bw.projects.dir), STORE_FOLDER)
+        self.directory = pth.abspath(pth.expanduser(directory))
+
+    def _path(self, key: str) -> str:
+        return pth.join(self.directory, key[:2], key + ".bw2package")
+
+    def _description(self, key: str) -> Dict:
+        """
+        Returns the information stored next to an artifact, or None if not available.
+        """
+        filepath = pth.splitext(self._path(key))[0] + ".json"
+        if not pth.exists(filepath):
+            return None
+        with open(filepath) as file:
+            return json.load(file)
+
+    def has(self, key: str) -> bool:
+        return pth.exists(self._path(key))
+
+    def import_database(self, key: str, db_name: str) -> bool:
+        """
+        Imports a stored database in the current Brightway project.
+        :return: True if the database was imported, False if there is no (valid) artifact for this key
+        """
+        filepath = self._path(key)
+        if not pth.exists(filepath):
+            return False
+        try:
+            # Name of the stored database, checked before the import, which would overwrite a database of this name
+            description = self._description(key)
+            if description is not None and 'database' in description:
+                stored_name = description['database']
+            else:
+                data = BW2Package.load_file(filepath)
+                stored_name = (data[0] if isinstance(data, list) else data)['name']
+            if stored_name != db_name:
+                _LOGGER.warning(f"Artifact {key} contains database '{stored_name}' instead of '{db_name}'. Ignored.")
+                return False
+            BW2Package.import_file(filepath)
+        except Exception as e:
+            _LOGGER.warning(f"Could not import artifact {filepath} ({e}).")
+            if db_name in bw.databases:
+                del bw.databases[db_name]
+            return False
+        return True
+
+    def export_database(self, key: str, db_name: str, description: Dict = None):
+        """
+        Stores a database of the current Brightway project.
+        The package is first written to the project directory, then moved atomically to the store so that concurrent
+        readers never see a partially written artifact.
+        :param key: key of the database, see artifact_key()
+        :param db_name: name of the database
+        :param description: optional information stored next to the artifact (e.g. the scenario)
+        """
+        filepath = self._path(key)
+        os.makedirs(pth.dirname(filepath), exist_ok=True)
+        exported = BW2Package.export_obj(bw.Database(db_name), filename=key, folder=EXPORT_FOLDER)
+        tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+        shutil.move(exported, tmp_filepath)
+        os.replace(tmp_filepath, filepath)
+        with open(pth.splitext(filepath)[0] + ".json", "w") as file:
+            json.dump(dict(description or {}, database=db_name), file, indent=2, default=str)
+
+
+def get_artifact_store(setting: Union[bool, str, None] = False):
+    """
+    Returns the artifact store defined in the configuration file.
+    :param setting: True to use the default store, a path to use a specific directory, False or None to disable the
+    store
+    :return: the store, or None if disabled
+    """
+    if not setting:
+        return None
+    return ArtifactStore(setting if isinstance(setting, str) else None)
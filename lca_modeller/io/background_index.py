@@ -0,0 +1,156 @@
+"""
+Lookup index of the background databases (ecoinvent, premise and biosphere databases), used to resolve the activities
+declared in the configuration file with dictionary lookups instead of searching the databases one activity at a time.
+"""
+import glob
+import logging
+import os
+import os.path as pth
+import pickle
+import re
+from collections import defaultdict
+
+import brightway2 as bw
+import lca_algebraic as agb
+from bw2data.backends.peewee import ActivityDataset
+
+from lca_modeller.io import profiling
+
+_LOGGER = logging.getLogger(__name__)
+
+INDEX_FILENAME = "lca_modeller_index-{}.pickle"
+
+
+class BackgroundIndex:
+    """
+    Index of the activities of a background database, keyed by (lowercase) name.
+    Each entry stores the code, location, unit and categories of the activity.
+
+    The index is stored on disk next to the Brightway project, and rebuilt automatically when the database has been
+    modified since the index was built.
+
+    :param db_name: name of the background database
+    """
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self.modified = None  # modification timestamp of the database when the index was built
+        self._entries = defaultdict(list)  # name => list of (code, location, unit, categories)
+
+    @property
+    def filename(self) -> str:
+        return pth.join(bw.projects.dir, INDEX_FILENAME.format(re.sub("[^0-9a-zA-Z]+", "_", self.db_name)))
+
+    def is_up_to_date(self) -> bool:
+        """
+        Checks that the database has not been modified since the index was built.
+        """
+        return self.db_name in bw.databases and bw.databases[self.db_name].get('modified') == self.modified
+
+    def load(self) -> bool:
+        """
+        Loads the index from disk.
+        :return: True if an up-to-date index was found on disk, False otherwise
+        """
+        if not pth.exists(self.filename):
+            return False
+        try:
+            with open(self.filename, "rb") as file:
+                self.modified, entries = pickle.load(file)
+        except Exception as e:
+            _LOGGER.warning(f"Could not read lookup index {self.filename} ({e}). Rebuilding it.")
+            return False
+        self._entries = defaultdict(list, entries)
+        return self.is_up_to_date()
+
+    def build(self):
+        """
+        Builds the index with a single query on the database, and saves it to disk.
+        """
+        self.modified = bw.databases[self.db_name].get('modified')
+        self._entries = defaultdict(list)
+        profiling.count('lca_modeller queries')
+        query = ActivityDataset.select(ActivityDataset.code, ActivityDataset.data).where(
+            ActivityDataset.database == self.db_name
+        )
+        for code, data in query.tuples():
+            categories = data.get('categories')
+            self._entries[data.get('name', '').lower()].append((
+                code,
+                data.get('location'),
+                data.get('unit'),
+                tuple(categories) if categories else None,
+            ))
+        with open(self.filename, "wb") as file:
+            pickle.dump((self.modified, dict(self._entries)), file)
+
+    def find(self, name: str, loc: str = None, unit: str = None, categories=None, single: bool = True):
+        """
+        Finds activities in the index. Mimics the behaviour of lca_algebraic's findActivity().
+
+        :param name: name of the activity (case-insensitive). If it contains a wildcard '*', the database is searched.
+        :param loc: optional location
+        :param unit: optional unit
+        :param categories: optional list of categories (biosphere flows)
+        :param single: if True, fails if no activity or several activities are found.
+        :return: either a single activity (if a single one is found) or a list of activities, possibly empty.
+        """
+        if "*" in name:
+            return agb.findActivity(name=name, loc=loc, unit=unit, categories=categories, db_name=self.db_name,
+                                    single=single)
+
+        categories = tuple(categories) if categories else None
+        codes = [
+            code for code, act_loc, act_unit, act_categories in self._entries.get(name.lower(), [])
+            if (not loc or loc == act_loc) and (not unit or unit == act_unit)
+            and (not categories or categories == act_categories)
+        ]
+
+        if single and len(codes) == 0:
+            raise Exception("No activity found in '%s' with name '%s' and location '%s'" % (self.db_name, name, loc))
+        if single and len(codes) > 1:
+            raise Exception("Several activity found in '%s' with name '%s' and location '%s'" % (self.db_name, name, loc))
+        profiling.count('lca_modeller queries', len(codes))
+        acts = [agb.getActByCode(self.db_name, code) for code in codes]
+        if len(acts) == 1:
+            return acts[0]
+        return acts
+
+
+_INDEXES = dict()  # (project, db_name) => BackgroundIndex
+
+
+def get_background_index(db_name: str) -> BackgroundIndex:
+    """
+    Returns the lookup index of a background database, loading it from disk or building it if necessary.
+    :param db_name: name of the background database
+    """
+    key = (bw.projects.current, db_name)
+    index = _INDEXES.get(key)
+    if index is None or not index.is_up_to_date():
+        index = BackgroundIndex(db_name)
+        if not index.load():
+            print(f"Building lookup index of database {db_name}")
+            index.build()
+        _INDEXES[key] = index
+    return index
+
+
+def find_background_activity(db_name: str, name: str, loc: str = None, unit: str = None, categories=None,
+                             single: bool = True):
+    """
+    Finds an activity in a background database using its lookup index. See BackgroundIndex.find().
+    """
+    profiling.count('background lookups')
+    return get_background_index(db_name).find(name, loc=loc, unit=unit, categories=categories, single=single)
+
+
+def clear_background_indexes(disk: bool = True):
+    """
+    Clears the lookup indexes of the current project, in memory and optionally on disk.
+    """
+    for key in [key for key in _INDEXES if key[0] == bw.projects.current]:
+        del _INDEXES[key]
+    if disk:
+        for filename in glob.glob(pth.join(bw.projects.dir, INDEX_FILENAME.format("*"))):
+            os.remove(filename)
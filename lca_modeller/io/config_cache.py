@@ -0,0 +1,85 @@
+"""
+Cache of the parsed and validated configuration files, shared by all the processes of the machine.
+
+Parsing a large YAML file and validating it against the JSON schema takes much longer than reading the same data from a
+pickle file. The result is stored in binary form, addressed by a hash of the content of the file and of the schema, so
+that a configuration file is parsed and validated once, whatever the number of processes loading it.
+"""
+import hashlib
+import logging
+import os
+import os.path as pth
+import pickle
+from typing import Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+CACHE_ENV_VARIABLE = "LCA_MODELLER_CONFIG_CACHE"
+DEFAULT_CACHE_DIR = pth.join("~", ".lca_modeller", "config_cache")
+DISABLED = "off"  # value of the environment variable to disable the cache
+
+_MEMORY = dict()  # key => pickled configuration, for the configurations already loaded in this process
+
+
+def _cache_dir():
+    """
+    Directory of the cache: the environment variable LCA_MODELLER_CONFIG_CACHE if set, ~/.lca_modeller/config_cache
+    otherwise. None if the cache is disabled.
+    """
+    directory = os.getenv(CACHE_ENV_VARIABLE) or DEFAULT_CACHE_DIR
+    if directory.lower() == DISABLED:
+        return None
+    return pth.abspath(pth.expanduser(directory))
+
+
+def load_configuration(file_path: str, parse: Callable[[bytes], dict], validate: Callable[[dict], None],
+                       salt: str = '') -> dict:
+    """
+    Reads a configuration file, from the cache if the same content has already been parsed and validated.
+
+    :param file_path: path to the configuration file
+    :param parse: function returning the configuration from the content of the file
+    :param validate: function raising an exception if the configuration is not valid. Invalid configurations are not
+    cached.
+    :param salt: string identifying the parser and the schema, so that the cache is invalidated when they change
+    :return: the configuration. A new object is returned at each call, which can be modified by the caller.
+    """
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    key = hashlib.sha256(salt.encode('utf-8') + b'\0' + content).hexdigest()
+
+    if key in _MEMORY:
+        return pickle.loads(_MEMORY[key])
+
+    directory = _cache_dir()
+    cache_file = pth.join(directory, key[:2], key + ".pickle") if directory else None
+    if cache_file and pth.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as file:
+                _MEMORY[key] = file.read()
+            return pickle.loads(_MEMORY[key])
+        except Exception as e:
+            _MEMORY.pop(key, None)
+            _LOGGER.warning(f"Could not read cached configuration {cache_file} ({e}).")
+
+    data = parse(content)
+    validate(data)
+    _MEMORY[key] = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+    if cache_file:
+        try:
+            os.makedirs(pth.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as file:
+                file.write(_MEMORY[key])
+            os.replace(tmp_file, cache_file)  # atomic: processes loading the same file concurrently do not conflict
+        except OSError as e:
+            _LOGGER.warning(f"Could not store configuration in cache {cache_file} ({e}).")
+    return pickle.loads(_MEMORY[key])
+
+
+def clear_memory_cache():
+    """
+    Clears the configurations cached in this process (the files of the cache are kept).
+    """
+    _MEMORY.clear()
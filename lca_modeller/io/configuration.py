@@ -1,20 +1,18 @@
+import hashlib
 import json
 import os
 from importlib.resources import open_text
 from abc import ABC, abstractmethod
 import shutil
 
-import bw2io
-from bw2io.importers import ExcelLCIAImporter, CSVLCIAImporter
-from jsonschema import validate
 import lca_algebraic as agb
 import brightway2 as bw
 from sympy import sympify
 import logging
 import os.path as pth
 from ruamel.yaml import YAML
-from dotenv import load_dotenv
-import premise as pm
+from bw2data.backends.peewee import ActivityDataset, ExchangeDataset, sqlite3_lci_db
+from bw2data.parameters import DatabaseParameter
 
 from lca_modeller.io import resources
 from lca_algebraic.params import (
@@ -24,7 +22,13 @@ from lca_algebraic.activity import ActivityOrActivityAmount, newActivity, Activi
 from typing import Dict, List, Union, Tuple
 from functools import reduce
 from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from unittest.mock import patch
 from lca_modeller.helpers import safe_delete_brightway_project
+from lca_modeller.io.background_index import find_background_activity
+from lca_modeller.io.artifacts import artifact_key, get_artifact_store
+from lca_modeller.io import profiling
+from lca_modeller.io.config_cache import load_configuration
 
 BIOSPHERE3_DB_NAME = "biosphere3"
 USER_BIOSPHERE_DB_NAME = "biosphere_user"
@@ -58,6 +62,9 @@ KEY_SCENARIOS = 'scenarios'
 KEY_YEAR = 'year'
 KEY_PATHWAY = 'pathway'
 KEY_UPDATE_PREMISE = 'update'
+KEY_MAX_WORKERS = 'max_workers'
+KEY_MAX_MEMORY = 'max_memory_per_worker'
+KEY_ARTIFACT_STORE = 'artifact_store'
 KEY_UPDATE_ACT = 'update'
 KEY_INPUT_ACT = 'input_activity'
 KEY_NEW_VAL = 'new_value'
@@ -65,19 +72,23 @@ KEY_DELETE = 'delete'
 KEY_ADD = 'add'
 KEY_FILEPATH = 'filepath'
 KEY_SOURCE_METHOD = 'source_method'
+KEY_VARIANT = 'variant'  # internal: own copy of a background activity modified with update/add/delete
 DEFAULT_DESC_LCIA = 'custom LCIA method'
 KEY_RESET = 'reset_project'
-
-
-def _get_unique_activity_name(key):
-    """
-    Returns a unique activity name by incrementing a suffix number.
-    """
-    i = 1
-    while agb.findActivity(f'{key}_{i}', db_name=USER_DB, single=False):
-        i += 1
-    new_key = f'{key}_{i}'
-    return new_key
+KEY_INCREMENTAL = 'incremental_build'
+KEY_COMPILED_CACHE = 'compiled_cache'
+KEY_PROFILE = 'profile'
+KEY_SCORE_STORE = 'score_store'
+KEY_COMPILATION = 'compilation'
+KEY_CSE = 'cse'
+KEY_MAX_EXPRESSION_SIZE = 'max_expression_size'
+KEY_SIZE_LIMIT_ACTION = 'size_limit_action'
+PROFILE_SUFFIX = '.profile.json'  # default report file, next to the configuration file
+CUSTOM_METHOD_SIGNATURE_KEY = 'lca_modeller_import'  # metadata of custom LCIA methods: signature of the import
+KEY_CUSTOM_METHODS_WORKERS = 'custom_methods_max_workers'
+BUILD_STATE_KEY = 'lca_modeller_build'  # metadata of the foreground database where the last build is described
+BUILD_STATE_VERSION = 2  # version of the description of the build, incremented when its content changes
+SQLITE_MAX_VARIABLES = 500  # max number of values in a single SQL 'IN' clause
 
 
 def is_comma_separated(file_path):
@@ -91,67 +102,424 @@ def is_comma_separated(file_path):
         return ',' in first_line
 
 
-def _parse_exchange(table: dict, act: ActivityExtended = None, params_meta_dict: dict = None):
+def _set_custom_attributes(act, custom_attributes: List[Dict]):
+    """
+    Sets the custom attributes of an activity, with a single write to the database.
+    :param act: the activity
+    :param custom_attributes: list of {'attribute': name, 'value': value} as declared in the configuration file
     """
-    Gets the exchange expression from the table of options for the activity, then creates the input parameters and returns the symbolic expression of the exchange
+    if custom_attributes:
+        act.updateMeta(**{attr.get(KEY_ATTR_NAME): attr.get(KEY_ATTR_VALUE) for attr in custom_attributes})
 
-    :param table: the table of options for the activity.
-    :param act: the activity itself. Only used if special formula sum() is used in the exchange amount.
-    :param params_meta_dict: metadata of the parameters, as defined in a specific section of the configuration file.
-    :return expr: the symbolic expression.
+
+def _remove_exchange_formulas(act):
+    """
+    Removes the 'formula' field of the exchanges of an activity copied from ecoinvent (chemical formulas), which would
+    otherwise be interpreted as amount formulas by lca_algebraic.
     """
-    params_meta_dict = params_meta_dict if params_meta_dict else {}
+    for ex in act.exchanges():
+        if "formula" in ex:
+            del ex["formula"]
+            ex.save()
 
-    # Get the 'amount' value of the exchange. If it doesn't exist then set the exchange quantity to 1
-    exchange = table.get(KEY_EXCHANGE, EXCHANGE_DEFAULT_VALUE)
 
-    # Special formula sum() to sum the amounts of all exchanges with a given name in the activity
-    # E.g. 'sum(electricity*)' will sum the amounts of all exchanges with the name 'electricity' (whatever the location)
-    if 'sum(' in str(exchange) and act:
-        selected_exchanges = str(exchange).split('sum(')[1].split(')')[0]
-        if selected_exchanges:
-            sum_value = str(sum_amounts(act, selected_exchanges))
-            exchange = str(exchange).replace(f'sum({selected_exchanges})', sum_value)
+@contextmanager
+def bulk_write():
+    """
+    Context manager that groups all the writes to the Brightway databases (activities, exchanges and parameters) in a
+    single SQLite transaction per database file, with build-friendly journaling settings (write-ahead log, no sync at
+    each write).
+    Brightway also marks a database as modified at each write of an activity or exchange, which rewrites the
+    databases metadata file each time: this is done only once per database at the end of the transaction.
+    If an error is raised, the whole transaction is rolled back. The journaling settings and the method set_dirty() of
+    bw.databases are restored in any case.
+    """
+    lci_db = sqlite3_lci_db.db
+    journal_mode = lci_db.execute_sql('PRAGMA journal_mode').fetchone()[0]
+    synchronous = lci_db.execute_sql('PRAGMA synchronous').fetchone()[0]
+    dirty_databases = set()
+    try:
+        lci_db.execute_sql('PRAGMA journal_mode = WAL')
+        lci_db.execute_sql('PRAGMA synchronous = NORMAL')
+        with patch.object(bw.databases, 'set_dirty', dirty_databases.add):
+            with lci_db.atomic(), bw.parameters.db.atomic():
+                yield
+    finally:
+        for db_name in dirty_databases:  # nb: also after a rollback, to invalidate what may have been read meanwhile
+            if db_name in bw.databases:
+                bw.databases.set_dirty(db_name)
+        lci_db.execute_sql(f'PRAGMA synchronous = {synchronous}')
+        try:
+            lci_db.execute_sql(f'PRAGMA journal_mode = {journal_mode}')
+        except Exception as e:  # e.g. database still in use by another connection
+            _LOGGER.warning(f"Could not restore journal mode '{journal_mode}' of the databases ({e}).")
+
+
+_SCHEMA = None  # (schema, hash of the schema), read once per process, see _json_schema()
+_VALIDATOR = None  # validator of the schema, compiled once per process, see _validate_configuration()
+
+
+def _json_schema() -> Tuple[dict, str]:
+    """
+    Returns the JSON schema of the configuration file and its hash.
+    """
+    global _SCHEMA
+    if _SCHEMA is None:
+        with open_text(resources, JSON_SCHEMA_NAME) as json_file:
+            text = json_file.read()
+        _SCHEMA = json.loads(text), hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return _SCHEMA
+
 
-    # Parse the string expression
-    expr = sympify(exchange)
+def _validate_configuration(data: dict):
+    """
+    Validates a configuration against the JSON schema. Raises the same error as jsonschema.validate().
+    The validator is compiled at the first call only.
+    """
+    global _VALIDATOR
+    from jsonschema.exceptions import best_match
+    if _VALIDATOR is None:
+        from jsonschema.validators import validator_for
+        schema = _json_schema()[0]
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        _VALIDATOR = validator_class(schema)
+    error = best_match(_VALIDATOR.iter_errors(data))
+    if error is not None:
+        raise error
+
+
+def _hash_definition(definition) -> str:
+    """
+    Returns a stable hash of a (sub)section of the configuration file.
+    :param definition: any json-like object, e.g. the definition of an activity and its sub-activities
+    :return: the hexadecimal digest of the definition
+    """
+    content = json.dumps(definition, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
-    # Get the parameters involved in the expression
-    parameters = expr.free_symbols
 
-    # Create new parameters if necessary
-    for param in parameters:
-        if param == agb.old_amount:  # skip the special 'old_amount' parameter
+def _foreground_codes() -> set:
+    """
+    Returns the codes of all activities in the foreground database, with a single query.
+    """
+    profiling.count('lca_modeller queries')
+    query = ActivityDataset.select(ActivityDataset.code).where(ActivityDataset.database == USER_DB)
+    return {code for (code,) in query.tuples()}
+
+
+def _drop_foreground_activities(codes):
+    """
+    Deletes activities from the foreground database, together with the exchanges that point to them.
+    :param codes: codes of the activities to delete
+    """
+    codes = list(set(codes) & _foreground_codes())
+    if not codes:
+        return
+    for i in range(0, len(codes), SQLITE_MAX_VARIABLES):
+        chunk = codes[i:i + SQLITE_MAX_VARIABLES]
+        profiling.count('lca_modeller queries')
+        # Brightway only deletes the exchanges of which the activity is the output: clean up the inputs as well
+        ExchangeDataset.delete().where(
+            (ExchangeDataset.input_database == USER_DB) & (ExchangeDataset.input_code.in_(chunk))
+        ).execute()
+    for code in codes:
+        agb.getActByCode(USER_DB, code).delete()
+    profiling.count('activities deleted', len(codes))
+    bw.databases.set_dirty(USER_DB)
+
+
+def _model_exchange_ids() -> set:
+    """
+    Returns the ids of the exchanges of the top-level activity of the model, with a single query.
+    """
+    profiling.count('lca_modeller queries')
+    query = ExchangeDataset.select(ExchangeDataset.id).where(
+        (ExchangeDataset.output_database == USER_DB) & (ExchangeDataset.output_code == KEY_MODEL)
+    )
+    return {exchange_id for (exchange_id,) in query.tuples()}
+
+
+def _drop_model_exchanges(ids):
+    """
+    Deletes exchanges of the top-level activity of the model.
+    :param ids: ids of the exchanges to delete
+    """
+    ids = list(ids)
+    for i in range(0, len(ids), SQLITE_MAX_VARIABLES):
+        profiling.count('lca_modeller queries')
+        ExchangeDataset.delete().where(
+            (ExchangeDataset.output_database == USER_DB) & (ExchangeDataset.output_code == KEY_MODEL) &
+            (ExchangeDataset.id.in_(ids[i:i + SQLITE_MAX_VARIABLES]))
+        ).execute()
+    if ids:
+        bw.databases.set_dirty(USER_DB)
+
+
+def _drop_parameters(names):
+    """
+    Deletes parameters of the foreground database, both in memory (lca_algebraic registry) and in the project.
+    :param names: names of the parameters to delete
+    """
+    registry = agb.params._param_registry()
+    persisted_names = []
+    for name in names:
+        param = registry.params.get(name, {}).pop(USER_DB, None)
+        if name in registry.params and not registry.params[name]:
+            del registry.params[name]
+        if param is None:
             continue
-        if param not in all_params():  # create the parameter if it doesn't exist
-            # Get the metadata of the parameter if provided in specific section of the configuration file
-            param_meta = params_meta_dict.get(param.name, {})
-            default = param_meta.get('default', 1.0)
-            min_val = param_meta.get('min', 1.0)
-            max_val = param_meta.get('max', 1.0)
-            unit = param_meta.get('unit', None)
-            description = param_meta.get('description', None)
-            distrib = param_meta.get('distrib', agb.DistributionType.LINEAR)
-            formula = sympify(param_meta.get('formula', None))
-            label = param_meta.get('label', None)
-            group = param_meta.get('group', None)
-
-            # Create new parameter
-            agb.newFloatParam(
-                param.name,  # name of the parameter
-                default=default,  # default value
-                min=min_val,
-                max=max_val,
-                unit=unit,
-                description=description,
-                distrib=distrib,
-                formula=formula,
-                label=label,
-                group=group,
-                dbname=USER_DB  # we define the parameter in the foreground database
-            )
+        if param.type == agb.params.ParamType.ENUM:  # enum parameters are persisted as one parameter per value
+            persisted_names.extend(f"{name}_{value}" for value in param.values)
+        else:
+            persisted_names.append(name)
+    for i in range(0, len(persisted_names), SQLITE_MAX_VARIABLES):
+        DatabaseParameter.delete().where(
+            (DatabaseParameter.database == USER_DB) &
+            (DatabaseParameter.name.in_(persisted_names[i:i + SQLITE_MAX_VARIABLES]))
+        ).execute()
+
+
+class ForegroundRegistry:
+    """
+    In-memory index of the activities of the foreground database, kept up to date by the configurator while it builds
+    the model, so that names, duplicates and '#' references are resolved without querying the database. Names are
+    case-insensitive, as in lca_algebraic's findActivity().
+
+    :param declared: names of all the activities declared in the configuration file, used to report references to
+    activities defined later in the file.
+    """
+
+    def __init__(self, declared=None):
+        self.declared = {name.lower() for name in declared or []}
+        self._by_name = defaultdict(dict)  # lower-case name => {code: entry}, entry = dict(location, unit, act)
+        self._names = {}  # code => lower-case name
+
+    @classmethod
+    def load(cls, declared=None) -> 'ForegroundRegistry':
+        """
+        Creates the registry from the activities already in the foreground database, with a single query.
+        """
+        registry = cls(declared)
+        profiling.count('lca_modeller queries')
+        query = ActivityDataset.select(ActivityDataset.code, ActivityDataset.data).where(
+            ActivityDataset.database == USER_DB
+        )
+        for code, data in query.tuples():
+            registry._add(code, data.get('name'), data.get('location'), data.get('unit'), act=None)
+        return registry
+
+    def _add(self, code, name, location, unit, act):
+        name = (name or '').lower()
+        self._by_name[name][code] = dict(location=location, unit=unit, act=act)
+        self._names[code] = name
+
+    def add(self, act):
+        """
+        Registers an activity created in the foreground database.
+        """
+        profiling.count('activities created')
+        data = act.as_dict()
+        self._add(act.key[1], data.get('name'), data.get('location'), data.get('unit'), act)
+        return act
+
+    def forget(self, codes):
+        """
+        Removes deleted activities from the registry.
+        """
+        for code in codes:
+            name = self._names.pop(code, None)
+            if name is not None:
+                self._by_name[name].pop(code, None)
+                if not self._by_name[name]:
+                    del self._by_name[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._by_name
+
+    def is_declared(self, name: str) -> bool:
+        """
+        Whether an activity with this name is declared anywhere in the configuration file.
+        """
+        return name.lower() in self.declared
+
+    def find(self, name: str, loc: str = None, unit: str = None) -> List[ActivityExtended]:
+        """
+        Finds foreground activities by name (case-insensitive), and optionally location and unit.
+        :return: the list of activities found, possibly empty
+        """
+        if '*' in name:  # wildcard: let lca_algebraic search the database
+            acts = agb.findActivity(name=name, loc=loc, unit=unit, db_name=USER_DB, single=False)
+            return acts if isinstance(acts, list) else [acts]
+        acts = []
+        for code, entry in self._by_name.get(name.lower(), {}).items():
+            if (loc and entry['location'] != loc) or (unit and entry['unit'] != unit):
+                continue
+            if entry['act'] is None:
+                entry['act'] = agb.getActByCode(USER_DB, code)
+            acts.append(entry['act'])
+        return acts
+
+    def unique_name(self, key: str) -> str:
+        """
+        Returns a unique activity name by incrementing a suffix number.
+        """
+        i = 1
+        while f'{key}_{i}'.lower() in self._by_name:
+            i += 1
+        return f'{key}_{i}'
 
-    return expr
+
+def _declared_activities(definition: dict) -> set:
+    """
+    Returns the keys of all the activities declared in (a section of) the model definition.
+    """
+    names = set()
+    stack = [definition]
+    while stack:
+        table = stack.pop()
+        for key, value in table.items():
+            if isinstance(value, dict):
+                names.add(key)
+                stack.append(value)
+    return names
+
+
+def _defined_params() -> set:
+    """
+    Returns the names of the parameters of the registry of lca_algebraic. The names of the parameters cleared by
+    resetParams(db_name) remain in the registry without definition: they are not returned.
+    """
+    return {name for name, params in agb.params._param_registry().params.items() if params}
+
+
+class ExpressionCompiler:
+    """
+    Compiles the exchange expressions of the configuration file and creates the parameters they involve.
+
+    Generated configuration files repeat the same few formulas many times, so the compiler memoizes:
+    - the parsed expressions, interned by amount string;
+    - the names of the parameters already defined (symbol table), updated as parameters are created;
+    - the results of the special formula sum(), per activity and name pattern.
+
+    :param params_meta_dict: metadata of the parameters, as defined in a specific section of the configuration file.
+    """
+
+    def __init__(self, params_meta_dict: dict = None):
+        self.params_meta_dict = params_meta_dict if params_meta_dict else {}
+        self._expressions = {}  # amount => sympy expression
+        self._known_params = _defined_params()  # names of the defined parameters
+        self._sums = {}  # (activity key, exchange name) => sum of the amounts of the exchanges
+
+    def sympify(self, amount):
+        """
+        Parses an amount (string or number) to a sympy expression. The result is interned, since sympy expressions
+        are immutable.
+        """
+        key = amount if isinstance(amount, str) else (type(amount), amount)
+        try:
+            return self._expressions[key]
+        except KeyError:
+            profiling.count('expressions parsed')
+            expr = self._expressions[key] = sympify(amount)
+            return expr
+        except TypeError:  # unhashable amount: let sympy handle it
+            return sympify(amount)
+
+    def declare(self, name: str):
+        """
+        Adds a parameter created outside of the compiler (e.g. a switch parameter) to the symbol table.
+        """
+        self._known_params.add(name)
+
+    def forget(self, names):
+        """
+        Removes deleted parameters from the symbol table.
+        """
+        self._known_params.difference_update(names)
+
+    def sum_amounts(self, act, exchange_name):
+        """
+        Cached version of sum_amounts(). See clear_sums() to invalidate the cache when exchanges are modified.
+        """
+        key = (act.key, exchange_name)
+        if key not in self._sums:
+            self._sums[key] = sum_amounts(act, exchange_name)
+        return self._sums[key]
+
+    def clear_sums(self):
+        """
+        Clears the cached results of sum(), to be called when exchanges of background activities are modified.
+        """
+        self._sums.clear()
+
+    def _new_param(self, name: str):
+        """
+        Creates a new float parameter, using its metadata if provided in the configuration file.
+        """
+        param_meta = self.params_meta_dict.get(name, {})
+        profiling.count('parameters created')
+        agb.newFloatParam(
+            name,  # name of the parameter
+            default=param_meta.get('default', 1.0),  # default value
+            min=param_meta.get('min', 1.0),
+            max=param_meta.get('max', 1.0),
+            unit=param_meta.get('unit', None),
+            description=param_meta.get('description', None),
+            distrib=param_meta.get('distrib', agb.DistributionType.LINEAR),
+            formula=self.sympify(param_meta.get('formula', None)),
+            label=param_meta.get('label', None),
+            group=param_meta.get('group', None),
+            dbname=USER_DB  # we define the parameter in the foreground database
+        )
+        self._known_params.add(name)
+
+    def parse_exchange(self, table: dict, act: ActivityExtended = None):
+        """
+        Gets the exchange expression from the table of options for the activity, then creates the input parameters and returns the symbolic expression of the exchange
+
+        :param table: the table of options for the activity.
+        :param act: the activity itself. Only used if special formula sum() is used in the exchange amount.
+        :return expr: the symbolic expression.
+        """
+        # Get the 'amount' value of the exchange. If it doesn't exist then set the exchange quantity to 1
+        exchange = table.get(KEY_EXCHANGE, EXCHANGE_DEFAULT_VALUE)
+
+        # Special formula sum() to sum the amounts of all exchanges with a given name in the activity
+        # E.g. 'sum(electricity*)' will sum the amounts of all exchanges with the name 'electricity' (whatever the location)
+        if act and 'sum(' in str(exchange):
+            selected_exchanges = str(exchange).split('sum(')[1].split(')')[0]
+            if selected_exchanges:
+                sum_value = str(self.sum_amounts(act, selected_exchanges))
+                exchange = str(exchange).replace(f'sum({selected_exchanges})', sum_value)
+
+        # Parse the string expression
+        expr = self.sympify(exchange)
+
+        # Create new parameters if necessary
+        registry = agb.params._param_registry()
+        for param in expr.free_symbols:
+            if param == agb.old_amount or param.name in self._known_params:  # skip the special 'old_amount' parameter
+                continue
+            if registry.params.get(param.name):  # defined elsewhere, e.g. loaded from a previous build
+                self._known_params.add(param.name)
+                continue
+            self._new_param(param.name)
+
+        return expr
+
+
+def _parse_exchange(table: dict, act: ActivityExtended = None, params_meta_dict: dict = None):
+    """
+    Gets the exchange expression from the table of options for the activity, then creates the input parameters and returns the symbolic expression of the exchange.
+    See ExpressionCompiler to parse several exchanges.
+
+    :param table: the table of options for the activity.
+    :param act: the activity itself. Only used if special formula sum() is used in the exchange amount.
+    :param params_meta_dict: metadata of the parameters, as defined in a specific section of the configuration file.
+    :return expr: the symbolic expression.
+    """
+    return ExpressionCompiler(params_meta_dict).parse_exchange(table, act=act)
 
 
 def sum_amounts(act, exchange_name):
@@ -215,14 +583,99 @@ def newMultiSwitchAct(dbname, name, paramDefList: Union[List[ParamDef], ParamDef
     return res
 
 
-def create_custom_lcia_method(name: str, filepath: str, unit: str = None, source_method: str = None):
+def _file_hash(filepath: str) -> str:
+    """
+    Returns the hash of the content of a file.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _custom_method_signature(filepath: str, unit: str = None, source_method=None) -> str:
+    """
+    Returns the signature of the import of a custom LCIA method: the method is imported again only if it changes.
+    """
+    return _hash_definition({'file': _file_hash(filepath), 'unit': unit, 'source_method': source_method})
+
+
+def _is_custom_method_up_to_date(name, signature: str) -> bool:
+    """
+    Checks if a custom LCIA method was imported from the same file, unit and source method, and if the flows of the
+    user biosphere it refers to still exist.
+    """
+    if name not in bw.methods or bw.methods[name].get(CUSTOM_METHOD_SIGNATURE_KEY) != signature:
+        return False
+    user_codes = {flow[1] for flow, _ in bw.Method(name).load() if flow[0] == USER_BIOSPHERE_DB_NAME}
+    if not user_codes:
+        return True
+    query = ActivityDataset.select(ActivityDataset.code).where(ActivityDataset.database == USER_BIOSPHERE_DB_NAME)
+    return user_codes.issubset(code for (code,) in query.tuples())
+
+
+def _get_flows_data(flows) -> Dict[Tuple[str, str], dict]:
+    """
+    Gets the data of biosphere flows with a single query per database (and per chunk of SQLITE_MAX_VARIABLES flows).
+    :param flows: keys (database, code) of the flows
+    :return: dict of key => data of the flow
+    """
+    codes_per_db = defaultdict(list)
+    for db_name, code in flows:
+        codes_per_db[db_name].append(code)
+    res = {}
+    for db_name, codes in codes_per_db.items():
+        for i in range(0, len(codes), SQLITE_MAX_VARIABLES):
+            query = ActivityDataset.select(ActivityDataset.code, ActivityDataset.data).where(
+                (ActivityDataset.database == db_name) & (ActivityDataset.code.in_(codes[i:i + SQLITE_MAX_VARIABLES]))
+            )
+            res.update({(db_name, code): data for code, data in query.tuples()})
+    return res
+
+
+def _custom_method_unit(name, unit: str = None, source_method=None):
+    """
+    Returns the unit of a custom LCIA method: the unit of the source method if provided.
+    """
+    if source_method:
+        source_method_unit = bw.Method(source_method).metadata.get('unit')
+        if unit != source_method_unit:
+            _LOGGER.warning(f"Unit `{unit}` provided for method {name} is different from source method. "
+                            f"Overriding with source method unit `{source_method_unit}`.")
+        unit = source_method_unit if unit != source_method_unit or not unit else unit
+    return unit
+
+
+def _read_custom_lcia_method(name, filepath: str, unit: str = None):
+    """
+    Reads the file of a custom LCIA method and links its characterization factors to the default biosphere.
+    Does not write to the project: can run in a worker process.
+    :return: the data of the importer
+    """
+    from bw2io.importers import ExcelLCIAImporter, CSVLCIAImporter
+
+    Importer = CSVLCIAImporter if os.path.splitext(filepath)[1] == '.csv' else ExcelLCIAImporter
+    newLCIA = Importer(filepath, name, DEFAULT_DESC_LCIA, unit)
+    newLCIA.apply_strategies(verbose=False)
+    return newLCIA.data
+
+
+def _init_reader(project_name: str):
+    bw.projects.set_current(project_name)
+
+
+def create_custom_lcia_method(name: str, filepath: str, unit: str = None, source_method: str = None, data=None):
     """
     Creates a new LCIA method from an Excel file.
+    The import is skipped if the method was already imported from the same file content, unit and source method.
 
     :param name: name of the new method
     :param filepath: path to the Excel file
     :param unit: unit of the method
     :param source_method: name of the source method to duplicate and modify from. If not provided, the method is created from scratch.
+    :param data: characterization factors already read and linked to the default biosphere (see _read_custom_lcia_method()).
+    Read from the file if not provided.
     """
 
     if name in bw.methods and bw.methods.get(name).get('description') != DEFAULT_DESC_LCIA:
@@ -231,71 +684,78 @@ def create_custom_lcia_method(name: str, filepath: str, unit: str = None, source
              f"If you wish to duplicate and modify, use `{KEY_SOURCE_METHOD}` option.")
         return
 
-    print("Creating custom LCIA method ", name)
-
     file_name, file_extension = os.path.splitext(filepath)
     if file_extension not in ['.csv', '.xlsx']:
         raise ValueError("File extension not supported. Please provide a CSV or Excel file.")
     if file_extension == '.csv' and not is_comma_separated(filepath):
         raise ValueError("CSV file must be comma-separated. Please convert the file to a CSV with commas.")
 
-    if source_method:
-        source_method_unit = bw.Method(source_method).metadata.get('unit')
-        if unit != source_method_unit:
-            _LOGGER.warning(f"Unit `{unit}` provided for method {name} is different from source method. "
-                            f"Overriding with source method unit `{source_method_unit}`.")
-        unit = source_method_unit if unit != source_method_unit or not unit else unit
+    signature = _custom_method_signature(filepath, unit, source_method)
+    if _is_custom_method_up_to_date(name, signature):
+        print(f"Custom LCIA method {name} is up to date, skipping.")
+        return
 
-    Importer = CSVLCIAImporter if file_extension == '.csv' else ExcelLCIAImporter
-    newLCIA = Importer(filepath, name, DEFAULT_DESC_LCIA, unit)
+    print("Creating custom LCIA method ", name)
+    unit = _custom_method_unit(name, unit, source_method)
 
-    # Link with existing biosphere flows
-    newLCIA.apply_strategies(verbose=False)
+    import bw2io.export.excel
+    from bw2io.importers import ExcelLCIAImporter, CSVLCIAImporter
+
+    Importer = CSVLCIAImporter if file_extension == '.csv' else ExcelLCIAImporter
+    if data is None:
+        data = _read_custom_lcia_method(name, filepath, unit)  # Link with existing biosphere flows
+    newLCIA = Importer.__new__(Importer)
+    newLCIA.applied_strategies = []
+    newLCIA.data = data
 
     # If remaining flows: create biosphere database to define new flows
     if newLCIA.statistics(print_stats=False)[2] != 0:
-        # User biosphere to store new flows (e.g. contrails)
-        user_biosphere = bw.Database(USER_BIOSPHERE_DB_NAME)
-        user_biosphere.write(dict())
+        # User biosphere to store new flows (e.g. contrails). Flows of other custom methods are kept.
+        if USER_BIOSPHERE_DB_NAME not in bw.databases:
+            bw.Database(USER_BIOSPHERE_DB_NAME).write(dict())
 
         # Link with existing flows in user biosphere
-        super(ExcelLCIAImporter, newLCIA).__init__(
-            filepath,
-            biosphere=USER_BIOSPHERE_DB_NAME
-        )  # Waiting for bw2io fix on that (issue #249)
-        newLCIA.apply_strategies(verbose=False)
-
-        # Add missing flows and link
-        super(ExcelLCIAImporter, newLCIA).__init__(
-            filepath,
-            biosphere=USER_BIOSPHERE_DB_NAME
-        )  # for some reason instance has to be reset, probably to reinit strategy functions with latest data available.
-        newLCIA.add_missing_cfs()  # add missing flows to dedicated biosphere db
-        newLCIA.apply_strategies(verbose=False)
+        if len(bw.Database(USER_BIOSPHERE_DB_NAME)):
+            super(ExcelLCIAImporter, newLCIA).__init__(
+                filepath,
+                biosphere=USER_BIOSPHERE_DB_NAME
+            )  # Waiting for bw2io fix on that (issue #249)
+            newLCIA.apply_strategies(verbose=False)
+
+        # Add missing flows to dedicated biosphere db, and link them directly
+        newLCIA.biosphere_name = USER_BIOSPHERE_DB_NAME
+        newLCIA.add_missing_cfs()
+        for method in newLCIA.data:
+            for cf in method["exchanges"]:
+                if "input" not in cf and "code" in cf:
+                    cf["input"] = (USER_BIOSPHERE_DB_NAME, cf["code"])
 
     # Add additional data from source method
     if source_method:
         source_cfs = bw.Method(source_method).load()
         for method in newLCIA.data:
-            new_cfs_flows = [cf["input"] for cf in method["exchanges"] if "input" in cf]
-            for flow, cf_value in source_cfs:
-                if flow not in new_cfs_flows:
-                    flow_data = bw.Database(flow[0]).get(flow[1])
-                    method["exchanges"].append(
-                        {
-                            "name": flow_data.get("name"),
-                            "categories": flow_data.get("categories"),
-                            "amount": cf_value,
-                            "unit": flow_data.get("unit"),
-                            "type": flow_data.get("type"),
-                            "code": flow_data.get("code"),
-                            "input": flow,
-                        }
-                    )
+            new_cfs_flows = {cf["input"] for cf in method["exchanges"] if "input" in cf}
+            missing_cfs = [(flow, cf_value) for flow, cf_value in source_cfs if flow not in new_cfs_flows]
+            flows_data = _get_flows_data([flow for flow, _ in missing_cfs])  # single query
+            for flow, cf_value in missing_cfs:
+                flow_data = flows_data.get(tuple(flow), {})
+                method["exchanges"].append(
+                    {
+                        "name": flow_data.get("name"),
+                        "categories": flow_data.get("categories"),
+                        "amount": cf_value,
+                        "unit": flow_data.get("unit"),
+                        "type": flow_data.get("type"),
+                        "code": flow[1],
+                        "input": flow,
+                    }
+                )
 
     # Write new LCIA method
     newLCIA.statistics()
     newLCIA.write_methods(overwrite=True)
+    bw.methods[name][CUSTOM_METHOD_SIGNATURE_KEY] = signature
+    bw.methods.flush()
 
     # Write excel file of new method updated with data from source method
     if source_method:
@@ -305,6 +765,47 @@ def create_custom_lcia_method(name: str, filepath: str, unit: str = None, source
         print(u"Wrote matching file to:\n{}".format(fp_destination))
 
 
+def create_custom_lcia_methods(methods: List[Dict], max_workers: int = 1):
+    """
+    Creates several custom LCIA methods. The methods that are not up to date are read and linked to the default
+    biosphere in parallel (one worker process per method), then written to the project one at a time.
+
+    :param methods: list of dictionaries with the arguments of create_custom_lcia_method() (name, filepath, unit,
+    source_method)
+    :param max_workers: maximum number of worker processes
+    """
+    to_read = []
+    for method in methods:
+        name, filepath = method['name'], method['filepath']
+        if name in bw.methods and bw.methods[name].get('description') != DEFAULT_DESC_LCIA:
+            continue  # protected method: see create_custom_lcia_method()
+        if os.path.splitext(filepath)[1] not in ['.csv', '.xlsx']:
+            continue
+        signature = _custom_method_signature(filepath, method.get('unit'), method.get('source_method'))
+        if not _is_custom_method_up_to_date(name, signature):
+            to_read.append(method)
+
+    data = {}
+    if max_workers > 1 and len(to_read) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        print(f"Reading {len(to_read)} custom LCIA methods with {min(max_workers, len(to_read))} workers")
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(to_read)),
+                                 mp_context=multiprocessing.get_context('spawn'), initializer=_init_reader,
+                                 initargs=(bw.projects.current,)) as executor:
+            futures = {
+                method['name']: executor.submit(
+                    _read_custom_lcia_method, method['name'], method['filepath'],
+                    _custom_method_unit(method['name'], method.get('unit'), method.get('source_method')))
+                for method in to_read
+            }
+            data = {name: future.result() for name, future in futures.items()}
+
+    for method in methods:
+        create_custom_lcia_method(method['name'], method['filepath'], method.get('unit'), method.get('source_method'),
+                                  data=data.get(method['name']))
+
+
 class LCAProblemConfigurator:
     """
     class for configuring an LCA_algebraic problem from a configuration file
@@ -317,6 +818,13 @@ class LCAProblemConfigurator:
     def __init__(self, conf_file_path=None):
         self._conf_file = None
         self._serializer = _YAMLSerializer()
+        self._previous_build = None  # state of the last build, if compatible with an incremental build
+        self._build_reads = None  # foreground activities reused by the subtree being built
+        self._build_uses = None  # parameters used by the subtree being built
+        self._compiler = None  # compiler of the exchange expressions, set at each build
+        self._premise_proxies = {}  # premise proxies shared by the references to the same background activity
+        self._foreground = None  # in-memory registry of the foreground activities, set at each build
+        self.profile_report = None  # profiling report of the last generation, if option 'profile' is set
 
         if conf_file_path:
             self.load(conf_file_path)
@@ -327,23 +835,79 @@ class LCAProblemConfigurator:
         Also gets the LCIA methods defined in the conf file.
         :return: model: the top-level activity corresponding to the functional unit
         :return: methods: the LCIA methods
+
+        If option 'profile' is set in the configuration file, the duration of each phase of the generation and of the
+        build of each activity is measured, together with counters (queries issued by lca_modeller, activities created
+        and copied, exchanges written, parameters created, expressions parsed). The report is written to a JSON file (the given
+        path, or the configuration file path with suffix '.profile.json'), stored in attribute `profile_report`, and
+        a summary is printed.
         """
 
         # Reset project for fresh start?
         reset = self._serializer.data.get(KEY_RESET, False)
+        # Only rebuild the parts of the model that changed since last build?
+        incremental = self._serializer.data.get(KEY_INCREMENTAL, False)
+        # Measure the duration of each phase?
+        profile = self._serializer.data.get(KEY_PROFILE, False)
+
+        with profiling.profiling() if profile else nullcontext() as profiler:
+            # Create model from configuration file
+            project_name, model = self._build_model(reset=reset, incremental=incremental)
+
+            # Get LCIA methods if declared
+            methods = [eval(m) for m in self._serializer.data.get(KEY_METHODS, [])]
+            custom_methods = [eval(m.get(KEY_NAME)) for m in self._serializer.data.get(KEY_CUSTOM_METHODS, [])]
+            methods.extend(custom_methods)
+
+            # Compile the impact functions of all the methods at once
+            compilation = self._serializer.data.get(KEY_COMPILATION, dict())
+            from lca_modeller.evaluation.compilation import configure_compilation
+            configure_compilation(cse=compilation.get(KEY_CSE, True),
+                                  max_size=compilation.get(KEY_MAX_EXPRESSION_SIZE),
+                                  action=compilation.get(KEY_SIZE_LIMIT_ACTION, 'warn'))
+
+            # Reuse the compiled impact functions of previous processes if nothing changed
+            from lca_modeller.evaluation.cache import disable_compiled_cache, enable_compiled_cache, model_fingerprint
+            if self._serializer.data.get(KEY_COMPILED_CACHE, False):
+                with profiling.span('compiled cache'):
+                    generated = (USER_DB, USER_BIOSPHERE_DB_NAME)
+                    enable_compiled_cache(model_fingerprint(self._fingerprint_content(), methods,
+                                                            generated_databases=generated),
+                                          generated_databases=generated)
+            else:
+                disable_compiled_cache()  # possibly enabled by the generation of another model
 
-        # Create model from configuration file
-        project_name, model = self._build_model(reset=reset)
+            # Keep the LCIA scores of background activities across generations and processes
+            if self._serializer.data.get(KEY_SCORE_STORE, False):
+                from lca_modeller.evaluation.scores import enable_score_store
+                enable_score_store()
 
-        # Get LCIA methods if declared
-        methods = [eval(m) for m in self._serializer.data.get(KEY_METHODS, [])]
-        custom_methods = [eval(m.get(KEY_NAME)) for m in self._serializer.data.get(KEY_CUSTOM_METHODS, [])]
-        methods.extend(custom_methods)
+        if profiler is not None:
+            self._write_profile(profiler, profile)
 
         # also return list of parameters?
 
         return project_name, model, methods
 
+    def _write_profile(self, profiler, profile):
+        """
+        Writes the profiling report of the generation to a JSON file and prints its summary.
+        :param profiler: the profiler of the generation
+        :param profile: value of option 'profile' in the configuration file: True or path of the report
+        """
+        self.profile_report = profiler.report()
+        if isinstance(profile, str):
+            file_path = profile if pth.isabs(profile) or not self._conf_file \
+                else pth.join(pth.dirname(self._conf_file), profile)
+        elif self._conf_file:
+            file_path = pth.splitext(self._conf_file)[0] + PROFILE_SUFFIX
+        else:
+            file_path = None
+        print("Profile of the generation of the model:\n" + profiler.summary())
+        if file_path:
+            profiler.write(file_path)
+            print(f"Profiling report written to {file_path}")
+
     def load(self, conf_file):
         """
         Reads the problem definition
@@ -353,14 +917,11 @@ class LCAProblemConfigurator:
 
         self._conf_file = pth.abspath(conf_file)  # for resolving relative paths
 
+        # Parsing and syntax validation, skipped if the same content has already been loaded (see config_cache)
+        json_schema, schema_hash = _json_schema()
         self._serializer = _YAMLSerializer()
-        self._serializer.read(self._conf_file)
-
-        # Syntax validation
-        with open_text(resources, JSON_SCHEMA_NAME) as json_file:
-            json_schema = json.loads(json_file.read())
+        self._serializer.read_validated(self._conf_file, _validate_configuration, salt=schema_hash)
 
-        validate(self._serializer.data, json_schema)
         # Issue a simple warning for unknown keys at root level
         for key in self._serializer.data:
             if key not in json_schema["properties"].keys():
@@ -368,38 +929,65 @@ class LCAProblemConfigurator:
 
     def _setup_premise(self, new_premise_scenarios: List[Dict], db_names: List[str] = None):
         """
-        Generates the prospective databases with premise
+        Generates the prospective databases with premise, or imports them from the artifact store if they have already
+        been generated with the same ecoinvent version, premise version, scenario and updated sectors.
         """
         if not new_premise_scenarios:
             return
-        else:
-            print("Generating new prospective databases with premise: \n" + ",\n".join([f"{s[KEY_MODEL]}_{s[KEY_PATHWAY]}_{s[KEY_YEAR]}" for s in new_premise_scenarios]))
+        premise_dict = self._serializer.data.get(KEY_PREMISE, dict())
+        sectors_to_update = premise_dict.get(KEY_UPDATE_PREMISE)
+        store = get_artifact_store(premise_dict.get(KEY_ARTIFACT_STORE, False))
+        keys = [artifact_key(self.ei_version, self.ei_model, scenario, sectors_to_update)
+                for scenario in new_premise_scenarios]
+
+        ### Import the databases already available in the artifact store
+        if store is not None:
+            scenarios_to_generate = []
+            for scenario, db_name, key in zip(new_premise_scenarios, db_names, keys):
+                if store.has(key):
+                    print(f"Importing prospective database {db_name} from artifact store {store.directory}")
+                    if store.import_database(key, db_name):
+                        continue
+                scenarios_to_generate.append((scenario, db_name, key))
+            if not scenarios_to_generate:
+                return
+            new_premise_scenarios, db_names, keys = [list(items) for items in zip(*scenarios_to_generate)]
+
+        print("Generating new prospective databases with premise: \n" + ",\n".join([f"{s[KEY_MODEL]}_{s[KEY_PATHWAY]}_{s[KEY_YEAR]}" for s in new_premise_scenarios]))
         if "biosphere3" not in bw.databases:
             raise ValueError(
                 f"Biosphere database must be named 'biosphere3' for premise, or is missing. "
                 f"Consider resetting the project with 'reset_project=True' in configuration file."
             )
-        pm.clear_cache()  # fresh start
-        ndb = pm.NewDatabase(
-            scenarios=new_premise_scenarios,
-            source_type="brightway",
+        from lca_modeller.io.prospective import generate_premise_databases  # premise is only imported when needed
+        generate_premise_databases(
+            new_premise_scenarios,
+            db_names,
             source_db=self.source_ei_name,
             source_version=self.ei_version,
             system_model=self.ei_model,
-            key='tUePmX_S5B8ieZkkM7WUU2CnO8SmShwmAeWK9x2rTFo=',
-            quiet=True
+            sectors_to_update=sectors_to_update,
+            max_workers=premise_dict.get(KEY_MAX_WORKERS, 1),
+            max_memory=premise_dict.get(KEY_MAX_MEMORY),
         )
-        premise_dict = self._serializer.data.get(KEY_PREMISE, dict())
-        sectors_to_update = premise_dict.get(KEY_UPDATE_PREMISE)
-        if sectors_to_update == 'all':
-            ndb.update()
-        elif isinstance(sectors_to_update, list):
-            ndb.update(sectors_to_update)
-        ndb.write_db_to_brightway(name=db_names)
 
-    def _setup_project(self, reset: bool = False):
+        ### Store the new databases for future projects
+        if store is not None:
+            for scenario, db_name, key in zip(new_premise_scenarios, db_names, keys):
+                try:
+                    store.export_database(key, db_name, description={
+                        'ecoinvent': [self.ei_version, self.ei_model],
+                        'scenario': scenario,
+                        'update': sectors_to_update,
+                    })
+                except Exception as e:
+                    _LOGGER.warning(f"Could not store prospective database {db_name} in the artifact store ({e}).")
+
+    def _setup_project(self, reset: bool = False, incremental: bool = False):
         """
         Sets the brightway2 project and import the databases
+        :param reset: if True, the project is deleted and created again from scratch
+        :param incremental: if True, the foreground database is kept when it was built from a compatible configuration
         """
         if self._serializer.data is None:
             raise RuntimeError("read configuration file first")
@@ -424,6 +1012,8 @@ class LCAProblemConfigurator:
             # User must create a file named .env, that he will not share /commit, and contains the following :
             # ECOINVENT_LOGIN=<your_login>
             # ECOINVENT_PASSWORD=<your_password>
+            from dotenv import load_dotenv
+            import bw2io
             load_dotenv()  # This load .env file that contains the credential for EcoInvent into os.environ
             if not os.getenv("ECOINVENT_LOGIN") or not os.getenv("ECOINVENT_PASSWORD"):
                 raise RuntimeError(
@@ -433,13 +1023,14 @@ class LCAProblemConfigurator:
                     "ECOINVENT_PASSWORD=<your_password>\n")
 
             # This downloads ecoinvent and installs biopshere + technosphere + LCIA methods
-            bw2io.import_ecoinvent_release(
-                version=ei_version,
-                system_model=ei_model,
-                biosphere_name=BIOSPHERE3_DB_NAME,  # <-- premise requires the biosphere to be named "biosphere3"
-                username=os.environ["ECOINVENT_LOGIN"],  # Read for .env file
-                password=os.environ["ECOINVENT_PASSWORD"],  # Read from .env file
-                use_mp=True)
+            with profiling.span('ecoinvent import'):
+                bw2io.import_ecoinvent_release(
+                    version=ei_version,
+                    system_model=ei_model,
+                    biosphere_name=BIOSPHERE3_DB_NAME,  # <-- premise requires the biosphere to be named "biosphere3"
+                    username=os.environ["ECOINVENT_LOGIN"],  # Read for .env file
+                    password=os.environ["ECOINVENT_PASSWORD"],  # Read from .env file
+                    use_mp=True)
 
         ### Generate prospective databases with premise
         new_premise_scenarios = []
@@ -452,33 +1043,87 @@ class LCAProblemConfigurator:
             if db_name not in bw.databases:
                 new_premise_scenarios.append(scenario)
                 db_names.append(db_name)
-        self._setup_premise(new_premise_scenarios, db_names)
+        with profiling.span('premise'):
+            self._setup_premise(new_premise_scenarios, db_names)
 
         ### Create new LCIA methods provided by user
         custom_methods = self._serializer.data.get(KEY_CUSTOM_METHODS, [])
-        agb.resetDb(USER_BIOSPHERE_DB_NAME, foreground=False)  # create biosphere db dedicated to new flows (e.g. contrails)
-        for method in custom_methods:
-            name = eval(method.get(KEY_NAME))
-            filepath = method.get(KEY_FILEPATH)
-            unit = method.get(KEY_UNIT)
-            source_method = eval(method.get(KEY_SOURCE_METHOD)) if method.get(KEY_SOURCE_METHOD) else None
-            create_custom_lcia_method(name, filepath, unit, source_method)
+        if USER_BIOSPHERE_DB_NAME not in bw.databases:
+            agb.resetDb(USER_BIOSPHERE_DB_NAME, foreground=False)  # create biosphere db dedicated to new flows (e.g. contrails)
+        custom_methods = [
+            {
+                'name': eval(method.get(KEY_NAME)),
+                'filepath': method.get(KEY_FILEPATH),
+                'unit': method.get(KEY_UNIT),
+                'source_method': eval(method.get(KEY_SOURCE_METHOD)) if method.get(KEY_SOURCE_METHOD) else None,
+            }
+            for method in custom_methods
+        ]
+        with profiling.span('custom LCIA methods'):
+            create_custom_lcia_methods(custom_methods,
+                                       max_workers=self._serializer.data.get(KEY_CUSTOM_METHODS_WORKERS, 1))
 
         ### Set the foreground database
-        agb.resetDb(USER_DB)  # cleanup the whole foreground model to avoid errors
-        agb.setForeground(USER_DB)
-        # You may remove this line if you import a project and parameters from an external source (see loadParam(..))
-        agb.resetParams()  # reset parameters stored at project level
+        self._previous_build = self._get_previous_build() if incremental and not reset else None
+        if self._previous_build is None:
+            agb.resetDb(USER_DB)  # cleanup the whole foreground model to avoid errors
+            agb.setForeground(USER_DB)
+            # You may remove this line if you import a project and parameters from an external source (see loadParam(..))
+            agb.resetParams()  # reset parameters stored at project level
+        else:
+            # Keep the foreground model of the last build and load its parameters
+            agb.setForeground(USER_DB)
+            agb.params._param_registry().clear()
+            agb.loadParams(global_variable=False, dbname=USER_DB)
 
         return project_name
 
-    def _build_model(self, reset: bool = False):
+    def _fingerprint_content(self) -> dict:
+        """
+        Returns the content of the configuration that determines the model, including the content of the files it
+        refers to (custom LCIA methods).
+        """
+        files = {}
+        for method in self._serializer.data.get(KEY_CUSTOM_METHODS, []):
+            filepath = method.get(KEY_FILEPATH)
+            if filepath and pth.exists(filepath):
+                files[filepath] = _file_hash(filepath)
+        content = {key: value for key, value in self._serializer.data.items() if key not in [KEY_RESET, KEY_PROFILE, KEY_CUSTOM_METHODS_WORKERS, KEY_SCORE_STORE]}
+        return dict(content, files=files)
+
+    def _settings_hash(self) -> str:
+        """
+        Returns the hash of the configuration sections, other than the model itself, that affect the build of the model.
+        """
+        settings = {key: value for key, value in self._serializer.data.items()
+                    if key not in [KEY_MODEL, KEY_METHODS, KEY_RESET, KEY_INCREMENTAL, KEY_COMPILED_CACHE, KEY_PROFILE,
+                                   KEY_CUSTOM_METHODS_WORKERS, KEY_SCORE_STORE, KEY_COMPILATION]}
+        return _hash_definition(settings)
+
+    def _get_previous_build(self):
+        """
+        Gets the description of the last build stored in the foreground database.
+        :return: the build state, or None if there is no previous build or if it is not compatible with the current
+        configuration (e.g. the ecoinvent version, the premise scenarios or the parameters metadata changed).
+        """
+        if USER_DB not in bw.databases:
+            return None
+        state = bw.databases[USER_DB].get(BUILD_STATE_KEY)
+        if not state or state.get('version') != BUILD_STATE_VERSION or state.get('settings') != self._settings_hash():
+            return None
+        if KEY_MODEL not in _foreground_codes():
+            return None
+        print("Foreground model from previous build is compatible with configuration file: incremental build.")
+        return state
+
+    def _build_model(self, reset: bool = False, incremental: bool = False):
         """
         Builds the LCA model as defined in the configuration file.
         """
 
         ### Set up the project
-        project_name = self._setup_project(reset=reset)
+        with profiling.span('setup project'):
+            project_name = self._setup_project(reset=reset, incremental=incremental)
 
         ### Get parameters metadata if declared (used for parameters definition during the model creation)
         params_meta_array = self._serializer.data.get(KEY_METADATA)  # List of dictionaries (one per parameter)
@@ -486,18 +1131,39 @@ class LCAProblemConfigurator:
             self.params_meta_dict = {param_metadata.get(KEY_PARAMETER): param_metadata for param_metadata in params_meta_array}
         else:
             self.params_meta_dict = {}
+        self._compiler = ExpressionCompiler(self.params_meta_dict)
+        self._premise_proxies = {}  # (name, loc, unit) => shared interpolation subgraph and switch activities
 
         ### Build the model
         print("Building LCA model from configuration file")
         # Get model definition from configuration file
         model_definition = self._serializer.data.get(KEY_MODEL)
-        model = agb.newActivity(
-            db_name=USER_DB,
-            name=KEY_MODEL,
-            unit=None
-        )
+        if KEY_NAME in model_definition and self._previous_build is not None:
+            # The model is itself a background activity: nothing to track, build it from scratch
+            agb.resetDb(USER_DB)
+            agb.resetParams(db_name=USER_DB)
+            self._previous_build = None
+
+        build_state = None
+        self._foreground = ForegroundRegistry.load(_declared_activities(model_definition))
+        # All foreground activities and exchanges are written in a single transaction
+        with profiling.span('build model'), bulk_write():
+            if self._previous_build is None:
+                model = self._foreground.add(agb.newActivity(
+                    db_name=USER_DB,
+                    name=KEY_MODEL,
+                    unit=None
+                ))
+            else:
+                model = agb.getActByCode(USER_DB, KEY_MODEL)
+            if KEY_NAME in model_definition:
+                self._parse_problem_table(model, model_definition)
+            else:
+                build_state = self._parse_model_subtrees(model, model_definition)
 
-        self._parse_problem_table(model, model_definition)
+        if build_state is not None:
+            bw.databases[USER_DB][BUILD_STATE_KEY] = build_state
+            bw.databases.flush()
 
         # Functional unit scaling
         # if KEY_FUNCTIONAL_VALUE in model_definition and model_definition[KEY_FUNCTIONAL_VALUE] != 1.0:
@@ -515,6 +1181,92 @@ class LCAProblemConfigurator:
 
         return project_name, model
 
+    def _parse_model_subtrees(self, model, model_definition: dict) -> dict:
+        """
+        Feeds the model with the top-level subtrees of the model definition, one at a time, and keeps track of the
+        foreground activities, parameters and exchanges of the model created or reused by each of them.
+        If a previous build is available, only the subtrees whose definition changed since then, or that reuse an
+        activity of a changed subtree, are dropped and rebuilt. The other ones are kept as is in the foreground database.
+        Dropping a subtree also deletes the exchanges it added to the model, including those to activities that are
+        kept (background activities, biosphere flows, foreground activities referred to with '#').
+
+        :param model: the top-level activity
+        :param model_definition: the 'model' section of the configuration file
+        :return: the state of the build, to be stored in the project for the next incremental build
+        """
+        subtrees = {key: value for key, value in model_definition.items() if isinstance(value, dict)}
+        hashes = {key: _hash_definition(value) for key, value in subtrees.items()}
+        previous = self._previous_build['subtrees'] if self._previous_build else {}
+
+        # Subtrees to drop: changed or removed
+        dirty = {key for key, entry in previous.items() if hashes.get(key) != entry['hash']}
+        # ... and those reusing activities created by a subtree to drop
+        propagate = True
+        while propagate:
+            dropped_codes = set().union(*[previous[key]['activities'] for key in dirty])
+            propagate = False
+            for key, entry in previous.items():
+                if key not in dirty and dropped_codes.intersection(entry['reads']):
+                    dirty.add(key)
+                    propagate = True
+
+        if previous:
+            print(f"Rebuilding {len(dirty) + len(set(subtrees) - set(previous))} out of {len(subtrees)} "
+                  f"top-level activities")
+        clean = set(previous) - dirty
+        _drop_model_exchanges(set().union(*[previous[key]['exchanges'] for key in dirty]))
+        dropped_codes = set().union(*[previous[key]['activities'] for key in dirty])
+        _drop_foreground_activities(dropped_codes)
+        self._foreground.forget(dropped_codes)
+        used_by_clean = set().union(*[previous[key]['uses'] for key in clean])
+        dropped_params = (set().union(*[previous[key]['parameters'] for key in dirty])
+                          - used_by_clean - {KEY_YEAR, KEY_MODEL, KEY_PATHWAY})
+        _drop_parameters(dropped_params)
+        self._compiler.forget(dropped_params)
+
+        # Build (or keep) the subtrees in the order of the configuration file
+        state = {'version': BUILD_STATE_VERSION, 'settings': self._settings_hash(), 'subtrees': {}}
+        exchanges_before = _model_exchange_ids()
+        for key, value in subtrees.items():
+            if key in clean:
+                state['subtrees'][key] = previous[key]
+                continue
+            codes_before = _foreground_codes()
+            params_before = set(agb.params._param_registry().keys())
+            self._build_reads, self._build_uses = set(), set()
+            try:
+                self._parse_problem_table(model, {key: value})
+                state['subtrees'][key] = {
+                    'hash': hashes[key],
+                    'activities': sorted(_foreground_codes() - codes_before),
+                    'reads': sorted(self._build_reads),
+                    'parameters': sorted(set(agb.params._param_registry().keys()) - params_before),
+                    'uses': sorted(self._build_uses),
+                    'exchanges': sorted(_model_exchange_ids() - exchanges_before),
+                }
+                exchanges_before.update(state['subtrees'][key]['exchanges'])
+            finally:
+                self._build_reads, self._build_uses = None, None
+
+        return state
+
+    def _record_read(self, act):
+        """
+        Records that the subtree being built reuses an activity of the foreground database (incremental build).
+        """
+        if self._build_reads is not None and act.key[0] == USER_DB:
+            self._build_reads.add(act.key[1])
+
+    def _parse_exchange(self, table: dict, act: ActivityExtended = None):
+        """
+        Parses the exchange expression of the table (see ExpressionCompiler.parse_exchange()),
+        and records the parameters used by the subtree being built (incremental build).
+        """
+        expr = self._compiler.parse_exchange(table, act=act)
+        if self._build_uses is not None:
+            self._build_uses.update(symbol.name for symbol in expr.free_symbols)
+        return expr
+
     def _get_bio_activity(self, name, loc, categories, unit):
         """
         Searches for a biosphere activity in the default biosphere database.
@@ -526,7 +1278,7 @@ class LCAProblemConfigurator:
         :param unit: unit of the biosphere flow (e.g. 'kilogram')
         :return:
         """
-        sub_act = agb.findActivity(
+        sub_act = find_background_activity(
             name=name,
             loc=loc,
             categories=categories,
@@ -535,7 +1287,7 @@ class LCAProblemConfigurator:
             single=False
         )
         if not sub_act:
-            sub_act = agb.findActivity(
+            sub_act = find_background_activity(
                 name=name,
                 loc=loc,
                 categories=categories,
@@ -557,19 +1309,26 @@ class LCAProblemConfigurator:
 
         # Previously defined foreground activity
         if name.startswith('#'):
-            act = agb.findActivity(name[1:], single=False, db_name=USER_DB)
-            if not act:
+            acts = self._foreground.find(name[1:])
+            if not acts and self._foreground.is_declared(name[1:]):
+                raise ValueError(f"Activity '{name}' refers to activity '{name[1:]}', which is defined later in the "
+                                 f"configuration file. Activities must be defined before being referred to with '#'.")
+            elif not acts:
                 raise ValueError(f"Activity with name '{name}' not found.")
-            elif isinstance(act, list):
+            elif len(acts) > 1:
                 _LOGGER.warning(f"Multiple activities found with name '{name}'.")
-                act = act[0]
+            act = acts[0]
+            self._record_read(act)
             return act
 
         # Background activity
         # Check if not already defined as a copy in the foreground database
-        act = agb.findActivity(name=name, loc=loc, unit=unit, db_name=USER_DB, single=False)
-        if not act:  # If not, get it from the background database and copy it to the foreground database
-            act = agb.findActivity(
+        act = self._foreground.find(name, loc=loc, unit=unit)
+        if act:
+            act = act[0]
+            self._record_read(act)
+        else:  # If not, get it from the background database and copy it to the foreground database
+            act = find_background_activity(
                 name=name,
                 loc=loc,
                 unit=unit,
@@ -577,25 +1336,24 @@ class LCAProblemConfigurator:
             )
             # Copy activity to foreground database so that we can safely modify it in the future
             if copy_act:
-                act = agb.copyActivity(
+                profiling.count('activities copied')
+                act = self._foreground.add(agb.copyActivity(
                     USER_DB,
                     act,
                     code
-                )
+                ))
             # Fix for mismatch chemical formulas (until fixed by future brightway/lca-algebraic releases)
-            for ex in act.exchanges():
-                if "formula" in ex:
-                    del ex["formula"]
-                    ex.save()
+            _remove_exchange_formulas(act)
         return act
 
-    def _get_tech_activity_premise(self, name, loc, unit, copy_act: bool = True):
+    def _get_tech_activity_premise(self, name, loc, unit, copy_act: bool = True, variant: str = None):
         """
         Searches for an ecoinvent activity in all databases generated by premise.
         The activities are copied in the foreground database to avoid any modification of the background databases.
         :param name: name of the activity to search
         :param loc: geographical location
         :param unit: unit of activity
+        :param variant: if provided, dedicated copies are used (for activities modified in the configuration file)
         :return: a dict of (model, pathway, year): activity in the corresponding database
         """
         if not self.premise_scenarios:
@@ -608,11 +1366,16 @@ class LCAProblemConfigurator:
             year = scenario[KEY_YEAR]
             db_name = f"ecoinvent_{self.ei_model}_{self.ei_version.replace('3.9.1', '3.9')}_{model}_{pathway}_{year}"
             code = name + f"\n[{loc}]\n({model}_{pathway.replace('-', '_')}_{year})" if loc else name + f"\n({model}_{pathway.replace('-', '_')}_{year})"
+            if variant:
+                code += f"\n<{variant}>"
 
             # Check if activity not already defined as a copy in the foreground database
-            act = agb.findActivity(name=code, loc=loc, unit=unit, db_name=USER_DB, single=False)
-            if not act:  # If not, get it from the background database
-                act = agb.findActivity(  # This is the activity for a given model, pathway and year
+            act = self._foreground.find(code, loc=loc, unit=unit)
+            if act:
+                act = act[0]
+                self._record_read(act)
+            else:  # If not, get it from the background database
+                act = find_background_activity(  # This is the activity for a given model, pathway and year
                         name=name,
                         loc=loc,
                         unit=unit,
@@ -620,98 +1383,122 @@ class LCAProblemConfigurator:
                     )
                 # default behaviour: copy it to the foreground database to avoid unwanted modification of background db
                 if copy_act:
-                    act = agb.copyActivity(  # safe copy of background act
+                    profiling.count('activities copied')
+                    act = self._foreground.add(agb.copyActivity(  # safe copy of background act
                         db_name=USER_DB,
                         activity=act,
                         code=code  #name + f"\n({model}_{pathway.replace('-', '_')}_{year})"
-                    )
+                    ))
             acts[(model, pathway.replace('-', '_'), year)] = act
         return acts
 
-    def _create_proxy_activity_premise(self, name, loc, unit, code):
+    def _create_proxy_activity_premise(self, name, loc, unit, code, custom_attributes: List[Dict] = None,
+                                       variant: str = None):
         """
         Searches for an ecoinvent activity in the prospective databases and build a parent activity
         that enables to switch between scenarios with dedicated parameters.
+        The proxies are shared by all references to the same background activity (name, loc, unit): the copies of the
+        activity and the interpolation between years are created once. Each reference gets its own (lightweight) switch
+        activity, named after its key, unless the same key and custom attributes were already used.
         :param name: name of the activity to search
         :param loc: geographical location
         :param unit: unit of activity
         :param code: new name to give to activity when it will be copied to the foreground database
+        :param custom_attributes: custom attributes of the switch activity
+        :param variant: if provided, the activity is modified in the configuration file (update, add or delete) and
+        gets its own copies, interpolation and switch activity.
         :return: a multiswitch activity that points to the activity in the different prospective databases
         """
 
         # previously defined foreground activity --> not in premise. Regular search.
         if name.startswith('#'):
-            return self._get_tech_activity(name, loc, unit)
+            act = self._get_tech_activity(name, loc, unit)
+            _set_custom_attributes(act, custom_attributes or [])
+            return act
+
+        # Reuse the proxy of a previous reference to the same background activity
+        identity = (name, loc, unit)
+        switch_key = (code, json.dumps(custom_attributes or [], sort_keys=True, default=str))
+        proxy = self._premise_proxies.get(identity) if not variant else None
+        if proxy is not None:
+            for act in proxy['acts_dict'].values():
+                self._record_read(act)
+            if switch_key in proxy['switches']:
+                act = proxy['switches'][switch_key]
+                self._record_read(act)
+                return act
 
         # Create parameters for year, model and pathway
         years = list(set([scenario[KEY_YEAR] for scenario in self.premise_scenarios]))
         models = list(set([scenario[KEY_MODEL] for scenario in self.premise_scenarios]))
         pathways = list(set([scenario[KEY_PATHWAY].replace('-', '_') for scenario in self.premise_scenarios]))
         # nb: replaced '-' by '_' in pathway names to avoid issues with lca parameters definition
-        year_param = agb.params.all_params().get(
-            KEY_YEAR,  # get parameter if already defined
-            agb.newFloatParam(  # create float parameter if not already exists
-                name=KEY_YEAR,
-                default=years[0],
-                min=min(years),
-                max=max(years),
-                dbname=USER_DB
-            )
+        params = agb.params.all_params()
+        profiling.count('parameters created', len({KEY_YEAR, KEY_MODEL, KEY_PATHWAY} - set(params)))
+        year_param = params.get(KEY_YEAR) or agb.newFloatParam(  # create float parameter if not already exists
+            name=KEY_YEAR,
+            default=years[0],
+            min=min(years),
+            max=max(years),
+            dbname=USER_DB
         )
-        model_param = agb.params.all_params().get(
-            KEY_MODEL,  # get switch parameter if already defined
-            agb.newEnumParam(  # create switch parameter if not already exists
-                name=KEY_MODEL,
-                values=models,
-                default=models[0],
-                dbname=USER_DB
-            )
+        model_param = params.get(KEY_MODEL) or agb.newEnumParam(  # create switch parameter if not already exists
+            name=KEY_MODEL,
+            values=models,
+            default=models[0],
+            dbname=USER_DB
         )
-        pathway_param = agb.params.all_params().get(
-            KEY_PATHWAY,  # get switch parameter if already defined
-            agb.newEnumParam(  # create switch parameter if not already exists
-                name=KEY_PATHWAY,
-                values=pathways,
-                default=pathways[0],
-                dbname=USER_DB
-            )
+        pathway_param = params.get(KEY_PATHWAY) or agb.newEnumParam(  # create switch parameter if not already exists
+            name=KEY_PATHWAY,
+            values=pathways,
+            default=pathways[0],
+            dbname=USER_DB
         )
-
-        # Get the ecoinvent activity for each combination of model, pathway, and year
-        acts = self._get_tech_activity_premise(name, loc, unit)
-
-        # Dictionary to hold the lists of years for each (model, pathway)
-        model_pathway_years = {}
-        for model, pathway, year in acts.keys():
-            model_pathway = (model, pathway)
-            if model_pathway not in model_pathway_years:
-                model_pathway_years[model_pathway] = []
-            model_pathway_years[model_pathway].append(year)
-
-        # Dictionary to hold the activities that point to the different years for each (model, pathway)
-        acts_dict = {}
-        for model_pathway, years in model_pathway_years.items():
-            model = model_pathway[0]
-            pathway = model_pathway[1]
-            if len(years) == 1:
-                acts_dict[model_pathway] = acts[(model, pathway, years[0])]
-            else:  # create intermediate activity that is a linear interpolation between years
-                acts_dict[model_pathway] = agb.interpolate_activities(
-                    db_name=USER_DB,
-                    act_name=name + f"\n[{loc}]\n({model}_{pathway})" if loc else name + f"\n({model}_{pathway})",
-                    param=year_param,
-                    act_per_value={
-                        year: acts[(model, pathway, year)] for year in years
-                    },
-                )
+        for param in (year_param, model_param, pathway_param):
+            self._compiler.declare(param.name)
+
+        if proxy is None:
+            # Get the ecoinvent activity for each combination of model, pathway, and year
+            acts = self._get_tech_activity_premise(name, loc, unit, variant=variant)
+
+            # Dictionary to hold the lists of years for each (model, pathway)
+            model_pathway_years = {}
+            for model, pathway, year in acts.keys():
+                model_pathway = (model, pathway)
+                if model_pathway not in model_pathway_years:
+                    model_pathway_years[model_pathway] = []
+                model_pathway_years[model_pathway].append(year)
+
+            # Dictionary to hold the activities that point to the different years for each (model, pathway)
+            acts_dict = {}
+            for model_pathway, years in model_pathway_years.items():
+                model = model_pathway[0]
+                pathway = model_pathway[1]
+                if len(years) == 1:
+                    acts_dict[model_pathway] = acts[(model, pathway, years[0])]
+                else:  # create intermediate activity that is a linear interpolation between years
+                    acts_dict[model_pathway] = self._foreground.add(agb.interpolate_activities(
+                        db_name=USER_DB,
+                        act_name=(name + f"\n[{loc}]\n({model}_{pathway})" if loc else name + f"\n({model}_{pathway})")
+                        + (f"\n<{variant}>" if variant else ""),
+                        param=year_param,
+                        act_per_value={
+                            year: acts[(model, pathway, year)] for year in years
+                        },
+                    ))
+            proxy = dict(acts_dict=acts_dict, switches={})
+            if not variant:
+                self._premise_proxies[identity] = proxy
 
         # Create parent activity that enables to switch between each (model, pathway)
-        act = newMultiSwitchAct(
+        act = self._foreground.add(newMultiSwitchAct(
             dbname=USER_DB,
             name=code,
             paramDefList=[model_param, pathway_param],
-            acts_dict=acts_dict
-        )
+            acts_dict=proxy['acts_dict']
+        ))
+        _set_custom_attributes(act, custom_attributes or [])
+        proxy['switches'][switch_key] = act
 
         return act
 
@@ -729,7 +1516,7 @@ class LCAProblemConfigurator:
             loc = table.get(KEY_LOCATION, None)
             unit = table.get(KEY_UNIT, None)
             categories = table.get(KEY_CATEGORIES, None)
-            exchange = _parse_exchange(table, params_meta_dict=self.params_meta_dict)
+            exchange = self._parse_exchange(table)
             custom_attributes = table.get(KEY_CUSTOM_ATTR, [])
             update_exchanges = table.get(KEY_UPDATE_ACT, [])
             delete_exchanges = table.get(KEY_DELETE, [])
@@ -741,59 +1528,59 @@ class LCAProblemConfigurator:
                 if custom_attributes:
                     _LOGGER.warning(
                         f"Custom attributes cannot apply directly to biosphere flows ({name}). Creating intermediate activity.")
-                    sub_act = agb.newActivity(
+                    sub_act = self._foreground.add(agb.newActivity(
                         db_name=USER_DB,
                         name=name,
                         unit=unit,
                         exchanges={sub_act: 1.0},
-                    )
+                    ))
                     # Fix for mismatch chemical formulas (until fixed by future brightway/lca-algebraic releases)
-                    for ex in sub_act.exchanges():
-                        if "formula" in ex:
-                            del ex["formula"]
-                            ex.save()
-                    for attr in custom_attributes:
-                        attr_dict = {attr.get(KEY_ATTR_NAME): attr.get(KEY_ATTR_VALUE)}
-                        sub_act.updateMeta(**attr_dict)
+                    _remove_exchange_formulas(sub_act)
+                    _set_custom_attributes(sub_act, custom_attributes)
 
             # Technosphere activity
             else:
-                sub_act = self._get_tech_activity(name, loc, unit) if not self.premise_scenarios else \
-                    self._create_proxy_activity_premise(name, loc, unit, code=name)
-                # Add custom attributes
-                for attr in custom_attributes:
-                    attr_dict = {attr.get(KEY_ATTR_NAME): attr.get(KEY_ATTR_VALUE)}
-                    sub_act.updateMeta(**attr_dict)
+                variant = name if add_exchanges or update_exchanges or delete_exchanges else None
+                if not self.premise_scenarios:
+                    sub_act = self._get_tech_activity(name, loc, unit)
+                    # Add custom attributes
+                    _set_custom_attributes(sub_act, custom_attributes)
+                else:
+                    with profiling.span('premise proxy'):
+                        sub_act = self._create_proxy_activity_premise(name, loc, unit, code=name,
+                                                                      custom_attributes=custom_attributes,
+                                                                      variant=variant)
+                act_meta = {KEY_NAME: name, KEY_LOCATION: loc, KEY_UNIT: unit, KEY_VARIANT: variant}
                 # Add exchanges if defined in the configuration file
                 if add_exchanges:
-                    act_meta = {KEY_NAME: name, KEY_LOCATION: loc, KEY_UNIT: unit}
                     self._add_exchanges(sub_act, act_meta, add_exchanges)
                 # Update exchanges if defined in the configuration file
                 if update_exchanges:
-                    act_meta = {KEY_NAME: name, KEY_LOCATION: loc, KEY_UNIT: unit}
                     self._update_exchanges(sub_act, act_meta, update_exchanges)
                 # Delete exchanges if defined in the configuration file
                 if delete_exchanges:
-                    act_meta = {KEY_NAME: name, KEY_LOCATION: loc, KEY_UNIT: unit}
                     self._delete_exchanges(sub_act, act_meta, delete_exchanges)
             group.addExchanges({sub_act: exchange})
+            profiling.count('exchanges written')
 
         ### CASE 2: the table contains multiple activities
         for key, value in table.items():
-            if isinstance(value, dict):  # value defines a sub activity
+            if not isinstance(value, dict):  # value does not define a sub activity
+                continue
+            with profiling.span(key):
                 # Check if an activity with this key as already been defined to avoid overriding it
-                if agb.findActivity(key, db_name=USER_DB, single=False):
+                if key in self._foreground:
                     _LOGGER.warning(f"Activity with name '{key}' defined multiple times. "
                          f"Adding suffix increments to labels. "
                          f"To refer a pre-existing activity, use `name: '#activity_name'`.")
-                    key = _get_unique_activity_name(key)
+                    key = self._foreground.unique_name(key)
 
                 name = value.get(KEY_NAME, '')
                 if name:  # It is a background activity (or a previously defined activity)
                     loc = value.get(KEY_LOCATION, None)
                     unit = value.get(KEY_UNIT, None)
                     categories = value.get(KEY_CATEGORIES, None)
-                    exchange = _parse_exchange(value, params_meta_dict=self.params_meta_dict)
+                    exchange = self._parse_exchange(value)
                     custom_attributes = value.get(KEY_CUSTOM_ATTR, [])
                     update_exchanges = value.get(KEY_UPDATE_ACT, [])
                     delete_exchanges = value.get(KEY_DELETE, [])
@@ -804,40 +1591,37 @@ class LCAProblemConfigurator:
                         sub_act = self._get_bio_activity(name, loc, categories, unit)
                         if custom_attributes:
                             _LOGGER.warning(f"Custom attributes cannot apply directly to biosphere flows ({key}). Creating intermediate activity.")
-                            sub_act = agb.newActivity(
+                            sub_act = self._foreground.add(agb.newActivity(
                                 db_name=USER_DB,
                                 name=key,
                                 unit=unit,
                                 exchanges={sub_act: 1.0},
-                            )
+                            ))
                             # Fix for mismatch chemical formulas (until fixed by future brightway/lca-algebraic releases)
-                            for ex in sub_act.exchanges():
-                                if "formula" in ex:
-                                    del ex["formula"]
-                                    ex.save()
-                            for attr in custom_attributes:
-                                attr_dict = {attr.get(KEY_ATTR_NAME): attr.get(KEY_ATTR_VALUE)}
-                                sub_act.updateMeta(**attr_dict)
+                            _remove_exchange_formulas(sub_act)
+                            _set_custom_attributes(sub_act, custom_attributes)
 
                     # Technosphere activity
                     else:
-                        sub_act = self._get_tech_activity(name, loc, unit, key) if not self.premise_scenarios else \
-                            self._create_proxy_activity_premise(name, loc, unit, code=key)
-                        # Add custom attributes
-                        for attr in custom_attributes:
-                            attr_dict = {attr.get(KEY_ATTR_NAME): attr.get(KEY_ATTR_VALUE)}
-                            sub_act.updateMeta(**attr_dict)
+                        variant = key if add_exchanges or update_exchanges or delete_exchanges else None
+                        if not self.premise_scenarios:
+                            sub_act = self._get_tech_activity(name, loc, unit, key)
+                            # Add custom attributes
+                            _set_custom_attributes(sub_act, custom_attributes)
+                        else:
+                            with profiling.span('premise proxy'):
+                                sub_act = self._create_proxy_activity_premise(name, loc, unit, code=key,
+                                                                              custom_attributes=custom_attributes,
+                                                                              variant=variant)
+                        act_meta = {KEY_NAME: name, KEY_LOCATION: loc, KEY_UNIT: unit, KEY_VARIANT: variant}
                         # Add exchanges if defined in the configuration file
                         if add_exchanges:
-                            act_meta = {KEY_NAME: name, KEY_LOCATION: loc, KEY_UNIT: unit}
                             self._add_exchanges(sub_act, act_meta, add_exchanges)
                         # Update exchanges if defined in the configuration file
                         if update_exchanges:
-                            act_meta = {KEY_NAME: name, KEY_LOCATION: loc, KEY_UNIT: unit}
                             self._update_exchanges(sub_act, act_meta, update_exchanges)
                         # Delete exchanges if defined in the configuration file
                         if delete_exchanges:
-                            act_meta = {KEY_NAME: name, KEY_LOCATION: loc, KEY_UNIT: unit}
                             self._delete_exchanges(sub_act, act_meta, delete_exchanges)
 
                     if group_switch_param:
@@ -848,23 +1632,22 @@ class LCAProblemConfigurator:
                     else:
                         # Parent group is a regular activity
                         group.addExchanges({sub_act: exchange})
+                    profiling.count('exchanges written')
                 else:
                     # It is a group
-                    exchange = _parse_exchange(value, params_meta_dict=self.params_meta_dict)  # exchange with parent group
+                    exchange = self._parse_exchange(value)  # exchange with parent group
                     unit = value.get(KEY_UNIT, None)  # activity unit
                     is_switch = value.get(KEY_SWITCH, None)
                     switch_param = None
                     if not is_switch:
                         # It is a regular activity
-                        sub_act = agb.newActivity(
+                        sub_act = self._foreground.add(agb.newActivity(
                             db_name=USER_DB,
                             name=key,
                             unit=unit
-                        )
+                        ))
                         # Add custom attributes
-                        for attr in value.get(KEY_CUSTOM_ATTR, []):
-                            attr_dict = {attr.get(KEY_ATTR_NAME): attr.get(KEY_ATTR_VALUE)}
-                            sub_act.updateMeta(**attr_dict)
+                        _set_custom_attributes(sub_act, value.get(KEY_CUSTOM_ATTR, []))
                     else:
                         # It is a switch activity
                         switch_values = value.copy()
@@ -874,22 +1657,22 @@ class LCAProblemConfigurator:
                             switch_values.keys())  # [val + '_enum' for val in list(switch_values.keys())]
                         switch_values = [val.replace('_', '') for val in
                                          switch_values]  # trick since lca algebraic does not handles correctly switch values with underscores
+                        profiling.count('parameters created')
                         switch_param = agb.newEnumParam(
                             name=key + '_switch_param',  # name of switch parameter
                             values=switch_values,  # possible values
                             default=switch_values[0],  # default value
                             dbname=USER_DB  # parameter defined in foreground database
                         )
-                        sub_act = agb.newSwitchAct(
+                        self._compiler.declare(switch_param.name)
+                        sub_act = self._foreground.add(agb.newSwitchAct(
                             dbname=USER_DB,
                             name=key,
                             paramDef=switch_param,
                             acts_dict={}
-                        )
+                        ))
                         # Add custom attributes
-                        for attr in value.get(KEY_CUSTOM_ATTR, []):
-                            attr_dict = {attr.get(KEY_ATTR_NAME): attr.get(KEY_ATTR_VALUE)}
-                            sub_act.updateMeta(**attr_dict)
+                        _set_custom_attributes(sub_act, value.get(KEY_CUSTOM_ATTR, []))
 
                     # Check if parent group is a switch activity or a regular activity
                     if group_switch_param:
@@ -900,6 +1683,7 @@ class LCAProblemConfigurator:
                     else:
                         # Parent group is a regular activity
                         group.addExchanges({sub_act: exchange})
+                    profiling.count('exchanges written')
                     self._parse_problem_table(sub_act, value, switch_param)
 
     def _update_exchanges(self, act, act_meta, update_exchanges):
@@ -926,13 +1710,13 @@ class LCAProblemConfigurator:
 
             # TODO: refactor to allow sum() formula in new amount. See _add_exchanges() for example
             if KEY_EXCHANGE in new_value and len(new_value) == 1:  # update the amount only
-                new_amount = _parse_exchange(new_value, params_meta_dict=self.params_meta_dict)
+                new_amount = self._parse_exchange(new_value)
                 new_input = None
             elif KEY_EXCHANGE not in new_value:  # update the input activity only
                 new_amount = None
                 new_input = self._get_new_input(new_value)
             else:  # update both amount and input activity
-                new_amount = _parse_exchange(new_value, params_meta_dict=self.params_meta_dict)
+                new_amount = self._parse_exchange(new_value)
                 new_input = self._get_new_input(new_value)
 
             if not self.premise_scenarios:
@@ -964,8 +1748,10 @@ class LCAProblemConfigurator:
 
         if not self.premise_scenarios:
             act.updateExchanges(exchanges_to_update)
+            profiling.count('exchanges updated', len(exchanges_to_update))
         else:
             self._update_multiple_databases(act_meta, premise_exchanges_to_update)
+        self._compiler.clear_sums()
 
     def _delete_exchanges(self, act, act_meta, delete_exchanges):
         """
@@ -983,7 +1769,8 @@ class LCAProblemConfigurator:
         acts_premise = self._get_tech_activity_premise(
             name=act_meta.get(KEY_NAME),
             loc=act_meta.get(KEY_LOCATION),
-            unit=act_meta.get(KEY_UNIT)
+            unit=act_meta.get(KEY_UNIT),
+            variant=act_meta.get(KEY_VARIANT)
         )
 
         for delete in delete_exchanges:
@@ -993,6 +1780,7 @@ class LCAProblemConfigurator:
             else:
                 for act_premise in acts_premise.values():
                     act_premise.deleteExchanges(input_activity, single=False)
+        self._compiler.clear_sums()
 
     def _add_exchanges(self, act, act_meta, add_exchanges):
         """
@@ -1012,21 +1800,22 @@ class LCAProblemConfigurator:
         acts_premise = self._get_tech_activity_premise(
             name=act_meta.get(KEY_NAME),
             loc=act_meta.get(KEY_LOCATION),
-            unit=act_meta.get(KEY_UNIT)
+            unit=act_meta.get(KEY_UNIT),
+            variant=act_meta.get(KEY_VARIANT)
         )
 
         for add in add_exchanges:
             new_input = self._get_new_input(add)
 
             if not self.premise_scenarios:
-                new_amount = _parse_exchange(add, act=act, params_meta_dict=self.params_meta_dict)
+                new_amount = self._parse_exchange(add, act=act)
                 exchanges_to_add[new_input] = new_amount
 
             else:
                 for key, act_premise in acts_premise.items():
                     if key not in premise_exchanges_to_add:
                         premise_exchanges_to_add[key] = {}
-                    new_amount = _parse_exchange(add, act=act_premise, params_meta_dict=self.params_meta_dict)
+                    new_amount = self._parse_exchange(add, act=act_premise)
                     if isinstance(new_input, dict):
                         premise_exchanges_to_add[key][new_input[key]] = new_amount
                     else:
@@ -1034,8 +1823,10 @@ class LCAProblemConfigurator:
 
         if not self.premise_scenarios:
             act.addExchanges(exchanges_to_add)
+            profiling.count('exchanges written', len(exchanges_to_add))
         else:
             self._add_multiple_databases(act_meta, premise_exchanges_to_add)
+        self._compiler.clear_sums()
 
     def _get_new_input(self, new_value):
         name = new_value.get(KEY_NAME)
@@ -1065,7 +1856,7 @@ class LCAProblemConfigurator:
             unit = value.get(KEY_UNIT)
             if value.get(KEY_SWITCH):
                 _LOGGER.warning("'is_switch' cannot be used when declaring new input activity in 'update'. Skipping.")
-            new_input = agb.newActivity(db_name=USER_DB, name=key, unit=unit)
+            new_input = self._foreground.add(agb.newActivity(db_name=USER_DB, name=key, unit=unit))
             self._parse_problem_table(new_input, value)
             return new_input
 
@@ -1073,29 +1864,35 @@ class LCAProblemConfigurator:
         acts_premise = self._get_tech_activity_premise(
             name=act_meta.get(KEY_NAME),
             loc=act_meta.get(KEY_LOCATION),
-            unit=act_meta.get(KEY_UNIT)
+            unit=act_meta.get(KEY_UNIT),
+            variant=act_meta.get(KEY_VARIANT)
         )
 
         for key, exchanges in premise_exchanges_to_update.items():
             if key == 'default':
                 for premise_key in acts_premise.keys():
                     acts_premise[premise_key].updateExchanges(exchanges)
+                    profiling.count('exchanges updated', len(exchanges))
             else:
                 acts_premise[key].updateExchanges(exchanges)
+                profiling.count('exchanges updated', len(exchanges))
 
     def _add_multiple_databases(self, act_meta, premise_exchanges_to_add):
         acts_premise = self._get_tech_activity_premise(
             name=act_meta.get(KEY_NAME),
             loc=act_meta.get(KEY_LOCATION),
-            unit=act_meta.get(KEY_UNIT)
+            unit=act_meta.get(KEY_UNIT),
+            variant=act_meta.get(KEY_VARIANT)
         )
 
         for key, exchanges in premise_exchanges_to_add.items():
             if key == 'default':
                 for premise_key in acts_premise.keys():
                     acts_premise[premise_key].addExchanges(exchanges)
+                    profiling.count('exchanges written', len(exchanges))
             else:
                 acts_premise[key].addExchanges(exchanges)
+                profiling.count('exchanges written', len(exchanges))
 
 
 class _IDictSerializer(ABC):
@@ -1138,6 +1935,18 @@ class _YAMLSerializer(_IDictSerializer):
         with open(file_path) as yaml_file:
             self._data = yaml.load(yaml_file)
 
+    def read_validated(self, file_path: str, validate, salt: str = ''):
+        """
+        Reads and validates data from provided file, or reads them from the cache of configurations if the same content
+        has already been read and validated.
+        :param file_path:
+        :param validate: function raising an exception if the data are not valid
+        :param salt: identifier of the validation (e.g. hash of the schema)
+        """
+        import ruamel.yaml
+        self._data = load_configuration(file_path, lambda content: YAML(typ="safe").load(content.decode('utf-8')),
+                                        validate, salt=f"ruamel.yaml {ruamel.yaml.__version__} {salt}")
+
     def write(self, file_path: str):
         yaml = YAML()
         yaml.default_flow_style = False
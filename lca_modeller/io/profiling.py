@@ -0,0 +1,158 @@
+"""
+Phase-level profiling of the generation of a model by LCAProblemConfigurator.
+
+The configurator opens nested timing spans (setup of the project, premise, custom LCIA methods, build of each
+configured activity...) and increments counters (queries issued by lca_modeller itself, activities copied, exchanges
+written...). The queries issued by lca_algebraic and Brightway are not counted.
+When profiling is not enabled, span() returns a shared no-op context manager and count() returns immediately, so that
+the instrumentation costs next to nothing.
+"""
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict
+
+_PROFILER = None  # profiler of the generation being profiled, None if profiling is disabled
+_NO_SPAN = nullcontext()
+
+
+class _Span:
+    """
+    Timing span. The spans with the same name under the same parent are merged, and their calls counted.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.duration = 0.
+        self.counters = dict()
+        self.children = dict()  # name => _Span, in order of first call
+
+    def child(self, name: str) -> '_Span':
+        span = self.children.get(name)
+        if span is None:
+            span = self.children[name] = _Span(name)
+        return span
+
+    def total_counters(self) -> Dict[str, int]:
+        """
+        Counters of the span, including those of its children.
+        """
+        totals = dict(self.counters)
+        for child in self.children.values():
+            for name, value in child.total_counters().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'duration': self.duration,
+            'self_duration': self.duration - sum(child.duration for child in self.children.values()),
+            'counters': self.counters,
+            'total_counters': self.total_counters(),
+            'children': [child.to_dict() for child in self.children.values()],
+        }
+
+
+class Profiler:
+    """
+    Collects nested timing spans and counters.
+
+    :param name: name of the root span
+    """
+
+    def __init__(self, name: str = 'generate'):
+        self.root = _Span(name)
+        self._stack = [self.root]
+        self._start = None
+
+    @contextmanager
+    def span(self, name: str):
+        span = self._stack[-1].child(name)
+        span.calls += 1
+        self._stack.append(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration += time.perf_counter() - start
+            self._stack.pop()
+
+    def count(self, name: str, n: int = 1):
+        counters = self._stack[-1].counters
+        counters[name] = counters.get(name, 0) + n
+
+    def start(self):
+        self.root.calls += 1
+        self._start = time.perf_counter()
+
+    def stop(self):
+        self.root.duration += time.perf_counter() - self._start
+
+    def report(self) -> dict:
+        """
+        Returns the machine-readable report: the tree of spans, with durations in seconds and counters.
+        """
+        return self.root.to_dict()
+
+    def write(self, file_path: str):
+        """
+        Writes the report to a JSON file.
+        """
+        with open(file_path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def summary(self, min_fraction: float = 0.01) -> str:
+        """
+        Returns a readable summary of the report: one line per span, indented by level, with its duration, share of the
+        total duration and counters. Spans shorter than min_fraction of the total duration are not listed.
+        """
+        total = self.root.duration or 1e-12
+        lines = []
+        stack = [(self.root, 0)]
+        while stack:
+            span, level = stack.pop()
+            counters = ", ".join(f"{name}: {value}" for name, value in sorted(span.total_counters().items()))
+            calls = f" (x{span.calls})" if span.calls > 1 else ""
+            lines.append(f"{'  ' * level}{span.name}{calls}: {span.duration:.2f} s "
+                         f"({100 * span.duration / total:.1f} %)" + (f" [{counters}]" if counters else ""))
+            children = [child for child in span.children.values() if child.duration >= min_fraction * total]
+            stack.extend((child, level + 1) for child in reversed(children))
+        return "\n".join(lines)
+
+
+def span(name: str):
+    """
+    Opens a timing span in the current profiler, to be used as a context manager. No-op if profiling is disabled.
+    """
+    if _PROFILER is None:
+        return _NO_SPAN
+    return _PROFILER.span(name)
+
+
+def count(name: str, n: int = 1):
+    """
+    Increments a counter of the current span. No-op if profiling is disabled.
+    """
+    if _PROFILER is not None:
+        _PROFILER.count(name, n)
+
+
+@contextmanager
+def profiling(name: str = 'generate'):
+    """
+    Enables profiling within the context.
+    :param name: name of the root span
+    :return: the profiler, to get the report once the context is exited
+    """
+    global _PROFILER
+    previous = _PROFILER
+    profiler = _PROFILER = Profiler(name)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _PROFILER = previous
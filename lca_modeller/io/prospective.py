@@ -0,0 +1,151 @@
+"""
+Scenario-parallel generation of the prospective databases with premise.
+Each (model, pathway, year) database is generated and written to Brightway by its own worker process, so that the
+peak memory of a worker is that of a single scenario.
+"""
+import logging
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List
+
+import brightway2 as bw
+import premise as pm
+
+_LOGGER = logging.getLogger(__name__)
+
+PREMISE_KEY = 'tUePmX_S5B8ieZkkM7WUU2CnO8SmShwmAeWK9x2rTFo='
+
+_WRITE_LOCK = None  # lock shared by the workers, to write to the Brightway project one database at a time
+
+
+def _memory_limit_supported() -> bool:
+    """
+    Whether the memory of the worker processes can be limited: the address space limit (RLIMIT_AS) is only enforced on
+    Linux (the module resource is missing on Windows, and macOS ignores or rejects the limit).
+    """
+    return sys.platform.startswith('linux')
+
+
+def _init_worker(project_name: str, write_lock, max_memory: float = None):
+    """
+    Initializes a worker process: sets the Brightway project and limits the memory available to the process.
+    :param project_name: name of the Brightway project
+    :param write_lock: lock shared by all workers, acquired to write to the Brightway project
+    :param max_memory: maximum memory of the worker, in GB. No limit if None.
+    """
+    global _WRITE_LOCK
+    _WRITE_LOCK = write_lock
+    bw.projects.set_current(project_name)
+    if max_memory and _memory_limit_supported():
+        import resource
+        limit = int(max_memory * 1024 ** 3)
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError) as e:  # e.g. limit above the hard limit of the user
+            _LOGGER.warning(f"Could not limit the memory of premise worker to {max_memory} GB ({e}).")
+
+
+def _new_database(scenarios: List[Dict], source_db: str, source_version: str, system_model: str):
+    return pm.NewDatabase(
+        scenarios=scenarios,
+        source_type="brightway",
+        source_db=source_db,
+        source_version=source_version,
+        system_model=system_model,
+        key=PREMISE_KEY,
+        quiet=True
+    )
+
+
+def _update(ndb, sectors_to_update):
+    if sectors_to_update == 'all':
+        ndb.update()
+    elif isinstance(sectors_to_update, list):
+        ndb.update(sectors_to_update)
+
+
+def _extract_source_database(scenario: Dict, source_db: str, source_version: str, system_model: str):
+    """
+    Extracts the source database and stores it in the premise cache, so that the workers do not extract it concurrently.
+    """
+    _new_database([scenario], source_db, source_version, system_model)
+
+
+def _generate_database(scenario: Dict, db_name: str, source_db: str, source_version: str, system_model: str,
+                       sectors_to_update) -> str:
+    """
+    Generates a single prospective database and writes it to the Brightway project.
+    :return: the name of the database
+    """
+    ndb = _new_database([scenario], source_db, source_version, system_model)
+    _update(ndb, sectors_to_update)
+    with _WRITE_LOCK:
+        bw.databases.load()  # other workers may have registered their database since this process started
+        ndb.write_db_to_brightway(name=[db_name])
+    return db_name
+
+
+def generate_premise_databases(scenarios: List[Dict], db_names: List[str], source_db: str, source_version: str,
+                               system_model: str, sectors_to_update=None, max_workers: int = 1,
+                               max_memory: float = None):
+    """
+    Generates the prospective databases with premise and writes them to the current Brightway project.
+
+    With a single worker, all scenarios are generated together as premise does by default.
+    With several workers, each scenario is generated and written by its own process. The source database is extracted
+    once beforehand so that all workers share the premise cache.
+
+    :param scenarios: list of premise scenarios (dictionaries with model, pathway and year)
+    :param db_names: name of the database of each scenario
+    :param source_db: name of the source ecoinvent database
+    :param source_version: version of ecoinvent
+    :param system_model: system model of ecoinvent (e.g. 'cutoff')
+    :param sectors_to_update: 'all', a list of sectors, or None to only import the scenarios without update
+    :param max_workers: maximum number of worker processes
+    :param max_memory: maximum memory per worker, in GB. No limit if None.
+    """
+    pm.clear_cache()  # fresh start
+
+    if max_workers <= 1 or len(scenarios) == 1:
+        ndb = _new_database(scenarios, source_db, source_version, system_model)
+        _update(ndb, sectors_to_update)
+        ndb.write_db_to_brightway(name=db_names)
+        return
+
+    if max_memory and not _memory_limit_supported():
+        _LOGGER.warning(f"The memory of the premise workers cannot be limited on {sys.platform}: "
+                        f"limit of {max_memory} GB ignored.")
+        max_memory = None
+    project_name = bw.projects.current
+    context = multiprocessing.get_context('spawn')  # workers do not inherit the memory of the current process
+    initargs = (project_name, context.Lock(), max_memory)
+    n_workers = min(max_workers, len(scenarios))
+    print(f"Generating {len(scenarios)} prospective databases with {n_workers} workers")
+
+    failures = {}
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context, initializer=_init_worker,
+                             initargs=initargs) as executor:
+        executor.submit(_extract_source_database, scenarios[0], source_db, source_version, system_model).result()
+        futures = {
+            executor.submit(_generate_database, scenario, db_name, source_db, source_version, system_model,
+                            sectors_to_update): db_name
+            for scenario, db_name in zip(scenarios, db_names)
+        }
+        for future in as_completed(futures):
+            db_name = futures[future]
+            try:
+                future.result()
+                print(f"Prospective database {db_name} written to Brightway")
+            except MemoryError:
+                failures[db_name] = f"out of memory (limit of {max_memory} GB per worker)"
+            except BrokenProcessPool as e:
+                failures[db_name] = f"worker process terminated abruptly ({e})"
+            except Exception as e:
+                failures[db_name] = repr(e)
+
+    bw.databases.load()  # register the databases written by the workers
+    if failures:
+        raise RuntimeError("Generation of prospective databases failed:\n" +
+                           "\n".join(f"{db_name}: {reason}" for db_name, reason in failures.items()))
@@ -0,0 +1,226 @@
+"""
+Synthetic configurations and fake background databases, to benchmark lca_modeller without an ecoinvent licence.
+
+The fake databases mimic the databases imported by LCAProblemConfigurator: a biosphere database named 'biosphere3', an
+ecoinvent database named after the version and system model, one prospective database per premise scenario, and an LCIA
+method. Once they are installed in the current Brightway project, the configurator skips the import of ecoinvent and
+the generation of prospective databases with premise.
+"""
+import itertools
+import math
+import random
+from collections import Counter
+from typing import Dict, List
+
+import brightway2 as bw
+from ruamel.yaml import YAML
+
+FAKE_EI_VERSION = '3.10'
+FAKE_EI_MODEL = 'cutoff'
+FAKE_METHOD = ('fake method', 'climate change', 'global warming potential')
+FAKE_PREMISE_MODEL = 'fakemodel'
+FAKE_PREMISE_PATHWAY = 'SSP2-Base'
+BIOSPHERE3_DB_NAME = 'biosphere3'
+N_PARAMETERS = 10  # number of float parameters used in the amounts of the synthetic configurations
+LOCATION = 'GLO'
+
+
+def fake_activity_name(i: int) -> str:
+    return f'fake process {i}'
+
+
+def fake_flow_name(j: int) -> str:
+    return f'fake flow {j}'
+
+
+def fake_scenarios(n_scenarios: int) -> List[Dict]:
+    """
+    Premise scenarios of the synthetic configurations: a single model and pathway, one year per scenario.
+    """
+    return [{'model': FAKE_PREMISE_MODEL, 'pathway': FAKE_PREMISE_PATHWAY, 'year': 2020 + 10 * k}
+            for k in range(n_scenarios)]
+
+
+def _fake_inputs(i: int) -> List[int]:
+    """
+    Indices of the technosphere inputs of fake activity i.
+    """
+    return sorted({i - 1, i // 2} - {i, -1})
+
+
+def _fake_technosphere(db_name: str, n_activities: int, n_flows: int, factor: float = 1.) -> Dict:
+    """
+    Data of a fake technosphere database. Activity i consumes activities i-1 and i//2, and emits one biosphere flow.
+    As in ecoinvent, the exchanges are named after their input and have a unit (used by 'update' and 'delete').
+    """
+    data = {}
+    for i in range(n_activities):
+        exchanges = [{'input': (db_name, f'act{i}'), 'name': fake_activity_name(i), 'amount': 1.,
+                      'unit': 'kilogram', 'type': 'production'}]
+        for j in _fake_inputs(i):
+            exchanges.append({'input': (db_name, f'act{j}'), 'name': fake_activity_name(j), 'amount': 0.1 * factor,
+                              'unit': 'kilogram', 'type': 'technosphere'})
+        exchanges.append({'input': (BIOSPHERE3_DB_NAME, f'flow{i % n_flows}'), 'name': fake_flow_name(i % n_flows),
+                          'amount': factor * (1 + i % 5), 'unit': 'kilogram', 'type': 'biosphere'})
+        data[(db_name, f'act{i}')] = {
+            'name': fake_activity_name(i),
+            'reference product': f'fake product {i}',
+            'location': LOCATION,
+            'unit': 'kilogram',
+            'exchanges': exchanges,
+        }
+    return data
+
+
+def install_fake_databases(n_activities: int = 100, n_flows: int = 10, scenarios: List[Dict] = None,
+                           ei_version: str = FAKE_EI_VERSION, ei_model: str = FAKE_EI_MODEL):
+    """
+    Writes the fake biosphere, background and prospective databases, and the fake LCIA method, to the current
+    Brightway project.
+    :param n_activities: number of activities of each technosphere database
+    :param n_flows: number of biosphere flows
+    :param scenarios: premise scenarios, as in the configuration file. One prospective database is written per scenario.
+    :param ei_version: version of ecoinvent declared in the configuration file
+    :param ei_model: system model of ecoinvent declared in the configuration file
+    """
+    bw.Database(BIOSPHERE3_DB_NAME).write({
+        (BIOSPHERE3_DB_NAME, f'flow{j}'): {
+            'name': fake_flow_name(j),
+            'categories': ('air',),
+            'unit': 'kilogram',
+            'type': 'emission',
+        }
+        for j in range(n_flows)
+    })
+
+    source_db = f'ecoinvent-{ei_version}-{ei_model}'
+    bw.Database(source_db).write(_fake_technosphere(source_db, n_activities, n_flows))
+
+    for k, scenario in enumerate(scenarios or []):
+        # Same naming as LCAProblemConfigurator
+        db_name = (f"ecoinvent_{ei_model}_{ei_version.replace('3.9.1', '3.9')}_{scenario['model']}_"
+                   f"{scenario['pathway']}_{scenario['year']}")
+        bw.Database(db_name).write(_fake_technosphere(db_name, n_activities, n_flows, factor=1. / (k + 1)))
+
+    method = bw.Method(FAKE_METHOD)
+    method.register(unit='kg CO2-Eq')
+    method.write([((BIOSPHERE3_DB_NAME, f'flow{j}'), 1. + j) for j in range(n_flows)])
+
+
+def synthetic_config(n_activities: int = 50, depth: int = 3, switch_groups: int = 0, scenarios: int = 0,
+                     updates: int = 0, adds: int = 0, deletes: int = 0, custom_attributes: int = 0,
+                     n_background: int = 100, seed: int = 0, project: str = 'lca_modeller_benchmark') -> Dict:
+    """
+    Generates a configuration of controlled size, referring to the fake databases (see install_fake_databases()).
+
+    :param n_activities: number of leaf activities (background activities and biosphere flows)
+    :param depth: number of levels of groups above the leaf activities
+    :param switch_groups: number of groups that are switch activities
+    :param scenarios: number of premise scenarios
+    :param updates: number of background activities with an 'update' operation
+    :param adds: number of background activities with an 'add' operation
+    :param deletes: number of background activities with a 'delete' operation
+    :param custom_attributes: number of activities with custom attributes
+    :param n_background: number of activities of the fake background database
+    :param seed: seed of the random amounts and activities
+    :param project: name of the Brightway project
+    :return: the configuration, as read from a YAML file
+    """
+    rng = random.Random(seed)
+    counter = itertools.count()
+    branching = max(2, math.ceil(n_activities ** (1 / max(depth, 1))))
+    leaves = []
+
+    def amount():
+        return f"p{rng.randrange(N_PARAMETERS)} * {rng.uniform(0.1, 2.):.3f}"
+
+    def leaf() -> Dict:
+        i = len(leaves)
+        if i % 10 == 9:  # one leaf out of ten is a biosphere flow
+            value = {'name': fake_flow_name(rng.randrange(10)), 'categories': ['air'], 'amount': 1e-3}
+        else:
+            value = {'name': fake_activity_name(rng.randrange(3, n_background)), 'loc': LOCATION, 'amount': amount()}
+        leaves.append(value)
+        return value
+
+    def group(level: int, n: int) -> Dict:
+        table = {}
+        if level >= depth or n <= branching:
+            for _ in range(n):
+                table[f'activity_{next(counter)}'] = leaf()
+            return table
+        sizes = [n // branching + (1 if j < n % branching else 0) for j in range(branching)]
+        for size in sizes:
+            if size:
+                table[f'group_{next(counter)}'] = dict(group(level + 1, size), amount=amount())
+        return table
+
+    model = group(1, n_activities)
+
+    # Switch groups: the first groups found in the tree
+    groups = [value for value in _walk(model) if 'name' not in value]
+    for value in groups[:switch_groups]:
+        value['is_switch'] = True
+
+    # Operations on background activities: each edited activity is referred to once, and its inputs (the targets of
+    # 'update' and 'delete') are not edited themselves
+    technosphere = [value for value in leaves if 'categories' not in value]
+    references = Counter(value['name'] for value in technosphere)
+    edited, names = [], set()
+    for value in technosphere:
+        i = int(value['name'].split()[-1])
+        if len(edited) < max(updates, adds, deletes) and references[value['name']] == 1 and len(_fake_inputs(i)) == 2 \
+                and not names.intersection(fake_activity_name(j) for j in _fake_inputs(i)) \
+                and not any(i in _fake_inputs(int(name.split()[-1])) for name in names):
+            edited.append(value)
+            names.add(value['name'])
+    for k, value in enumerate(edited[:updates]):
+        half, previous = _fake_inputs(int(value['name'].split()[-1]))  # inputs i//2 and i-1
+        value['update'] = [{'input_activity': f'{fake_activity_name(previous)}#{LOCATION}',
+                            'new_value': {'amount': f'old_amount * (1 - 0.1 * p{k % N_PARAMETERS})'}}]
+    for value in edited[:adds]:
+        value['add'] = [{'name': fake_flow_name(0), 'categories': ['air'], 'amount': 1e-3}]
+    for value in edited[:deletes]:
+        half, previous = _fake_inputs(int(value['name'].split()[-1]))  # inputs i//2 and i-1
+        value['delete'] = [{'input_activity': f'{fake_activity_name(half)}#{LOCATION}'}]
+
+    # Custom attributes
+    # nb: not on switch groups, whose sub-tables are all considered as switch values
+    targets = [value for value in groups if not value.get('is_switch')] + leaves
+    for k, value in enumerate(targets[:custom_attributes]):
+        value['custom_attributes'] = [{'attribute': 'category', 'value': f'category {k % 3}'}]
+
+    config = {
+        'project': project,
+        'ecoinvent': {'version': FAKE_EI_VERSION, 'model': FAKE_EI_MODEL},
+        'parameters_metadata': [{'parameter': f'p{k}', 'default': 1., 'min': 0.5, 'max': 1.5}
+                                for k in range(N_PARAMETERS)],
+        'model': model,
+        'methods': [str(FAKE_METHOD)],
+    }
+    if scenarios:
+        config['premise'] = {'scenarios': fake_scenarios(scenarios)}
+    return config
+
+
+def _walk(table: Dict):
+    """
+    Iterates over the sub-tables (activities) of a model definition, depth first.
+    """
+    stack = [table]
+    while stack:
+        current = stack.pop(0)
+        for key, value in current.items():
+            if isinstance(value, dict):
+                yield value
+                stack.append(value)
+
+
+def write_config(file_path: str, config: Dict):
+    """
+    Writes a configuration to a YAML file.
+    """
+    yaml = YAML(typ='safe')
+    yaml.default_flow_style = False
+    with open(file_path, 'w') as file:
+        yaml.dump(config, file)
@@ -0,0 +1,93 @@
+"""
+Store of the prospective databases: a database exported to the store is imported again instead of being generated, as
+long as its key (ecoinvent, premise, scenario, sectors updated) is unchanged.
+"""
+import os.path as pth
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import brightway2 as bw
+
+from lca_modeller.io import artifacts
+from lca_modeller.io.artifacts import ArtifactStore, artifact_key, get_artifact_store
+from lca_modeller.io.tests.synthetic import FAKE_EI_MODEL, FAKE_EI_VERSION, fake_scenarios
+
+SCENARIO = fake_scenarios(1)[0]
+DB_NAME = 'prospective_db'
+
+
+def _write_database(db_name=DB_NAME, amount=1.):
+    bw.Database(db_name).write({
+        (db_name, 'act0'): {'name': 'fake process 0', 'unit': 'kilogram', 'location': 'GLO', 'exchanges': [
+            {'input': (db_name, 'act0'), 'amount': 1., 'type': 'production'},
+            {'input': (db_name, 'act1'), 'amount': amount, 'type': 'technosphere'},
+        ]},
+        (db_name, 'act1'): {'name': 'fake process 1', 'unit': 'kilogram', 'location': 'GLO', 'exchanges': []},
+    })
+
+
+def _content(db_name=DB_NAME):
+    return sorted((act.key[1], exc.input.key[1], exc['amount']) for act in bw.Database(db_name)
+                  for exc in act.exchanges())
+
+
+def test_store_disabled_by_default(bw_project):
+    assert get_artifact_store() is None
+    assert get_artifact_store(False) is None
+    store = get_artifact_store(True)
+    assert pth.dirname(store.directory) == pth.dirname(bw.projects.dir)  # in the Brightway data directory
+
+
+def test_store_hit(bw_project, tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"))
+    key = artifact_key(FAKE_EI_VERSION, FAKE_EI_MODEL, SCENARIO, 'all')
+    _write_database()
+    content = _content()
+    store.export_database(key, DB_NAME, description={'scenario': SCENARIO})
+    assert store.has(key)
+
+    del bw.databases[DB_NAME]
+    assert store.import_database(key, DB_NAME)
+    assert DB_NAME in bw.databases
+    assert _content() == content
+
+
+def test_store_miss(bw_project, tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"))
+    key = artifact_key(FAKE_EI_VERSION, FAKE_EI_MODEL, SCENARIO, 'all')
+    assert not store.has(key)
+    assert not store.import_database(key, DB_NAME)
+
+    # Artifact of another database, or unreadable: ignored, and nothing is imported
+    _write_database()
+    store.export_database(key, DB_NAME)
+    assert not store.import_database(key, 'other_db')
+    assert 'other_db' not in bw.databases
+    assert _content() != []  # not overwritten
+    del bw.databases[DB_NAME]
+    with open(store._path(key), 'wb') as file:
+        file.write(b'corrupted')
+    assert not store.import_database(key, DB_NAME)
+    assert DB_NAME not in bw.databases
+
+
+def test_store_invalidation(bw_project, tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path / "store"))
+    key = artifact_key(FAKE_EI_VERSION, FAKE_EI_MODEL, SCENARIO, ['cement', 'steel'])
+    _write_database()
+    store.export_database(key, DB_NAME)
+
+    # Same key whatever the order of the sectors, other key if anything that determines the database changes
+    assert artifact_key(FAKE_EI_VERSION, FAKE_EI_MODEL, dict(SCENARIO), ['steel', 'cement']) == key
+    other_keys = [
+        artifact_key('3.9', FAKE_EI_MODEL, SCENARIO, ['cement', 'steel']),
+        artifact_key(FAKE_EI_VERSION, 'consequential', SCENARIO, ['cement', 'steel']),
+        artifact_key(FAKE_EI_VERSION, FAKE_EI_MODEL, dict(SCENARIO, year=2050), ['cement', 'steel']),
+        artifact_key(FAKE_EI_VERSION, FAKE_EI_MODEL, SCENARIO, 'all'),
+    ]
+    monkeypatch.setattr(artifacts, '_premise_version', lambda: '0.0.0')
+    other_keys.append(artifact_key(FAKE_EI_VERSION, FAKE_EI_MODEL, SCENARIO, ['cement', 'steel']))
+    assert len(set(other_keys)) == len(other_keys) and key not in other_keys
+    assert not any(store.has(other_key) for other_key in other_keys)
@@ -0,0 +1,71 @@
+"""
+Lookup index of the background databases: same results as lca_algebraic's findActivity(), kept up to date with the
+databases.
+"""
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import brightway2 as bw
+import lca_algebraic as agb
+
+from lca_modeller.io.background_index import (BackgroundIndex, clear_background_indexes, find_background_activity,
+                                              get_background_index)
+from lca_modeller.io.tests.synthetic import (BIOSPHERE3_DB_NAME, FAKE_EI_MODEL, FAKE_EI_VERSION, LOCATION,
+                                             fake_activity_name, fake_flow_name, install_fake_databases)
+
+EI_DB_NAME = f'ecoinvent-{FAKE_EI_VERSION}-{FAKE_EI_MODEL}'
+
+
+@pytest.fixture
+def databases(bw_project):
+    install_fake_databases(n_activities=20)
+    yield
+    clear_background_indexes()
+
+
+def test_find_same_as_lca_algebraic(databases):
+    for name, loc, unit in [(fake_activity_name(3), LOCATION, None), (fake_activity_name(4), None, 'kilogram')]:
+        expected = agb.findActivity(name=name, loc=loc, unit=unit, db_name=EI_DB_NAME)
+        assert find_background_activity(EI_DB_NAME, name, loc=loc, unit=unit).key == expected.key
+
+    flow = find_background_activity(BIOSPHERE3_DB_NAME, fake_flow_name(2), categories=['air'])
+    assert flow.key == agb.findBioAct(fake_flow_name(2), categories=('air',)).key
+    # Case-insensitive names, as lca_algebraic
+    assert find_background_activity(EI_DB_NAME, fake_activity_name(3).upper()).key == (EI_DB_NAME, 'act3')
+
+
+def test_find_not_found(databases):
+    with pytest.raises(Exception, match="No activity found"):
+        find_background_activity(EI_DB_NAME, fake_activity_name(3), loc='FR')
+    assert find_background_activity(EI_DB_NAME, fake_activity_name(3), loc='FR', single=False) == []
+    with pytest.raises(Exception, match="No activity found"):
+        find_background_activity(BIOSPHERE3_DB_NAME, fake_flow_name(2), categories=['water'])
+
+
+def test_find_several(databases):
+    db = bw.Database(EI_DB_NAME)
+    act = db.get('act3').copy(code='act3 copy')
+    act.save()
+    with pytest.raises(Exception, match="Several activity found"):
+        find_background_activity(EI_DB_NAME, fake_activity_name(3))
+    acts = find_background_activity(EI_DB_NAME, fake_activity_name(3), single=False)
+    assert sorted(act.key[1] for act in acts) == ['act3', 'act3 copy']
+
+
+def test_index_rebuilt_when_database_modified(databases):
+    get_background_index(EI_DB_NAME)
+    new_act = bw.Database(EI_DB_NAME).new_activity(code='new', name='new fake process', location=LOCATION,
+                                                   unit='kilogram')
+    new_act.save()
+    assert find_background_activity(EI_DB_NAME, 'new fake process').key == (EI_DB_NAME, 'new')
+
+
+def test_index_stored_on_disk(databases):
+    index = get_background_index(EI_DB_NAME)
+    clear_background_indexes(disk=False)
+
+    loaded = BackgroundIndex(EI_DB_NAME)
+    assert loaded.load()
+    assert loaded.modified == index.modified
+    assert loaded.find(fake_activity_name(3)).key == (EI_DB_NAME, 'act3')
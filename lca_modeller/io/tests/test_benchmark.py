@@ -0,0 +1,123 @@
+"""
+Benchmark of the generation of models and of their exploration, on synthetic configurations and fake background
+databases (see synthetic.py), so that it runs without an ecoinvent licence.
+
+The benchmark is opt-in: it only runs if LCA_MODELLER_BENCHMARK_CASES is set. Each case runs in its own process and
+Brightway directory, without the caches that lca_modeller keeps outside of the Brightway directory. Wall times and peak
+memory are compared to a baseline file: a case fails if it is slower or uses more memory than the baseline by more than
+the threshold. A case without baseline is skipped, after its results are recorded in the baseline file.
+Environment variables:
+- LCA_MODELLER_BENCHMARK_CASES: comma-separated cases to run ('all' for all cases)
+- LCA_MODELLER_BENCHMARK_BASELINE: baseline file (default: in the temporary directory of the test, i.e. no baseline)
+- LCA_MODELLER_BENCHMARK_THRESHOLD: allowed relative regression (default: 0.2)
+- LCA_MODELLER_BENCHMARK_UPDATE: if set, the baseline of the cases run is replaced by their results
+"""
+import json
+import os
+import os.path as pth
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+CASES = {
+    'small': dict(n_activities=50, depth=3),
+    'switches': dict(n_activities=200, depth=4, switch_groups=10, custom_attributes=20),
+    'premise': dict(n_activities=50, depth=3, scenarios=3),
+    'operations': dict(n_activities=100, depth=3, scenarios=2, updates=10, adds=10, deletes=10),
+    'large': dict(n_activities=1000, depth=5, switch_groups=20, scenarios=3, updates=20, adds=20, deletes=20,
+                  custom_attributes=50, n_background=500),
+}
+SELECTED_CASES = os.getenv("LCA_MODELLER_BENCHMARK_CASES", "")
+SELECTED_CASES = list(CASES) if SELECTED_CASES == 'all' else SELECTED_CASES.split(',')
+BASELINE_FILE = os.getenv("LCA_MODELLER_BENCHMARK_BASELINE")
+THRESHOLD = float(os.getenv("LCA_MODELLER_BENCHMARK_THRESHOLD", 0.2))
+UPDATE_BASELINE = bool(os.getenv("LCA_MODELLER_BENCHMARK_UPDATE"))
+REPO_ROOT = pth.dirname(pth.dirname(pth.dirname(pth.dirname(pth.abspath(__file__)))))  # directory of lca_modeller
+# Absolute tolerances, below which differences are considered as noise
+TOLERANCES = {'time': 0.2, 'memory': 20.}  # s, MB
+
+pytestmark = pytest.mark.skipif(not os.getenv("LCA_MODELLER_BENCHMARK_CASES"),
+                                reason="benchmark not requested (set LCA_MODELLER_BENCHMARK_CASES)")
+
+_SCRIPT = """
+import json, os, resource, sys, time
+import brightway2 as bw
+from lca_modeller.io.tests.synthetic import install_fake_databases, synthetic_config, write_config
+
+case, workdir = json.loads(sys.argv[1]), sys.argv[2]
+config = synthetic_config(**case)
+bw.projects.set_current(config['project'])
+install_fake_databases(n_activities=case.get('n_background', 100), scenarios=config.get('premise', {}).get('scenarios'))
+conf_file = os.path.join(workdir, 'config.yaml')
+write_config(conf_file, config)
+
+from lca_modeller.io.configuration import LCAProblemConfigurator
+from lca_modeller.helpers import list_processes
+from lca_modeller.gui.plots import process_tree
+
+results = {}
+start = time.perf_counter()
+_, model, methods = LCAProblemConfigurator(conf_file).generate()
+results['time:generate'] = time.perf_counter() - start
+start = time.perf_counter()
+list_processes(model)
+results['time:list_processes'] = time.perf_counter() - start
+start = time.perf_counter()
+process_tree(model, outfile=os.path.join(workdir, 'process_tree.html'))
+results['time:process_tree'] = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # kB on Linux, bytes on macOS
+results['memory:peak'] = peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+print(json.dumps(results))
+"""
+
+
+def _run_case(case: dict, workdir: str) -> dict:
+    # The case runs in its own directory: lca_modeller must be importable even if it is not installed
+    python_path = [REPO_ROOT] + [path for path in os.getenv("PYTHONPATH", "").split(os.pathsep) if path]
+    env = dict(os.environ, BRIGHTWAY2_DIR=workdir, PYTHONPATH=os.pathsep.join(python_path),
+               LCA_MODELLER_CONFIG_CACHE="off", LCA_MODELLER_ARTIFACTS=pth.join(workdir, "artifacts"))
+    result = subprocess.run([sys.executable, "-c", _SCRIPT, json.dumps(case), workdir], capture_output=True,
+                            text=True, env=env, cwd=workdir)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _load_baseline(baseline_file: str) -> dict:
+    if not pth.exists(baseline_file):
+        return {}
+    with open(baseline_file) as file:
+        return json.load(file)
+
+
+def _save_baseline(baseline_file: str, name: str, results: dict):
+    baseline = _load_baseline(baseline_file)
+    baseline[name] = results
+    os.makedirs(pth.dirname(pth.abspath(baseline_file)), exist_ok=True)
+    with open(baseline_file, "w") as file:
+        json.dump(baseline, file, indent=2)
+
+
+@pytest.mark.parametrize("name", [name for name in CASES if name in SELECTED_CASES])
+def test_benchmark(name, tmp_path):
+    workdir = tmp_path / "bw"
+    workdir.mkdir()
+    results = _run_case(CASES[name], str(workdir))
+    print(f"\nBenchmark '{name}': " + ", ".join(f"{key}={value:.2f}" for key, value in results.items()))
+
+    baseline_file = BASELINE_FILE or str(tmp_path / "benchmark_baseline.json")
+    reference = _load_baseline(baseline_file).get(name)
+    if reference is None or UPDATE_BASELINE:
+        _save_baseline(baseline_file, name, results)
+        pytest.skip(f"Baseline of '{name}' recorded in {baseline_file}: nothing to compare with")
+
+    regressions = []
+    for key, value in results.items():
+        if key not in reference:
+            continue
+        limit = max(reference[key] * (1 + THRESHOLD), reference[key] + TOLERANCES[key.split(':')[0]])
+        if value > limit:
+            regressions.append(f"{key}: {value:.2f} (baseline: {reference[key]:.2f})")
+    assert not regressions, f"Benchmark '{name}' regressed by more than {THRESHOLD:.0%}: " + "; ".join(regressions)
@@ -0,0 +1,81 @@
+"""
+Build in a single transaction: same foreground database as with a write per activity, and Brightway left in its
+normal state (metadata of the databases, journaling, set_dirty()) after a build or an error.
+"""
+from contextlib import nullcontext
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import brightway2 as bw
+import lca_algebraic as agb
+from bw2data.backends.peewee import sqlite3_lci_db
+
+from lca_modeller.io import configuration
+from lca_modeller.io.configuration import USER_DB, LCAProblemConfigurator, bulk_write
+from lca_modeller.io.tests.synthetic import install_fake_databases, synthetic_config, write_config
+
+
+def _generate(tmp_path, project):
+    config = synthetic_config(n_activities=30, depth=3, switch_groups=1, updates=2, adds=2, deletes=2,
+                              custom_attributes=3, n_background=20, project=project)
+    config.update(compiled_cache=False, score_store=False)
+    conf_file = str(tmp_path / "config.yaml")
+    write_config(conf_file, config)
+    return LCAProblemConfigurator(conf_file).generate()
+
+
+def _foreground_content():
+    """
+    Content of the foreground database, independent of the codes of the activities.
+    """
+    names = {act.key: act['name'] for act in bw.Database(USER_DB)}
+    exchanges = sorted(
+        (act['name'], names.get(exc.input.key, str(exc.input.key)), exc['type'], exc['amount'], exc.get('formula', ''))
+        for act in bw.Database(USER_DB) for exc in act.exchanges()
+    )
+    params = sorted((param.name, str(param.default)) for param in agb.params.all_params().values())
+    return exchanges, params
+
+
+def test_bulk_write_same_database(bw_project, tmp_path, monkeypatch):
+    install_fake_databases(n_activities=20)
+    _generate(tmp_path, bw_project)
+    bulk = _foreground_content()
+
+    monkeypatch.setattr(configuration, 'bulk_write', nullcontext)  # one write per activity and exchange
+    _generate(tmp_path, bw_project)
+    assert _foreground_content() == bulk
+
+
+def test_bulk_write_marks_databases_modified(bw_project, tmp_path):
+    install_fake_databases(n_activities=20)
+    _generate(tmp_path, bw_project)
+    modified = bw.databases[USER_DB]['modified']
+
+    _generate(tmp_path, bw_project)
+    assert bw.databases[USER_DB]['modified'] > modified
+    assert bw.databases[USER_DB]['dirty']
+    assert 'set_dirty' not in vars(bw.databases)
+
+
+def test_bulk_write_error(bw_project):
+    agb.resetDb(USER_DB)
+    lci_db = sqlite3_lci_db.db
+    journal_mode = lci_db.execute_sql('PRAGMA journal_mode').fetchone()[0]
+    modified = bw.databases[USER_DB].get('modified')
+
+    with pytest.raises(RuntimeError, match="build failed"):
+        with bulk_write():
+            assert 'set_dirty' in vars(bw.databases)
+            agb.newActivity(db_name=USER_DB, name='rolled back', unit='kg')
+            raise RuntimeError("build failed")
+
+    # Rolled back, and Brightway restored
+    assert len(bw.Database(USER_DB)) == 0
+    assert 'set_dirty' not in vars(bw.databases)
+    assert lci_db.execute_sql('PRAGMA journal_mode').fetchone()[0] == journal_mode
+    assert bw.databases[USER_DB].get('modified') != modified  # possibly read during the transaction
+    bw.databases.set_dirty(USER_DB)
+    assert bw.databases[USER_DB]['dirty']
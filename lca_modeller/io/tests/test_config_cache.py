@@ -0,0 +1,134 @@
+"""
+Cache of the configuration files: a file is parsed and validated once per content, in this process and in the others
+(cache files), and the JSON schema is compiled once per process.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+from lca_modeller.io import config_cache, configuration
+from lca_modeller.io.config_cache import CACHE_ENV_VARIABLE, clear_memory_cache, load_configuration
+from lca_modeller.io.configuration import LCAProblemConfigurator
+from lca_modeller.io.tests.synthetic import synthetic_config, write_config
+
+
+class _Loader:
+    """
+    Parser and validator of 'key: value' lines, counting their calls.
+    """
+
+    def __init__(self):
+        self.parsed = 0
+        self.validated = 0
+
+    def parse(self, content: bytes) -> dict:
+        self.parsed += 1
+        return dict(line.split(': ') for line in content.decode('utf-8').splitlines())
+
+    def validate(self, data: dict):
+        self.validated += 1
+        if 'invalid' in data:
+            raise ValueError("invalid configuration")
+
+    def load(self, file_path, salt=''):
+        return load_configuration(str(file_path), self.parse, self.validate, salt=salt)
+
+
+def _cache_files(directory):
+    return [name for _, _, names in os.walk(directory) for name in names]
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_ENV_VARIABLE, str(tmp_path / "cache"))
+    clear_memory_cache()
+    yield tmp_path / "cache"
+    clear_memory_cache()
+
+
+def test_config_cache_hits(cache_dir, tmp_path):
+    conf_file = tmp_path / "config.yaml"
+    conf_file.write_text("project: a\nmodel: b\n")
+    loader = _Loader()
+
+    data = loader.load(conf_file)
+    assert data == {'project': 'a', 'model': 'b'}
+    assert (loader.parsed, loader.validated) == (1, 1)
+    assert len(_cache_files(cache_dir)) == 1
+
+    # Same process: from memory, as a new object
+    data['project'] = 'modified'
+    assert loader.load(conf_file) == {'project': 'a', 'model': 'b'}
+    assert (loader.parsed, loader.validated) == (1, 1)
+
+    # Other process: from the cache file
+    clear_memory_cache()
+    assert loader.load(conf_file) == {'project': 'a', 'model': 'b'}
+    assert (loader.parsed, loader.validated) == (1, 1)
+
+    # Other content, other schema: parsed and validated again
+    conf_file.write_text("project: c\nmodel: b\n")
+    assert loader.load(conf_file) == {'project': 'c', 'model': 'b'}
+    assert loader.load(conf_file, salt='other schema') == {'project': 'c', 'model': 'b'}
+    assert (loader.parsed, loader.validated) == (3, 3)
+    assert len(_cache_files(cache_dir)) == 3
+
+
+def test_config_cache_invalid_not_cached(cache_dir, tmp_path):
+    conf_file = tmp_path / "config.yaml"
+    conf_file.write_text("project: a\ninvalid: yes\n")
+    loader = _Loader()
+    for validated in (1, 2):
+        with pytest.raises(ValueError, match="invalid configuration"):
+            loader.load(conf_file)
+        assert loader.validated == validated
+    assert config_cache._MEMORY == {}
+    assert _cache_files(cache_dir) == []
+
+
+def test_config_cache_disabled(cache_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_ENV_VARIABLE, "off")
+    conf_file = tmp_path / "config.yaml"
+    conf_file.write_text("project: a\n")
+    loader = _Loader()
+    loader.load(conf_file)
+    assert not cache_dir.exists()
+
+    # Still read once per process
+    loader.load(conf_file)
+    assert loader.parsed == 1
+    clear_memory_cache()
+    loader.load(conf_file)
+    assert loader.parsed == 2
+
+
+def test_schema_compiled_once(cache_dir, tmp_path, monkeypatch):
+    import jsonschema.validators
+    compiled = []
+    validator_for = jsonschema.validators.validator_for
+
+    def _validator_for(schema, *args, **kwargs):
+        if schema is configuration._json_schema()[0]:  # not the sub-schemas, compiled by jsonschema itself
+            compiled.append(schema)
+        return validator_for(schema, *args, **kwargs)
+
+    monkeypatch.setattr(jsonschema.validators, 'validator_for', _validator_for)
+    monkeypatch.setattr(configuration, '_VALIDATOR', None)
+
+    # Two configurations: validated with the same validator
+    for k in range(2):
+        conf_file = str(tmp_path / f"config_{k}.yaml")
+        write_config(conf_file, synthetic_config(n_activities=5, depth=1, seed=k))
+        LCAProblemConfigurator(conf_file)
+    assert len(compiled) == 1
+
+    # Invalid configuration: same error as jsonschema.validate()
+    config = synthetic_config(n_activities=5, depth=1)
+    config['model'] = 'not a model'
+    conf_file = str(tmp_path / "invalid.yaml")
+    write_config(conf_file, config)
+    with pytest.raises(jsonschema.exceptions.ValidationError):
+        LCAProblemConfigurator(conf_file)
+    assert len(compiled) == 1
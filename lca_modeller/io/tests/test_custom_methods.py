@@ -0,0 +1,118 @@
+"""
+Custom LCIA methods: imported again only when their file, unit or source method changes, or when the flows of the user
+biosphere they refer to were deleted; the files of several methods are read in worker processes.
+"""
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import brightway2 as bw
+import bw2io
+import lca_algebraic as agb
+
+from lca_modeller.io import configuration
+from lca_modeller.io.configuration import USER_BIOSPHERE_DB_NAME, create_custom_lcia_methods
+from lca_modeller.io.tests.synthetic import BIOSPHERE3_DB_NAME, install_fake_databases
+
+METHOD_A = ('custom', 'method a')
+METHOD_B = ('custom', 'method b')
+
+
+def _write_method_file(path, factors: dict):
+    """
+    Writes the CSV file of a custom method, from a dict of flow name => characterization factor. The flows that are
+    not 'fake flow <j>' are new flows, added to the user biosphere.
+    """
+    lines = ["name,categories,unit,amount"] + [f"{name},air,kilogram,{amount}" for name, amount in factors.items()]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def _factors(name):
+    flows = {flow.key: flow['name'] for db_name in (BIOSPHERE3_DB_NAME, USER_BIOSPHERE_DB_NAME)
+             for flow in bw.Database(db_name)}
+    return {flows[key]: amount for key, amount in bw.Method(name).load()}
+
+
+@pytest.fixture
+def imports(bw_project, monkeypatch):
+    """
+    Installs the fake databases, and records the custom methods written to the project, with the data read in a
+    worker process if any.
+    """
+    install_fake_databases(n_activities=5)
+    bw2io.create_core_migrations()  # used to link to the user biosphere, as in a project set up by bw2setup()
+    agb.resetDb(USER_BIOSPHERE_DB_NAME, foreground=False)
+    written = []
+    create_custom_lcia_method = configuration.create_custom_lcia_method
+
+    def _write_methods(importer, *args, **kwargs):
+        written.extend(method['name'] for method in importer.data)
+        return write_methods(importer, *args, **kwargs)
+
+    def _create(name, filepath, unit=None, source_method=None, data=None):
+        read_in_worker.append(data is not None)
+        return create_custom_lcia_method(name, filepath, unit, source_method, data=data)
+
+    from bw2io.importers.base_lcia import LCIAImporter
+    write_methods = LCIAImporter.write_methods
+    read_in_worker = []
+    monkeypatch.setattr(LCIAImporter, 'write_methods', _write_methods)
+    monkeypatch.setattr(configuration, 'create_custom_lcia_method', _create)
+    return written, read_in_worker
+
+
+def test_custom_method_skipped_when_unchanged(imports, tmp_path):
+    written, _ = imports
+    method = {'name': METHOD_A, 'filepath': _write_method_file(tmp_path / "a.csv", {'fake flow 1': 2., 'contrails': 3.}),
+              'unit': 'kg'}
+    create_custom_lcia_methods([method])
+    assert written == [METHOD_A]
+    assert _factors(METHOD_A) == {'fake flow 1': 2., 'contrails': 3.}
+
+    # Same file, unit and flows: not imported again
+    create_custom_lcia_methods([method])
+    assert written == [METHOD_A]
+
+    # Other unit, other content: imported again
+    create_custom_lcia_methods([dict(method, unit='g')])
+    assert written == [METHOD_A] * 2
+    _write_method_file(tmp_path / "a.csv", {'fake flow 1': 4., 'contrails': 3.})
+    create_custom_lcia_methods([dict(method, unit='g')])
+    assert written == [METHOD_A] * 3
+    assert _factors(METHOD_A) == {'fake flow 1': 4., 'contrails': 3.}
+
+    # New flow deleted from the user biosphere: imported again
+    agb.resetDb(USER_BIOSPHERE_DB_NAME, foreground=False)
+    create_custom_lcia_methods([dict(method, unit='g')])
+    assert written == [METHOD_A] * 4
+    assert _factors(METHOD_A) == {'fake flow 1': 4., 'contrails': 3.}
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_custom_methods_bulk_import(imports, tmp_path, monkeypatch, max_workers):
+    written, read_in_worker = imports
+    monkeypatch.setenv("BRIGHTWAY2_DIR", bw.projects._base_data_dir)  # project of the spawned workers
+    methods = [
+        {'name': METHOD_A, 'filepath': _write_method_file(tmp_path / "a.csv", {'fake flow 1': 2., 'contrails': 3.}),
+         'unit': 'kg'},
+        {'name': METHOD_B, 'filepath': _write_method_file(tmp_path / "b.csv", {'fake flow 2': 0.5, 'vapour': 1.}),
+         'unit': 'kg'},
+    ]
+    create_custom_lcia_methods(methods, max_workers=max_workers)
+    assert written == [METHOD_A, METHOD_B]
+    assert read_in_worker == [max_workers > 1] * 2
+    assert _factors(METHOD_A) == {'fake flow 1': 2., 'contrails': 3.}
+    assert _factors(METHOD_B) == {'fake flow 2': 0.5, 'vapour': 1.}
+
+    # The new flows of both methods are kept in the user biosphere: nothing to import again
+    del read_in_worker[:]
+    create_custom_lcia_methods(methods, max_workers=max_workers)
+    assert written == [METHOD_A, METHOD_B]
+    assert read_in_worker == [False] * 2
+
+    # Only the changed method is read and written again
+    _write_method_file(tmp_path / "b.csv", {'fake flow 2': 0.7, 'vapour': 1.})
+    create_custom_lcia_methods(methods, max_workers=max_workers)
+    assert written == [METHOD_A, METHOD_B, METHOD_B]
+    assert _factors(METHOD_B) == {'fake flow 2': 0.7, 'vapour': 1.}
@@ -0,0 +1,70 @@
+"""
+Compilation of the exchange expressions: each amount is parsed once, each parameter is created once with its metadata,
+and the results of sum() are cached until the exchanges are modified.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import lca_algebraic as agb
+
+from lca_modeller.io import configuration, profiling
+from lca_modeller.io.configuration import USER_DB, ExpressionCompiler
+
+
+@pytest.fixture
+def compiler(bw_project):
+    agb.resetDb(USER_DB)
+    agb.resetParams(db_name=USER_DB)
+    return ExpressionCompiler({'p1': {'default': 2., 'min': 1., 'max': 3., 'unit': 'kg'}})
+
+
+def test_expressions_parsed_once(compiler):
+    with profiling.profiling() as profiler:
+        first = compiler.parse_exchange({'amount': '2 * p1 + p2'})
+        assert compiler.parse_exchange({'amount': '2 * p1 + p2'}) is first  # interned
+        compiler.parse_exchange({'amount': 2})
+        compiler.parse_exchange({'amount': 2.})  # other type: other expression
+        compiler.parse_exchange({'amount': 2})
+    counters = profiler.report()['total_counters']
+    assert counters['expressions parsed'] == 4  # including the formula of the parameters created (None), once
+    assert counters['parameters created'] == 2
+    assert str(first) == '2*p1 + p2'
+
+
+def test_parameters_created_once(compiler):
+    compiler.parse_exchange({'amount': 'p1 * p2'})
+    compiler.parse_exchange({'amount': 'p2 / p1'})
+    params = agb.params.all_params()
+    assert {'p1', 'p2'} <= set(params)
+    assert (params['p1'].default, params['p1'].min, params['p1'].max, params['p1'].unit) == (2., 1., 3., 'kg')
+    assert params['p2'].default == 1.
+
+    # Parameter deleted: created again at its next use
+    compiler.forget(['p2'])
+    agb.params._param_registry().params.pop('p2')
+    with profiling.profiling() as profiler:
+        compiler.parse_exchange({'amount': 'p2 / p1'})
+    assert profiler.report()['total_counters'] == {'parameters created': 1}
+    assert 'p2' in agb.params.all_params()
+
+
+def test_sums_cached(compiler, monkeypatch):
+    calls = []
+
+    def sum_amounts(act, exchange_name):
+        calls.append((act.key, exchange_name))
+        return 2.5
+
+    monkeypatch.setattr(configuration, 'sum_amounts', sum_amounts)
+    act = SimpleNamespace(key=(USER_DB, 'act'))
+    assert str(compiler.parse_exchange({'amount': 'sum(electricity*) * p1'}, act=act)) == '2.5*p1'
+    compiler.parse_exchange({'amount': 'sum(electricity*) / 2'}, act=act)
+    assert calls == [((USER_DB, 'act'), 'electricity*')]
+
+    # Exchanges modified: computed again
+    compiler.clear_sums()
+    compiler.parse_exchange({'amount': 'sum(electricity*)'}, act=act)
+    assert len(calls) == 2
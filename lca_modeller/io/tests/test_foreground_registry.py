@@ -0,0 +1,61 @@
+"""
+Resolution of the names of the foreground activities by the in-memory registry: case-insensitive, as lca_algebraic's
+findActivity(), and with an explicit error for references to activities defined later in the configuration file.
+"""
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import brightway2 as bw
+
+from lca_modeller.io.configuration import USER_DB, ForegroundRegistry, LCAProblemConfigurator
+from lca_modeller.io.tests.synthetic import (FAKE_EI_MODEL, FAKE_EI_VERSION, FAKE_METHOD, LOCATION, fake_activity_name,
+                                             install_fake_databases, write_config)
+
+
+def _generate(tmp_path, model: dict):
+    install_fake_databases(n_activities=20)
+    config = {
+        'project': 'lca_modeller_test',
+        'ecoinvent': {'version': FAKE_EI_VERSION, 'model': FAKE_EI_MODEL},
+        'model': model,
+        'methods': [str(FAKE_METHOD)],
+    }
+    conf_file = str(tmp_path / "config.yaml")
+    write_config(conf_file, config)
+    _, model, _ = LCAProblemConfigurator(conf_file).generate()
+    return model
+
+
+def test_registry_case_insensitive():
+    registry = ForegroundRegistry(declared=['Later_Activity'])
+    registry._add('code1', 'Electricity Mix', 'GLO', 'kilowatt hour', act='act1')
+    registry._add('code2', 'electricity mix', 'FR', 'kilowatt hour', act='act2')
+
+    assert 'ELECTRICITY MIX' in registry
+    assert registry.find('electricity MIX') == ['act1', 'act2']
+    assert registry.find('Electricity mix', loc='FR') == ['act2']
+    assert registry.unique_name('ELECTRICITY MIX') == 'ELECTRICITY MIX_1'
+    assert registry.is_declared('later_activity')
+
+    registry.forget(['code1', 'code2'])
+    assert 'Electricity Mix' not in registry
+
+
+def test_reference_case_insensitive(bw_project, tmp_path):
+    model = _generate(tmp_path, {
+        'Production': {'name': fake_activity_name(3), 'loc': LOCATION, 'amount': 2.},
+        'transport': {'name': '#PRODUCTION', 'amount': 3.},  # after 'Production' in the configuration file
+    })
+    inputs = [bw.get_activity(exc.input.key) for exc in model.technosphere()]
+    assert len(inputs) == 2
+    assert {act['name'] for act in inputs} == {'Production'}
+    assert all(act.key[0] == USER_DB for act in inputs)
+
+
+def test_reference_defined_later(bw_project, tmp_path):
+    with pytest.raises(ValueError, match="defined later in the configuration file"):
+        _generate(tmp_path, {  # the keys are sorted in the configuration file
+            'a_transport': {'name': '#B_PRODUCTION', 'amount': 3.},
+            'b_production': {'name': fake_activity_name(3), 'loc': LOCATION, 'amount': 2.},
+        })
@@ -0,0 +1,49 @@
+"""
+Import-time benchmark: importing the configurator or the plots must not load the heavy dependencies that are only
+needed by some code paths (premise, LCIA importers, JSON schema validation, plotting stack).
+"""
+import json
+import os
+import os.path as pth
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+# Time allowed to import a module of lca_modeller once lca_algebraic (and therefore Brightway) is loaded, in seconds.
+IMPORT_TIME_BUDGET = float(os.getenv("LCA_MODELLER_IMPORT_TIME_BUDGET", 1.0))
+
+# nb: dotenv is not listed, it is imported by lca_algebraic itself
+LAZY_MODULES = ["premise", "jsonschema", "pyvis", "lca_modeller.io.prospective"]
+REPO_ROOT = pth.dirname(pth.dirname(pth.dirname(pth.dirname(pth.abspath(__file__)))))  # directory of lca_modeller
+
+_SCRIPT = """
+import json, sys, time
+import lca_algebraic
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start
+print(json.dumps({{"duration": duration, "modules": sorted(set(sys.modules) - before)}}))
+"""
+
+
+def _import_in_subprocess(module: str) -> dict:
+    # lca_modeller must be importable even if it is not installed and the tests are run from another directory
+    python_path = [REPO_ROOT] + [path for path in os.getenv("PYTHONPATH", "").split(os.pathsep) if path]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(python_path))
+    result = subprocess.run([sys.executable, "-c", _SCRIPT.format(module=module)], capture_output=True, text=True,
+                            env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", ["lca_modeller.io.configuration", "lca_modeller.gui.plots"])
+def test_import_time(module):
+    result = _import_in_subprocess(module)
+
+    loaded = [name for name in LAZY_MODULES if name in result["modules"]]  # modules loaded by the import of module
+    assert not loaded, f"Importing {module} loads {loaded}"
+    assert result["duration"] < IMPORT_TIME_BUDGET, \
+        f"Importing {module} took {result['duration']:.2f} s (budget: {IMPORT_TIME_BUDGET} s)"
@@ -0,0 +1,76 @@
+"""
+Incremental build: rebuilding only the changed top-level activities must give the same model as a full build.
+"""
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import lca_algebraic as agb
+
+from lca_modeller.io.configuration import LCAProblemConfigurator, KEY_MODEL
+from lca_modeller.io.tests.synthetic import (FAKE_EI_MODEL, FAKE_EI_VERSION, FAKE_METHOD, LOCATION, fake_activity_name,
+                                             fake_flow_name, install_fake_databases, write_config)
+
+PARAMS = dict(p1=1.3, p2=0.7)
+
+
+def _config(flow_amount=1., act_amount='p1', ref_amount=1., group_amount=2., incremental=True) -> dict:
+    return {
+        'project': 'lca_modeller_test',
+        'ecoinvent': {'version': FAKE_EI_VERSION, 'model': FAKE_EI_MODEL},
+        'incremental_build': incremental,
+        'compiled_cache': False,
+        'score_store': False,
+        'model': {
+            # Top-level activities pointing directly at a biosphere flow, a background activity, a group and an
+            # existing foreground activity
+            'direct_flow': {'name': fake_flow_name(1), 'categories': ['air'], 'amount': flow_amount},
+            'direct_act': {'name': fake_activity_name(5), 'loc': LOCATION, 'amount': act_amount},
+            'group': {
+                'amount': group_amount,
+                'sub_act': {'name': fake_activity_name(7), 'loc': LOCATION, 'amount': 'p2'},
+            },
+            'ref': {'name': '#group', 'amount': ref_amount},
+        },
+        'methods': [str(FAKE_METHOD)],
+    }
+
+
+def _generate(tmp_path, config):
+    conf_file = str(tmp_path / "config.yaml")
+    write_config(conf_file, config)
+    _, model, methods = LCAProblemConfigurator(conf_file).generate()
+    impacts = agb.compute_impacts(model, methods, **PARAMS).iloc[0, 0]
+    return model, impacts
+
+
+@pytest.mark.parametrize("change", [
+    dict(flow_amount=3.),
+    dict(act_amount='2 * p1'),
+    dict(ref_amount=0.5),
+    dict(group_amount=4.),
+])
+def test_incremental_build_matches_full_build(bw_project, tmp_path, change):
+    install_fake_databases(n_activities=20)
+    _generate(tmp_path, _config())
+
+    model, incremental_impacts = _generate(tmp_path, _config(**change))
+    incremental_exchanges = sorted((exc.input.key, str(exc['amount'])) for exc in model.technosphere()) + \
+        sorted((exc.input.key, str(exc['amount'])) for exc in model.biosphere())
+
+    model, full_impacts = _generate(tmp_path, _config(incremental=False, **change))
+    full_exchanges = sorted((exc.input.key, str(exc['amount'])) for exc in model.technosphere()) + \
+        sorted((exc.input.key, str(exc['amount'])) for exc in model.biosphere())
+
+    assert incremental_exchanges == full_exchanges
+    assert incremental_impacts == pytest.approx(full_impacts)
+
+
+def test_incremental_build_keeps_unchanged_activities(bw_project, tmp_path):
+    install_fake_databases(n_activities=20)
+    _generate(tmp_path, _config())
+    group_id = agb.findActivity(name='group', db_name='Foreground DB')._document.id
+
+    _generate(tmp_path, _config(flow_amount=3.))
+    assert agb.findActivity(name='group', db_name='Foreground DB')._document.id == group_id
+    assert agb.getActByCode('Foreground DB', KEY_MODEL) is not None
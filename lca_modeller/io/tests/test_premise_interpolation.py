@@ -0,0 +1,59 @@
+"""
+Premise scenarios with several years: the background activities are interpolated linearly between the years, with
+`year` as the only input parameter of the interpolation.
+"""
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import lca_algebraic as agb
+from lca_algebraic import lca as agb_lca
+
+from lca_modeller.io.configuration import LCAProblemConfigurator, KEY_YEAR
+from lca_modeller.io.tests.synthetic import (FAKE_EI_MODEL, FAKE_EI_VERSION, FAKE_METHOD, LOCATION, fake_activity_name,
+                                             fake_scenarios, install_fake_databases, write_config)
+
+SCENARIOS = fake_scenarios(3)  # years 2020, 2030 and 2040
+
+
+def _generate(tmp_path):
+    install_fake_databases(n_activities=20, scenarios=SCENARIOS)
+    config = {
+        'project': 'lca_modeller_test',
+        'ecoinvent': {'version': FAKE_EI_VERSION, 'model': FAKE_EI_MODEL},
+        'compiled_cache': False,
+        'score_store': False,
+        'premise': {'scenarios': SCENARIOS},
+        'model': {
+            'act_a': {'name': fake_activity_name(5), 'loc': LOCATION, 'amount': 'p1'},
+            'act_b': {'name': fake_activity_name(7), 'loc': LOCATION, 'amount': 2.},
+            'act_c': {'name': fake_activity_name(5), 'loc': LOCATION, 'amount': 0.5},  # same proxy as act_a
+        },
+        'methods': [str(FAKE_METHOD)],
+    }
+    conf_file = str(tmp_path / "config.yaml")
+    write_config(conf_file, config)
+    _, model, methods = LCAProblemConfigurator(conf_file).generate()
+    return model, methods
+
+
+def test_multi_year_premise_model(bw_project, tmp_path):
+    model, methods = _generate(tmp_path)
+
+    # The interpolation weights are expressions of `year`, not parameters of the model
+    lambdas = agb_lca._preMultiLCAAlgebric(model, methods)
+    model_params = {name for lambd in lambdas for name in lambd.params}
+    assert KEY_YEAR in model_params
+    assert model_params <= set(agb.params.all_params())
+    assert not any(param.formula for param in agb.params.all_params().values())
+
+
+def test_multi_year_premise_interpolation(bw_project, tmp_path):
+    model, methods = _generate(tmp_path)
+
+    def impacts(year):
+        return agb.compute_impacts(model, methods, p1=1.3, year=year).iloc[0, 0]
+
+    assert impacts(2020) != pytest.approx(impacts(2030))
+    assert impacts(2025) == pytest.approx((impacts(2020) + impacts(2030)) / 2)
+    assert impacts(2032.5) == pytest.approx(0.75 * impacts(2030) + 0.25 * impacts(2040))
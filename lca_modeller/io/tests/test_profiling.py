@@ -0,0 +1,82 @@
+"""
+Profiling of the generation: nested spans with their durations and counters, in the JSON report and the printed
+summary, and no-op instrumentation when profiling is disabled.
+"""
+import json
+import time
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+from lca_modeller.io import profiling
+from lca_modeller.io.configuration import LCAProblemConfigurator
+from lca_modeller.io.tests.synthetic import install_fake_databases, synthetic_config, write_config
+
+
+def _profile():
+    with profiling.profiling('generate') as profiler:
+        profiling.count('lca_modeller queries')
+        with profiling.span('build model'):
+            for name in ('act_a', 'act_b', 'act_a'):
+                with profiling.span(name):
+                    profiling.count('activities created', 2)
+                    time.sleep(0.01)
+            profiling.count('lca_modeller queries', 3)
+    return profiler
+
+
+def test_profiler_report(tmp_path):
+    profiler = _profile()
+    report = profiler.report()
+    assert report['name'] == 'generate' and report['calls'] == 1
+    assert report['counters'] == {'lca_modeller queries': 1}
+    assert report['total_counters'] == {'lca_modeller queries': 4, 'activities created': 6}
+
+    build, = report['children']
+    assert [(span['name'], span['calls']) for span in build['children']] == [('act_a', 2), ('act_b', 1)]
+    assert build['children'][0]['counters'] == {'activities created': 4}
+    assert build['duration'] >= sum(span['duration'] for span in build['children']) >= 0.03
+    assert build['self_duration'] == pytest.approx(build['duration'] - sum(span['duration']
+                                                                          for span in build['children']))
+
+    profiler.write(str(tmp_path / "profile.json"))
+    with open(tmp_path / "profile.json") as file:
+        assert json.load(file) == report
+
+
+def test_profiler_summary():
+    lines = _profile().summary(min_fraction=0.).splitlines()
+    assert lines[0].startswith("generate: ")
+    assert lines[0].endswith("[activities created: 6, lca_modeller queries: 4]")
+    assert lines[1].startswith("  build model: ")
+    assert lines[2].startswith("    act_a (x2): ") and lines[2].endswith("[activities created: 4]")
+    assert lines[3].startswith("    act_b: ")
+    assert len(lines) == 4
+
+    # Spans shorter than the fraction of the total duration are not listed
+    assert len(_profile().summary(min_fraction=1.1).splitlines()) == 1
+
+
+def test_profiling_disabled():
+    assert profiling.span('build model') is profiling.span('other')  # shared no-op span
+    with profiling.span('build model'):
+        profiling.count('lca_modeller queries')
+    assert profiling._PROFILER is None
+
+
+def test_generate_profile(bw_project, tmp_path):
+    install_fake_databases(n_activities=20)
+    config = synthetic_config(n_activities=12, depth=2, n_background=20, project=bw_project)
+    config.update(profile='report.json')
+    conf_file = str(tmp_path / "config.yaml")
+    write_config(conf_file, config)
+    configurator = LCAProblemConfigurator(conf_file)
+    configurator.generate()
+
+    with open(tmp_path / "report.json") as file:
+        report = json.load(file)
+    assert report == configurator.profile_report
+    assert report['total_counters']['lca_modeller queries'] > 0
+    assert 'database queries' not in report['total_counters']
+    assert 'build model' in [span['name'] for span in report['children']]
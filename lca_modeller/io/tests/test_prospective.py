@@ -0,0 +1,145 @@
+"""
+Scenario-parallel generation of the prospective databases, with a stand-in for premise: all the databases are written,
+one at a time (write lock), by workers whose memory is limited.
+
+The generation runs in its own process and Brightway directory, as the spawned workers cannot see the temporary
+directory of the tests.
+"""
+import json
+import os
+import os.path as pth
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+REPO_ROOT = pth.dirname(pth.dirname(pth.dirname(pth.dirname(pth.abspath(__file__)))))  # directory of lca_modeller
+GB = 1024 ** 3
+
+# Stand-in for premise: writes an empty database per scenario, and logs the write and the memory limit of the worker
+_FAKE_PREMISE = """
+import json, os, time
+import brightway2 as bw
+
+
+def clear_cache():
+    pass
+
+
+def _log(**entry):
+    with open(os.environ['FAKE_PREMISE_LOG'], 'a') as file:
+        file.write(json.dumps(dict(entry, pid=os.getpid())) + '\\n')
+
+
+def _wait_workers(n, timeout=60.):
+    # Barrier: each worker keeps its scenario until n workers have one, so that no worker takes them all
+    end = time.time() + timeout
+    while time.time() < end:
+        with open(os.environ['FAKE_PREMISE_LOG']) as file:
+            if len({json.loads(line)['pid'] for line in file}) >= n:
+                return
+        time.sleep(0.05)
+
+
+class NewDatabase:
+    def __init__(self, scenarios, **kwargs):
+        self.scenarios = scenarios
+
+    def update(self, sectors=None):
+        import resource
+        limit = resource.getrlimit(resource.RLIMIT_AS)[0]
+        _log(limit=None if limit == resource.RLIM_INFINITY else limit)
+        _wait_workers(int(os.getenv('FAKE_PREMISE_WORKERS', '1')))
+        for scenario in self.scenarios:
+            if scenario.get('allocate') and limit != resource.RLIM_INFINITY:  # never allocated without limit
+                bytearray(int(scenario['allocate']))
+
+    def write_db_to_brightway(self, name):
+        start = time.time()
+        time.sleep(0.2)
+        for db_name in name:
+            bw.Database(db_name).write({(db_name, 'act0'): {'name': 'fake process 0', 'unit': 'kilogram'}})
+        _log(write=[start, time.time()])
+"""
+
+_SCRIPT = """
+import json, sys
+import brightway2 as bw
+
+args = json.loads(sys.argv[1])
+sys.platform = args.pop('platform', sys.platform)
+bw.projects.set_current('lca_modeller_test')
+from lca_modeller.io.prospective import generate_premise_databases
+try:
+    generate_premise_databases(source_db='ecoinvent', source_version='3.10', system_model='cutoff', **args)
+    result = {}
+except RuntimeError as e:
+    result = {'error': str(e)}
+bw.databases.load()
+print(json.dumps(dict(result, databases=sorted(bw.databases))))
+"""
+
+
+def _scenarios(n, **options):
+    return [dict({'model': 'fakemodel', 'pathway': 'SSP2-Base', 'year': 2020 + 10 * k}, **options) for k in range(n)]
+
+
+def _generate(tmp_path, workers=1, **args):
+    fake_dir = tmp_path / "fake_premise" / "premise"
+    fake_dir.mkdir(parents=True, exist_ok=True)
+    (fake_dir / "__init__.py").write_text(_FAKE_PREMISE)
+    log = tmp_path / "premise.log"
+    log.unlink(missing_ok=True)
+
+    python_path = [str(fake_dir.parent), REPO_ROOT] + [path for path in os.getenv("PYTHONPATH", "").split(os.pathsep)
+                                                       if path]
+    env = dict(os.environ, BRIGHTWAY2_DIR=str(tmp_path / "bw"), PYTHONPATH=os.pathsep.join(python_path),
+               FAKE_PREMISE_LOG=str(log), FAKE_PREMISE_WORKERS=str(workers), LCA_MODELLER_CONFIG_CACHE="off")
+    (tmp_path / "bw").mkdir(exist_ok=True)
+    args.setdefault('sectors_to_update', 'all')
+    args.setdefault('db_names', [f"db_{scenario['year']}" for scenario in args['scenarios']])
+    result = subprocess.run([sys.executable, "-c", _SCRIPT, json.dumps(args)], capture_output=True, text=True,
+                            env=env, cwd=str(tmp_path))
+    assert result.returncode == 0, result.stderr
+    entries = [json.loads(line) for line in log.read_text().splitlines()] if log.exists() else []
+    return json.loads(result.stdout.strip().splitlines()[-1]), entries, result.stderr
+
+
+def test_serial_generation(tmp_path):
+    result, entries, _ = _generate(tmp_path, scenarios=_scenarios(2), max_workers=1)
+    assert 'error' not in result
+    assert {'db_2020', 'db_2030'} <= set(result['databases'])
+    assert len({entry['pid'] for entry in entries}) == 1  # all the scenarios together, in the current process
+
+
+def test_parallel_generation_one_write_at_a_time(tmp_path):
+    result, entries, _ = _generate(tmp_path, workers=3, scenarios=_scenarios(3), max_workers=3)
+    assert 'error' not in result
+    assert {'db_2020', 'db_2030', 'db_2040'} <= set(result['databases'])
+
+    writes = sorted(entry['write'] for entry in entries if 'write' in entry)
+    assert len(writes) == 3
+    assert len({entry['pid'] for entry in entries if 'write' in entry}) == 3
+    for (_, end), (start, _) in zip(writes[:-1], writes[1:]):
+        assert start >= end  # the write lock serializes the writes
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="memory limit only enforced on Linux")
+def test_worker_memory_limit(tmp_path):
+    scenarios = _scenarios(2)
+    scenarios[1]['allocate'] = 16 * GB
+    result, entries, _ = _generate(tmp_path, scenarios=scenarios, max_workers=2, max_memory=8)
+
+    assert {entry['limit'] for entry in entries if 'limit' in entry} == {8 * GB}
+    assert 'db_2020' in result['databases'] and 'db_2030' not in result['databases']
+    assert "db_2030: out of memory (limit of 8 GB per worker)" in result['error']
+
+
+def test_memory_limit_platform_guard(tmp_path):
+    result, entries, stderr = _generate(tmp_path, scenarios=_scenarios(2), max_workers=2, max_memory=8,
+                                        platform='darwin')
+    assert 'error' not in result
+    assert "cannot be limited on darwin" in stderr
+    assert {entry['limit'] for entry in entries if 'limit' in entry} == {None}
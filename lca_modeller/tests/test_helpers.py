@@ -0,0 +1,144 @@
+"""
+Tests of the helpers of lca_modeller.
+"""
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("lca_algebraic")
+
+import brightway2 as bw
+import numpy as np
+from sympy import symbols
+
+from lca_modeller.helpers import (USER_DB, _render_formula, completeParamValues, expandParams, expression_size,
+                                  list_processes)
+from lca_modeller.io.tests.synthetic import FAKE_EI_MODEL, FAKE_EI_VERSION, install_fake_databases
+
+EI_DB_NAME = f'ecoinvent-{FAKE_EI_VERSION}-{FAKE_EI_MODEL}'
+
+
+def test_expression_size():
+    a, b = symbols('a b')
+    assert expression_size(2.) == 1
+    assert expression_size(a) == 1
+    assert expression_size(2 * a + b) == 5  # Add(Mul(2, a), b)
+
+
+def test_render_formula():
+    formula = "2*a*b + 2*a*c"
+    assert _render_formula(formula, 'raw') == formula
+    assert _render_formula(formula, 'simplified') == "2*a*b + 2*a*c"
+    assert _render_formula(formula, 'factored') == "2*a*(b + c)"
+    with pytest.raises(ValueError):
+        _render_formula(formula, 'unknown')
+
+
+def test_render_large_formula_not_factored():
+    # Factoring this expression takes about half a minute
+    formula = " + ".join(f"{1 + i % 7}*p{i % 10}*s{i}*(year - 2020)/10" for i in range(40))
+    start = time.perf_counter()
+    rendered = _render_formula(formula, 'factored', max_size=100)
+    assert time.perf_counter() - start < 5.
+    assert rendered == _render_formula(formula, 'simplified')
+
+
+def _write_foreground(exchanges: dict):
+    """
+    Writes a foreground database from a dict of code => list of (input key, amount or formula).
+    """
+    data = {}
+    for code, inputs in exchanges.items():
+        excs = [{'input': (USER_DB, code), 'amount': 1., 'type': 'production'}]
+        for key, amount in inputs:
+            exc = {'input': key, 'type': 'technosphere', 'amount': 1. if isinstance(amount, str) else amount}
+            if isinstance(amount, str):
+                exc['formula'] = amount
+            excs.append(exc)
+        data[(USER_DB, code)] = {'name': code, 'unit': 'kg', 'location': 'GLO', 'exchanges': excs}
+    bw.Database(USER_DB).write(data)
+    return bw.get_activity((USER_DB, 'model'))
+
+
+def test_list_processes_flat(bw_project):
+    install_fake_databases(n_activities=20)
+    model = _write_foreground({
+        'model': [((USER_DB, 'a'), 2.), ((USER_DB, 'b'), 'p1*2'), ((USER_DB, 'a'), 3.)],
+        'a': [((USER_DB, 'c'), 1.)],
+        'b': [((USER_DB, 'c'), 0.5)],  # c is shared by a and b
+        'c': [((EI_DB_NAME, 'act3'), 4.)],
+    })
+
+    # Each activity listed once, depth-first in the order of the exchanges, one edge per exchange
+    nodes, edges = list_processes(model, flat=True, formula_rendering='raw')
+    assert list(nodes['activity']) == ['model', 'a', 'c', 'b']
+    assert list(nodes['level']) == [0, 1, 2, 1]
+    assert list(nodes['key']) == [(USER_DB, code) for code in ('model', 'a', 'c', 'b')]
+    assert list(zip(edges['child'], edges['parent'], edges['amount'])) == [
+        (1, 0, '2.00'), (2, 1, '1.00'), (3, 0, 'p1*2'), (2, 3, '5.00e-01'), (1, 0, '3.00')]
+
+    # With the background activities, stopped at their first level
+    nodes, edges = list_processes(model, foreground_only=False, flat=True)
+    assert list(nodes['activity']) == ['model', 'a', 'c', 'fake process 3', 'b']
+    assert list(nodes['database']) == [USER_DB] * 3 + [EI_DB_NAME, USER_DB]
+
+    # Legacy layout: same activities, with their parents and amounts
+    table = list_processes(model, formula_rendering='raw')
+    assert list(table.index) == ['model', 'a', 'c', 'b']
+    assert table.loc['c', 'parents'] == ['a', 'b'] and table.loc['c', 'amounts'] == ['1.00', '5.00e-01']
+    assert table.loc['a', 'parents'] == ['model', 'model']
+
+
+def test_list_processes_deep(bw_project):
+    depth = 500
+    chain = {'model': [((USER_DB, 'act0'), 1.)]}
+    chain.update({f'act{i}': [((USER_DB, f'act{i + 1}'), 1.)] for i in range(depth - 1)})
+    chain[f'act{depth - 1}'] = []
+    model = _write_foreground(chain)
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(200)  # below the depth of the model: no recursion
+    try:
+        nodes, edges = list_processes(model, flat=True)
+    finally:
+        sys.setrecursionlimit(limit)
+    assert len(nodes) == depth + 1 and len(edges) == depth
+    assert nodes['level'].max() == depth
+
+
+PARAM_REGISTRY = {
+    'length': {'name': 'length', 'type': 'float', 'default': 2., 'values': None},
+    'engine': {'name': 'engine', 'type': 'enum', 'default': 'electric', 'values': ['thermal', 'electric', 'hybrid']},
+}
+
+
+def test_expand_params_vector():
+    engines = ['hybrid', 'thermal', None, 'electric', 'thermal']
+    lengths = [1., None, 3., 4.5, 0.]
+
+    # Same values as the expansion of each value, in bulk
+    expanded = expandParams(PARAM_REGISTRY['engine'], engines)
+    assert sorted(expanded) == ['engine_default', 'engine_electric', 'engine_hybrid', 'engine_thermal']
+    for k, engine in enumerate(engines):
+        assert {name: values[k] for name, values in expanded.items()} == expandParams(PARAM_REGISTRY['engine'], engine)
+    expanded = expandParams(PARAM_REGISTRY['length'], lengths)
+    assert list(expanded['length']) == [expandParams(PARAM_REGISTRY['length'], length)['length'] for length in lengths]
+
+    # Arrays, with NaN as missing value, and invalid values
+    assert list(expandParams(PARAM_REGISTRY['length'], np.array([np.nan, 5.]))['length']) == [2., 5.]
+    assert list(expandParams(PARAM_REGISTRY['engine'], np.array(['thermal', None]))['engine_default']) == [0., 1.]
+    with pytest.raises(Exception, match="Invalid value diesel for param engine"):
+        expandParams(PARAM_REGISTRY['engine'], ['thermal', 'diesel'])
+
+
+def test_complete_param_values_vector():
+    res = completeParamValues(dict(engine=['thermal', 'hybrid']), PARAM_REGISTRY)
+    assert res['length'] == 2.  # missing parameter: default value
+    assert list(res['engine_thermal']) == [1., 0.] and list(res['engine_hybrid']) == [0., 1.]
+    assert list(res['engine_electric']) == [0., 0.] and list(res['engine_default']) == [0., 0.]
+
+    res = completeParamValues(dict(length=np.linspace(0., 1., 3), unknown=[1., 2.]), PARAM_REGISTRY)
+    assert 'unknown' not in res
+    assert list(res['length']) == [0., 0.5, 1.]
+    assert res['engine_electric'] == 1. and res['engine_default'] == 0.